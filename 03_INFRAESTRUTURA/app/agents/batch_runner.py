@@ -0,0 +1,222 @@
+"""
+Prometheus Batch Runner
+Execução concorrente de lotes de tarefas com limites por provedor
+"""
+
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+
+class ProviderRateLimiter:
+    """
+    Espaça o início das chamadas de um provedor para respeitar N requisições/minuto
+
+    Cada chamada reserva o próximo horário livre e dorme até ele, então
+    threads concorrentes saem em fila com intervalo de 60/rpm segundos.
+    """
+
+    def __init__(self, requests_per_minute: int = 0):
+        self.requests_per_minute = requests_per_minute
+        self._interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Aguarda o próximo horário livre e retorna os segundos esperados"""
+        if not self._interval:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class BatchRunner:
+    """
+    Executa várias tarefas do agente em paralelo
+
+    - No máximo ``max_concurrency`` tarefas em execução no total
+    - No máximo ``per_provider_concurrency`` tarefas simultâneas por provedor
+    - Limite de requisições/minuto por provedor via PROMETHEUS_<PROVIDER>_RPM
+    - Resultados retornados na ordem de entrada, com tempos por item
+    """
+
+    def __init__(self,
+                 agent,
+                 max_concurrency: Optional[int] = None,
+                 per_provider_concurrency: Optional[int] = None):
+        """
+        Args:
+            agent: EvolutionaryAgent que processa as tarefas
+            max_concurrency: Tarefas simultâneas no lote (PROMETHEUS_BATCH_CONCURRENCY)
+            per_provider_concurrency: Tarefas simultâneas por provedor
+                (PROMETHEUS_BATCH_PER_PROVIDER)
+        """
+        self.agent = agent
+        self.max_concurrency = max_concurrency or int(os.getenv("PROMETHEUS_BATCH_CONCURRENCY", "8"))
+        self.per_provider_concurrency = per_provider_concurrency or int(
+            os.getenv("PROMETHEUS_BATCH_PER_PROVIDER", "4")
+        )
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._limiters: Dict[str, ProviderRateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def _provider_gates(self, provider: str):
+        """Semáforo e limitador de taxa do provedor (criados sob demanda)"""
+        with self._lock:
+            if provider not in self._semaphores:
+                self._semaphores[provider] = threading.BoundedSemaphore(self.per_provider_concurrency)
+                rpm = int(os.getenv(f"PROMETHEUS_{provider.upper()}_RPM", "0"))
+                self._limiters[provider] = ProviderRateLimiter(rpm)
+            return self._semaphores[provider], self._limiters[provider]
+
+    @staticmethod
+    def normalize_task(task: Any) -> Dict[str, Any]:
+        """Aceita uma string ou um dict com description/context/files/provider/model"""
+        if isinstance(task, str):
+            return {"description": task}
+        if isinstance(task, dict):
+            return task
+        raise ValueError(f"Tarefa inválida no lote: {task!r}")
+
+    def run(self,
+            tasks: List[Any],
+            provider: Optional[str] = None,
+            model: Optional[str] = None,
+            use_cache: bool = True,
+            on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Processa o lote e aguarda todas as tarefas
+
+        Args:
+            tasks: Descrições (str) ou dicts por tarefa
+            provider: Provedor padrão das tarefas que não informam o seu
+            model: Modelo padrão das tarefas que não informam o seu
+            use_cache: Se False, ignora o cache de respostas do LLM
+            on_result: Chamado com cada item assim que ele termina
+
+        Returns:
+            Dict com "results" (na ordem de entrada) e um resumo do lote
+        """
+        items = [self.normalize_task(task) for task in tasks]
+        started_at = datetime.now().isoformat()
+        batch_start = time.time()
+
+        def execute(index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+            queued_at = time.time()
+            item_provider = item.get("provider") or provider
+            item_model = item.get("model") or model
+            try:
+                item_provider, item_model, _ = self.agent._resolve_route(item_provider, item_model)
+                semaphore, limiter = self._provider_gates(item_provider)
+            except Exception as e:
+                # Provedor/modelo inválido afeta só este item, não o lote
+                entry = {
+                    "index": index,
+                    "description": item.get("description", ""),
+                    "provider": item_provider,
+                    "model": item_model,
+                    "status": "error",
+                    "error": str(e),
+                    "queued_time": 0.0,
+                    "elapsed_time": 0.0,
+                    "result": {"status": "error", "response": str(e)}
+                }
+                if on_result:
+                    on_result(entry)
+                return entry
+
+            with semaphore:
+                limiter.acquire()
+                task_start = time.time()
+                try:
+                    result = self.agent.process_task(
+                        task_description=item.get("description", ""),
+                        context=item.get("context"),
+                        files_context=item.get("files", []),
+                        use_cache=use_cache and not item.get("bypass_cache", False),
+                        provider=item_provider,
+                        model=item_model
+                    )
+                    status = result.get("status", "error")
+                except Exception as e:
+                    result = {"status": "error", "response": str(e)}
+                    status = "error"
+
+            entry = {
+                "index": index,
+                "description": item.get("description", ""),
+                "provider": item_provider,
+                "model": item_model,
+                "status": status,
+                "queued_time": round(task_start - queued_at, 2),
+                "elapsed_time": round(time.time() - task_start, 2),
+                "result": result
+            }
+            if on_result:
+                on_result(entry)
+            return entry
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_concurrency, len(items) or 1)),
+                                thread_name_prefix="prometheus-batch") as executor:
+            futures = [executor.submit(execute, index, item) for index, item in enumerate(items)]
+            results = [future.result() for future in futures]
+
+        succeeded = sum(1 for entry in results if entry["status"] == "success")
+        return {
+            "results": results,
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "started_at": started_at,
+            "elapsed_time": round(time.time() - batch_start, 2),
+            "max_concurrency": self.max_concurrency,
+            "per_provider_concurrency": self.per_provider_concurrency
+        }
+
+
+def load_batch_file(path: str) -> List[Any]:
+    """
+    Lê tarefas de um arquivo de lote
+
+    - .json: lista de strings/dicts (ou {"tasks": [...]})
+    - .jsonl: uma tarefa (string ou dict) por linha
+    - .md: itens "- [ ]" pendentes; sem checkboxes, usa o parser do Tarefas.MD
+    - demais: uma descrição por linha não vazia
+    """
+    file_path = Path(path)
+    content = file_path.read_text(encoding="utf-8")
+    suffix = file_path.suffix.lower()
+
+    if suffix == ".json":
+        data = json.loads(content)
+        return data.get("tasks", []) if isinstance(data, dict) else data
+
+    if suffix == ".jsonl":
+        return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+    if suffix == ".md":
+        pending = [
+            line.strip()[len("- [ ]"):].strip()
+            for line in content.splitlines()
+            if line.strip().startswith("- [ ]")
+        ]
+        if pending:
+            return pending
+
+        from .specialized.task_manager_agent import TaskManagerAgent
+        return [task["content"] for task in TaskManagerAgent(str(file_path)).parse_tasks(content)]
+
+    return [line.strip() for line in content.splitlines() if line.strip()]
@@ -0,0 +1,180 @@
+"""
+Prometheus Evolution Journal
+Journal append-only (JSONL segmentado) para persistir evoluções e conhecimento
+"""
+
+import os
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class EvolutionJournal:
+    """
+    Journal append-only do agente evolutivo
+
+    Cada evolução e cada entrada de conhecimento vira uma linha JSON em um
+    segmento ``segment_NNNNNN.jsonl``. O snapshot (``evolution_history.json``)
+    é reescrito apenas na compactação, registrando o último segmento já
+    incorporado para que o replay na inicialização leia somente a cauda.
+
+    Escritas são serializadas por um lock, então o journal pode ser
+    compartilhado entre threads. O journal pertence a um único processo:
+    com vários workers, use um processo com múltiplas threads.
+    """
+
+    SEGMENT_PREFIX = "segment_"
+    SEGMENT_SUFFIX = ".jsonl"
+
+    def __init__(self,
+                 snapshot_file: Path,
+                 journal_dir: Optional[Path] = None,
+                 segment_max_records: int = 500,
+                 compact_after_segments: int = 4,
+                 fsync: bool = True):
+        """
+        Args:
+            snapshot_file: Caminho do snapshot JSON (formato legado do histórico)
+            journal_dir: Diretório dos segmentos (padrão: <snapshot>_journal)
+            segment_max_records: Registros por segmento antes de rotacionar
+            compact_after_segments: Segmentos fechados que disparam compactação
+            fsync: Se True, força fsync após cada registro
+        """
+        self.snapshot_file = Path(snapshot_file)
+        self.journal_dir = Path(journal_dir) if journal_dir else self.snapshot_file.with_name(
+            f"{self.snapshot_file.stem}_journal"
+        )
+        self.segment_max_records = segment_max_records
+        self.compact_after_segments = compact_after_segments
+        self.fsync = fsync
+
+        self._lock = threading.Lock()
+        self._handle = None
+        self._segment_index = 0
+        self._segment_records = 0
+
+    # ==================== LEITURA ====================
+
+    def load(self) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Carrega snapshot e registros da cauda do journal
+
+        Returns:
+            Tupla (snapshot, registros) onde registros são dicts
+            ``{"type": "evolution"|"knowledge", "data": {...}}`` em ordem
+        """
+        snapshot: Dict[str, Any] = {}
+        if self.snapshot_file.exists():
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+
+        compacted_upto = snapshot.get("journal_segment", 0)
+        records = []
+        segments = self._list_segments()
+        for index, path in segments:
+            if index <= compacted_upto:
+                continue
+            records.extend(self._read_segment(path))
+
+        # Próximo segmento continua a numeração existente
+        last_index = segments[-1][0] if segments else 0
+        self._segment_index = max(last_index, compacted_upto)
+        return snapshot, records
+
+    def _list_segments(self) -> List[Tuple[int, Path]]:
+        """Lista segmentos existentes ordenados pelo índice"""
+        if not self.journal_dir.exists():
+            return []
+
+        segments = []
+        for path in self.journal_dir.glob(f"{self.SEGMENT_PREFIX}*{self.SEGMENT_SUFFIX}"):
+            raw_index = path.name[len(self.SEGMENT_PREFIX):-len(self.SEGMENT_SUFFIX)]
+            if raw_index.isdigit():
+                segments.append((int(raw_index), path))
+        return sorted(segments)
+
+    @staticmethod
+    def _read_segment(path: Path) -> Iterator[Dict[str, Any]]:
+        """Lê um segmento ignorando uma linha final truncada (crash no meio da escrita)"""
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    break
+
+    # ==================== ESCRITA ====================
+
+    def append(self, record_type: str, data: Dict[str, Any]) -> None:
+        """Anexa um registro ao segmento atual (custo O(registro))"""
+        line = json.dumps({"type": record_type, "data": data}, ensure_ascii=False)
+
+        with self._lock:
+            if self._handle is None or self._segment_records >= self.segment_max_records:
+                self._open_next_segment()
+
+            self._handle.write(line + "\n")
+            self._handle.flush()
+            if self.fsync:
+                os.fsync(self._handle.fileno())
+            self._segment_records += 1
+
+    def _open_next_segment(self) -> None:
+        """Fecha o segmento atual e abre o próximo"""
+        self._close_handle()
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        self._segment_index += 1
+        path = self.journal_dir / f"{self.SEGMENT_PREFIX}{self._segment_index:06d}{self.SEGMENT_SUFFIX}"
+        self._handle = open(path, 'a', encoding='utf-8')
+        self._segment_records = 0
+
+    def should_compact(self) -> bool:
+        """Indica se há segmentos fechados suficientes para compactar"""
+        closed = [index for index, _ in self._list_segments() if index < self._segment_index]
+        return len(closed) >= self.compact_after_segments
+
+    def compact(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Grava um novo snapshot e remove os segmentos incorporados
+
+        O snapshot é escrito em arquivo temporário e renomeado atomicamente;
+        os segmentos só são removidos depois que o snapshot está no disco.
+        """
+        with self._lock:
+            self._close_handle()
+            compacted_upto = self._segment_index
+
+            data = dict(snapshot)
+            data["journal_segment"] = compacted_upto
+            self.write_snapshot(data)
+
+            for index, path in self._list_segments():
+                if index <= compacted_upto:
+                    path.unlink()
+
+    def write_snapshot(self, data: Dict[str, Any]) -> None:
+        """Escreve o snapshot via arquivo temporário + rename atômico"""
+        self.snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+        # Nome único por thread evita que duas escritas compartilhem o temporário
+        tmp_file = self.snapshot_file.with_name(
+            f".{self.snapshot_file.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.snapshot_file)
+
+    def close(self) -> None:
+        """Fecha o segmento aberto, se houver"""
+        with self._lock:
+            self._close_handle()
+
+    def _close_handle(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
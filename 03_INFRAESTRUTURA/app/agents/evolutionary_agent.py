@@ -1,31 +1,31 @@
 """
 Prometheus Evolutionary Agent
 Sistema de agentes evolutivos que aprendem através de documentação estruturada
+
+Usa imports relativos; para a demonstração, rode como módulo a partir de
+03_INFRAESTRUTURA: ``python -m app.agents.evolutionary_agent``
 """
 
 import os
 import json
 import time
+import uuid
+import threading
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 from pathlib import Path
 import re
 
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None
-
-try:
-    from anthropic import Anthropic
-except ImportError:
-    Anthropic = None
+from .evolution_journal import EvolutionJournal
+from .knowledge_index import KnowledgeIndex
+from .response_cache import ResponseCache
+from .provider_registry import DEFAULT_MODELS, provider_registry
+from .llm_router import LLMRouter
+from .specialized.token_cost_agent import TokenCostAgent
 
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
+# Início da seção volátil do prompt de sistema (fora da chave do cache)
+LEARNINGS_MARKER = "\nAprendizados Recentes: "
 
 
 @dataclass
@@ -66,8 +66,39 @@ class EvolutionaryAgent:
         self.model = model
         self.evolution_history: List[Evolution] = []
         self.knowledge_base: Dict[str, str] = {}
+        self.knowledge_index = KnowledgeIndex()
         self.version = "1.0.0"
         self.created_at = datetime.now().isoformat()
+        self.temperature = 0.7
+        
+        # Protege histórico, knowledge base e a rota do provedor entre threads
+        self._lock = threading.RLock()
+        
+        # Journal append-only + snapshot compactado periodicamente
+        self.journal = EvolutionJournal(
+            Path(__file__).parent.parent / "data" / "evolution_history.json"
+        )
+        
+        # Cache de respostas idênticas (desative com PROMETHEUS_LLM_CACHE=0)
+        self.response_cache = None
+        if os.getenv("PROMETHEUS_LLM_CACHE", "1") != "0":
+            self.response_cache = ResponseCache(
+                db_path=Path(__file__).parent.parent / "data" / "llm_cache.sqlite3",
+                memory_entries=int(os.getenv("PROMETHEUS_LLM_CACHE_MEMORY", "256")),
+                disk_entries=int(os.getenv("PROMETHEUS_LLM_CACHE_DISK", "10000")),
+                ttl_seconds=int(os.getenv("PROMETHEUS_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+            )
+        
+        # Tokens e custo de cada chamada (desative com PROMETHEUS_TOKEN_TRACKING=0)
+        self.token_usage = None
+        if os.getenv("PROMETHEUS_TOKEN_TRACKING", "1") != "0":
+            self.token_usage = TokenCostAgent(
+                db_path=str(Path(__file__).parent.parent / "data" / "token_usage.sqlite3"),
+                log_file=str(Path(__file__).parent.parent / "data" / "token_usage.json")
+            )
+        
+        # Failover/hedging entre provedores e latência por provedor
+        self.router = LLMRouter()
         
         # Inicializar cliente baseado no provedor
         self._init_provider_client(api_key)
@@ -77,65 +108,70 @@ class EvolutionaryAgent:
     
     def _init_provider_client(self, api_key: Optional[str] = None):
         """Inicializa o cliente do provedor de LLM"""
-        if self.provider == "openai":
-            self.api_key = api_key or os.getenv("OPENAI_API_KEY")
-            self.client = OpenAI(api_key=self.api_key) if OpenAI and self.api_key else None
-            
-        elif self.provider == "anthropic":
-            self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
-            self.client = Anthropic(api_key=self.api_key) if Anthropic and self.api_key else None
-            
-        elif self.provider == "gemini":
-            self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-            if genai and self.api_key:
-                genai.configure(api_key=self.api_key)
-                self.client = genai
-            else:
-                self.client = None
-                
-        elif self.provider == "deepseek":
-            # DeepSeek usa API compatível com OpenAI
-            self.api_key = api_key or os.getenv("DEEPSEEK_API_KEY")
-            if OpenAI and self.api_key:
-                self.client = OpenAI(
-                    api_key=self.api_key,
-                    base_url="https://api.deepseek.com/v1"
-                )
-            else:
-                self.client = None
-                
-        elif self.provider == "openrouter":
-            # OpenRouter usa API compatível com OpenAI
-            self.api_key = api_key or os.getenv("OPENROUTER_API_KEY")
-            if OpenAI and self.api_key:
-                self.client = OpenAI(
-                    api_key=self.api_key,
-                    base_url="https://openrouter.ai/api/v1"
-                )
-            else:
-                self.client = None
+        client, resolved_key = self._build_provider_client(self.provider, api_key)
+        with self._lock:
+            self.client = client
+            self.api_key = resolved_key
+    
+    def _build_provider_client(self, provider: str, api_key: Optional[str] = None) -> Tuple[object, Optional[str]]:
+        """
+        Obtém o cliente de um provedor sem alterar o estado do agente
         
-        else:
-            raise ValueError(f"Provedor não suportado: {self.provider}")
+        Os clientes vêm do registro compartilhado, que mantém um pool
+        keep-alive por (provider, base_url, key) e evita reconstruí-los
+        a cada troca de provedor.
+        
+        Returns:
+            Tupla (cliente ou None, api key resolvida)
+        """
+        client, api_key = provider_registry.get(provider, api_key)
         
-        if not self.client:
-            print(f"⚠️ Cliente {self.provider} não inicializado. Verifique API key e dependências.")
+        if not client:
+            print(f"⚠️ Cliente {provider} não inicializado. Verifique API key e dependências.")
+        
+        return client, api_key
+    
+    def _current_route(self) -> Tuple[str, str, object]:
+        """Retorna (provider, model, client) consistentes entre si"""
+        with self._lock:
+            return self.provider, self.model, self.client
+    
+    def _resolve_route(self, provider: Optional[str] = None,
+                       model: Optional[str] = None) -> Tuple[str, str, object]:
+        """
+        Resolve a rota de uma tarefa sem alterar o provedor do agente
+        
+        Sem provider, usa a rota atual (opcionalmente com outro modelo).
+        Com provider, usa o cliente do registro e o modelo informado ou o
+        padrão do provedor.
+        """
+        current_provider, current_model, current_client = self._current_route()
+        
+        if not provider or provider.lower() == current_provider:
+            return current_provider, model or current_model, current_client
+        
+        provider = provider.lower()
+        client, _ = provider_registry.get(provider)
+        return provider, model or DEFAULT_MODELS[provider], client
         
     def _load_evolution_history(self):
-        """Carrega histórico de evolução anterior"""
-        history_file = Path(__file__).parent.parent / "data" / "evolution_history.json"
-        if history_file.exists():
-            with open(history_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.evolution_history = [Evolution(**item) for item in data.get("history", [])]
-                self.knowledge_base = data.get("knowledge_base", {})
-                self.version = data.get("version", "1.0.0")
+        """Carrega histórico de evolução: snapshot + replay da cauda do journal"""
+        data, records = self.journal.load()
+        self.evolution_history = [Evolution(**item) for item in data.get("history", [])]
+        self.knowledge_base = data.get("knowledge_base", {})
+        self.version = data.get("version", "1.0.0")
+        self.created_at = data.get("created_at", self.created_at)
+        
+        for record in records:
+            if record.get("type") == "evolution":
+                self.evolution_history.append(Evolution(**record["data"]))
+            elif record.get("type") == "knowledge":
+                self.knowledge_base[record["data"]["task_id"]] = record["data"]["content"]
+        
+        self.knowledge_index.rebuild(self.knowledge_base)
     
     def _save_evolution_history(self):
-        """Salva histórico de evolução"""
-        history_file = Path(__file__).parent.parent / "data" / "evolution_history.json"
-        history_file.parent.mkdir(parents=True, exist_ok=True)
-        
+        """Compacta o journal em um novo snapshot do histórico"""
         data = {
             "version": self.version,
             "created_at": self.created_at,
@@ -145,8 +181,28 @@ class EvolutionaryAgent:
             "knowledge_base": self.knowledge_base
         }
         
-        with open(history_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        self.journal.compact(data)
+    
+    def _record_evolution(self, evolution: Evolution, knowledge: Optional[str] = None) -> int:
+        """
+        Registra evolução (e conhecimento) no journal, compactando quando necessário
+        
+        Returns:
+            Total de evoluções após o registro
+        """
+        with self._lock:
+            self.evolution_history.append(evolution)
+            self.journal.append("evolution", asdict(evolution))
+            
+            if knowledge is not None:
+                self.knowledge_base[evolution.task_id] = knowledge
+                self.knowledge_index.add(evolution.task_id, knowledge)
+                self.journal.append("knowledge", {"task_id": evolution.task_id, "content": knowledge})
+            
+            if self.journal.should_compact():
+                self._save_evolution_history()
+            
+            return len(self.evolution_history)
     
     def extract_learning_points(self, task_description: str, response: str) -> List[str]:
         """Extrai pontos de aprendizado de uma resposta"""
@@ -169,7 +225,10 @@ class EvolutionaryAgent:
     def process_task(self, 
                     task_description: str,
                     context: Optional[str] = None,
-                    files_context: Optional[List[str]] = None) -> Dict:
+                    files_context: Optional[List[str]] = None,
+                    use_cache: bool = True,
+                    provider: Optional[str] = None,
+                    model: Optional[str] = None) -> Dict:
         """
         Processa uma tarefa e evoluí com a experiência
         
@@ -177,27 +236,95 @@ class EvolutionaryAgent:
             task_description: Descrição da tarefa
             context: Contexto adicional
             files_context: Arquivos para carregar como contexto
+            use_cache: Se False, ignora o cache de respostas e chama o provedor
+            provider: Provedor só para esta tarefa (padrão: provedor do agente)
+            model: Modelo só para esta tarefa
         
         Returns:
             Dicionário com resposta e metadata
         """
+        task_id, start_time, system_prompt, user_prompt = self._prepare_task(
+            task_description, context, files_context
+        )
+        route = self._resolve_route(provider, model)
+        served = {}
         
-        task_id = f"task_{int(time.time())}"
-        start_time = time.time()
+        try:
+            # Chamar LLM
+            response_text = self._call_llm(system_prompt, user_prompt, use_cache=use_cache,
+                                           route=route, served=served, task_id=task_id)
+            success = True
+            
+        except Exception as e:
+            response_text = f"Erro ao processar: {str(e)}"
+            success = False
         
-        # Construir prompt
-        system_prompt = self._build_system_prompt()
-        user_prompt = self._build_user_prompt(task_description, context, files_context)
+        return self._finalize_task(task_id, task_description, response_text, success, start_time,
+                                   (served.get("provider", route[0]), served.get("model", route[1])))
+    
+    def process_task_stream(self,
+                            task_description: str,
+                            context: Optional[str] = None,
+                            files_context: Optional[List[str]] = None,
+                            use_cache: bool = True,
+                            provider: Optional[str] = None,
+                            model: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Processa uma tarefa emitindo os tokens à medida que chegam do provedor
+        
+        Yields:
+            {"type": "token", "content": "..."} para cada trecho recebido e,
+            ao final, {"type": "result", "result": {...}} com o mesmo dicionário
+            de process_task (a evolução é registrada quando o stream termina)
+        """
+        task_id, start_time, system_prompt, user_prompt = self._prepare_task(
+            task_description, context, files_context
+        )
+        route = self._resolve_route(provider, model)
+        served = {}
         
+        chunks = []
         try:
-            # Chamar LLM
-            response_text = self._call_llm(system_prompt, user_prompt)
+            for chunk in self._stream_llm(system_prompt, user_prompt, use_cache=use_cache,
+                                          route=route, served=served, task_id=task_id):
+                chunks.append(chunk)
+                yield {"type": "token", "content": chunk}
+            response_text = "".join(chunks)
             success = True
             
         except Exception as e:
             response_text = f"Erro ao processar: {str(e)}"
             success = False
         
+        yield {
+            "type": "result",
+            "result": self._finalize_task(task_id, task_description, response_text, success, start_time,
+                                          (served.get("provider", route[0]), served.get("model", route[1])))
+        }
+    
+    def _prepare_task(self,
+                      task_description: str,
+                      context: Optional[str] = None,
+                      files_context: Optional[List[str]] = None) -> Tuple[str, float, str, str]:
+        """Gera o task_id e constrói os prompts da tarefa"""
+        # Sufixo aleatório evita colisão entre tarefas concorrentes no mesmo segundo
+        task_id = f"task_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+        start_time = time.time()
+        
+        # Construir prompt
+        system_prompt = self._build_system_prompt()
+        user_prompt = self._build_user_prompt(task_description, context, files_context)
+        
+        return task_id, start_time, system_prompt, user_prompt
+    
+    def _finalize_task(self,
+                       task_id: str,
+                       task_description: str,
+                       response_text: str,
+                       success: bool,
+                       start_time: float,
+                       served_by: Tuple[str, str]) -> Dict:
+        """Extrai aprendizados, registra a evolução e monta o resultado da tarefa"""
         # Extrair aprendizados
         learning_points = self.extract_learning_points(task_description, response_text)
         
@@ -212,12 +339,11 @@ class EvolutionaryAgent:
             version=self.version
         )
         
-        self.evolution_history.append(evolution)
-        self._save_evolution_history()
-        
-        # Atualizar knowledge base
-        if success:
-            self.knowledge_base[task_id] = response_text[:1000]
+        # Persistir evolução e atualizar knowledge base
+        evolution_count = self._record_evolution(
+            evolution,
+            knowledge=response_text[:1000] if success else None
+        )
         
         elapsed_time = time.time() - start_time
         
@@ -228,7 +354,9 @@ class EvolutionaryAgent:
             "learning_points": learning_points,
             "elapsed_time": round(elapsed_time, 2),
             "timestamp": datetime.now().isoformat(),
-            "evolution_count": len(self.evolution_history)
+            "evolution_count": evolution_count,
+            "provider": served_by[0],
+            "model": served_by[1]
         }
     
     def _build_system_prompt(self) -> str:
@@ -251,13 +379,17 @@ Responda sempre em Markdown estruturado, com exemplos quando apropriado.
 """
         
         # Adicionar aprendizados do histórico
-        if self.evolution_history:
+        with self._lock:
+            recent_history = self.evolution_history[-20:]
+        
+        if recent_history:
             recent_learnings = set()
-            for evo in self.evolution_history[-20:]:
+            for evo in recent_history:
                 recent_learnings.update(evo.learning_points)
             
             if recent_learnings:
-                base_prompt += f"\nAprendizados Recentes: {', '.join(recent_learnings)}\n"
+                # Ordenado para o prompt ser determinístico
+                base_prompt += f"{LEARNINGS_MARKER}{', '.join(sorted(recent_learnings))}\n"
         
         return base_prompt
     
@@ -283,54 +415,228 @@ Responda sempre em Markdown estruturado, com exemplos quando apropriado.
         
         return prompt
     
-    def _call_llm(self, system_prompt: str, user_prompt: str) -> str:
+    def _call_llm(self, system_prompt: str, user_prompt: str, use_cache: bool = True,
+                  route: Optional[Tuple[str, str, object]] = None,
+                  served: Optional[Dict] = None,
+                  task_id: Optional[str] = None) -> str:
         """
         Chama a API do LLM baseado no provedor configurado
         
         Suporta: OpenAI, Anthropic, Gemini, DeepSeek, OpenRouter
+        Respostas idênticas são servidas do cache quando use_cache=True.
+        Falhas e lentidão do provedor são tratadas pelo LLMRouter; o
+        provedor/modelo que respondeu é gravado em ``served``. O uso de
+        tokens de cada chamada ao provedor é registrado em ``token_usage``.
+        O cache é lido e gravado na chave da rota pedida, mesmo que outro
+        provedor tenha respondido via failover; a entrada guarda quem
+        respondeu, e um hit informa esse provedor/modelo em ``served``.
+        """
+        route = route or self._current_route()
+        provider, model_name, client = route
+        served = served if served is not None else {}
+        served.update(provider=provider, model=model_name)
+        
+        if not client and not self.router.failover:
+            return f"⚠️ Cliente {provider} não configurado. Configure a API key no .env"
+        
+        cache_key = self._cache_key(provider, model_name, system_prompt, user_prompt)
+        if self.response_cache is not None and use_cache:
+            cached = self.response_cache.get_entry(cache_key)
+            if cached is not None:
+                served.update(provider=cached["provider"] or provider, model=cached["model"] or model_name)
+                return cached["response"]
+        
+        response_text, (served_provider, served_model, _) = self.router.call(
+            route,
+            lambda p, m, c: self._request_completion(p, m, c, system_prompt, user_prompt, task_id)
+        )
+        served.update(provider=served_provider, model=served_model)
+        
+        # Mesmo com bypass, a resposta nova atualiza o cache
+        if self.response_cache is not None and response_text:
+            self.response_cache.set(cache_key, response_text, served_provider, served_model)
+        
+        return response_text
+    
+    def _cache_key(self, provider: str, model_name: str, system_prompt: str, user_prompt: str) -> str:
+        """
+        Chave do cache de respostas sem os aprendizados recentes
+
+        A lista de aprendizados muda a cada tarefa registrada; incluí-la na
+        chave faria o cache errar sempre. Vale o template estável do prompt.
+        """
+        template = system_prompt.split(LEARNINGS_MARKER, 1)[0]
+        return ResponseCache.make_key(provider, model_name, template, user_prompt, self.temperature)
+    
+    def _stream_llm(self, system_prompt: str, user_prompt: str, use_cache: bool = True,
+                    route: Optional[Tuple[str, str, object]] = None,
+                    served: Optional[Dict] = None,
+                    task_id: Optional[str] = None) -> Iterator[str]:
         """
-        if not self.client:
-            return f"⚠️ Cliente {self.provider} não configurado. Configure a API key no .env"
+        Variante de _call_llm que emite a resposta em trechos
         
+        Respostas em cache são emitidas de uma vez; respostas novas são
+        gravadas no cache somente após o stream completar. O failover só
+        ocorre antes do primeiro trecho.
+        """
+        route = route or self._current_route()
+        provider, model_name, client = route
+        served = served if served is not None else {}
+        served.update(provider=provider, model=model_name)
+        
+        if not client and not self.router.failover:
+            yield f"⚠️ Cliente {provider} não configurado. Configure a API key no .env"
+            return
+        
+        cache_key = self._cache_key(provider, model_name, system_prompt, user_prompt)
+        if self.response_cache is not None and use_cache:
+            cached = self.response_cache.get_entry(cache_key)
+            if cached is not None:
+                served.update(provider=cached["provider"] or provider, model=cached["model"] or model_name)
+                yield cached["response"]
+                return
+        
+        chunks = []
+        for chunk in self.router.stream(
+            route,
+            lambda p, m, c: self._request_completion_stream(p, m, c, system_prompt, user_prompt, task_id),
+            served=served
+        ):
+            chunks.append(chunk)
+            yield chunk
+        
+        response_text = "".join(chunks)
+        if self.response_cache is not None and response_text:
+            self.response_cache.set(cache_key, response_text, served["provider"], served["model"])
+    
+    def _record_usage(self, provider: str, model_name: str, input_tokens: Optional[int],
+                      output_tokens: Optional[int], task_id: Optional[str] = None):
+        """Registra os tokens de uma chamada; falhas de registro não afetam a tarefa"""
+        if self.token_usage is None or input_tokens is None:
+            return
+        try:
+            self.token_usage.log_usage(provider, model_name, int(input_tokens),
+                                       int(output_tokens or 0), task_id=task_id)
+        except Exception as e:
+            print(f"⚠️ Erro ao registrar uso de tokens: {e}")
+    
+    def _request_completion_stream(self, provider: str, model_name: str, client: object,
+                                   system_prompt: str, user_prompt: str,
+                                   task_id: Optional[str] = None) -> Iterator[str]:
+        """Executa a chamada de completion em modo streaming no SDK do provedor"""
         try:
-            if self.provider in ["openai", "deepseek", "openrouter"]:
+            if provider in ["openai", "deepseek", "openrouter"]:
+                # OpenAI-compatible API (include_usage envia o uso no último chunk)
+                stream = client.chat.completions.create(
+                    model=model_name,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=self.temperature,
+                    max_tokens=2000,
+                    stream=True,
+                    stream_options={"include_usage": True}
+                )
+                usage = None
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+                    if getattr(chunk, "usage", None):
+                        usage = chunk.usage
+                if usage:
+                    self._record_usage(provider, model_name, usage.prompt_tokens,
+                                       usage.completion_tokens, task_id)
+            
+            elif provider == "anthropic":
+                # Anthropic Claude API
+                with client.messages.stream(
+                    model=model_name,
+                    max_tokens=2000,
+                    temperature=self.temperature,
+                    system=system_prompt,
+                    messages=[
+                        {"role": "user", "content": user_prompt}
+                    ]
+                ) as stream:
+                    for text in stream.text_stream:
+                        yield text
+                    usage = stream.get_final_message().usage
+                self._record_usage(provider, model_name, usage.input_tokens,
+                                   usage.output_tokens, task_id)
+            
+            elif provider == "gemini":
+                # Google Gemini API (usage_metadata acumulado no último chunk)
+                model = client.GenerativeModel(model_name)
+                prompt = f"{system_prompt}\n\n{user_prompt}"
+                usage = None
+                for chunk in model.generate_content(prompt, stream=True):
+                    if chunk.text:
+                        yield chunk.text
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                if usage:
+                    self._record_usage(provider, model_name, usage.prompt_token_count,
+                                       usage.candidates_token_count, task_id)
+            
+            else:
+                raise ValueError(f"Provedor não suportado: {provider}")
+            
+        except Exception as e:
+            raise Exception(f"Erro ao chamar {provider}: {str(e)}")
+    
+    def _request_completion(self, provider: str, model_name: str, client: object,
+                            system_prompt: str, user_prompt: str,
+                            task_id: Optional[str] = None) -> str:
+        """Executa a chamada de completion no SDK do provedor e registra o uso de tokens"""
+        try:
+            if provider in ["openai", "deepseek", "openrouter"]:
                 # OpenAI-compatible API
-                response = self.client.chat.completions.create(
-                    model=self.model,
+                response = client.chat.completions.create(
+                    model=model_name,
                     messages=[
                         {"role": "system", "content": system_prompt},
                         {"role": "user", "content": user_prompt}
                     ],
-                    temperature=0.7,
+                    temperature=self.temperature,
                     max_tokens=2000
                 )
+                usage = getattr(response, "usage", None)
+                if usage:
+                    self._record_usage(provider, model_name, usage.prompt_tokens,
+                                       usage.completion_tokens, task_id)
                 return response.choices[0].message.content
             
-            elif self.provider == "anthropic":
+            elif provider == "anthropic":
                 # Anthropic Claude API
-                response = self.client.messages.create(
-                    model=self.model,
+                response = client.messages.create(
+                    model=model_name,
                     max_tokens=2000,
-                    temperature=0.7,
+                    temperature=self.temperature,
                     system=system_prompt,
                     messages=[
                         {"role": "user", "content": user_prompt}
                     ]
                 )
+                self._record_usage(provider, model_name, response.usage.input_tokens,
+                                   response.usage.output_tokens, task_id)
                 return response.content[0].text
             
-            elif self.provider == "gemini":
+            elif provider == "gemini":
                 # Google Gemini API
-                model = self.client.GenerativeModel(self.model)
+                model = client.GenerativeModel(model_name)
                 prompt = f"{system_prompt}\n\n{user_prompt}"
                 response = model.generate_content(prompt)
+                usage = getattr(response, "usage_metadata", None)
+                if usage:
+                    self._record_usage(provider, model_name, usage.prompt_token_count,
+                                       usage.candidates_token_count, task_id)
                 return response.text
             
             else:
-                raise ValueError(f"Provedor não suportado: {self.provider}")
+                raise ValueError(f"Provedor não suportado: {provider}")
             
         except Exception as e:
-            raise Exception(f"Erro ao chamar {self.provider}: {str(e)}")
+            raise Exception(f"Erro ao chamar {provider}: {str(e)}")
     
     def change_provider(self, provider: str, model: str, api_key: Optional[str] = None):
         """
@@ -341,37 +647,68 @@ Responda sempre em Markdown estruturado, com exemplos quando apropriado.
             model: Modelo a usar no novo provedor
             api_key: API key opcional (se não fornecido, busca do .env)
         """
-        self.provider = provider.lower()
-        self.model = model
-        self._init_provider_client(api_key)
+        provider = provider.lower()
+        
+        # Constrói o novo cliente fora do lock e troca a rota de uma vez,
+        # para que tarefas em andamento nunca vejam provider/model/client misturados
+        client, resolved_key = self._build_provider_client(provider, api_key)
+        with self._lock:
+            self.provider = provider
+            self.model = model
+            self.client = client
+            self.api_key = resolved_key
         
         return {
-            "status": "success" if self.client else "error",
-            "provider": self.provider,
-            "model": self.model,
-            "client_initialized": bool(self.client)
+            "status": "success" if client else "error",
+            "provider": provider,
+            "model": model,
+            "client_initialized": bool(client)
         }
     
     def get_stats(self) -> Dict:
         """Retorna estatísticas do agente"""
-        successful = sum(1 for e in self.evolution_history if e.success)
-        failed = len(self.evolution_history) - successful
+        with self._lock:
+            history = list(self.evolution_history)
+            knowledge_entries = len(self.knowledge_base)
+            provider, model = self.provider, self.model
+        
+        successful = sum(1 for e in history if e.success)
+        failed = len(history) - successful
         
         return {
             "version": self.version,
             "created_at": self.created_at,
-            "provider": self.provider,
-            "model": self.model,
-            "total_tasks": len(self.evolution_history),
+            "provider": provider,
+            "model": model,
+            "total_tasks": len(history),
             "successful": successful,
             "failed": failed,
-            "success_rate": f"{(successful/len(self.evolution_history)*100):.1f}%" if self.evolution_history else "N/A",
-            "knowledge_entries": len(self.knowledge_base),
-            "learning_areas": list(set(lp for e in self.evolution_history for lp in e.learning_points))
+            "success_rate": f"{(successful/len(history)*100):.1f}%" if history else "N/A",
+            "knowledge_entries": knowledge_entries,
+            "learning_areas": list(set(lp for e in history for lp in e.learning_points)),
+            "cache": self.response_cache.stats() if self.response_cache else {"enabled": False},
+            "clients": provider_registry.stats(),
+            "routing": self.router.stats(),
+            "token_usage": self._usage_summary()
+        }
+    
+    def _usage_summary(self) -> Dict:
+        """Totais de tokens e custo a partir dos acumulados diários"""
+        if self.token_usage is None:
+            return {"enabled": False}
+        usage = self.token_usage.get_usage_stats()
+        return {
+            "total_requests": usage["total_requests"],
+            "total_tokens": usage.get("total_tokens", 0),
+            "total_cost": round(usage["total_cost"], 6),
+            "currency": "USD"
         }
     
     def get_evolution_timeline(self, limit: int = 20) -> List[Dict]:
         """Retorna timeline de evolução"""
+        with self._lock:
+            recent_history = self.evolution_history[-limit:]
+        
         return [
             {
                 "timestamp": e.timestamp,
@@ -380,16 +717,32 @@ Responda sempre em Markdown estruturado, com exemplos quando apropriado.
                 "success": e.success,
                 "learnings": e.learning_points
             }
-            for e in self.evolution_history[-limit:]
+            for e in recent_history
         ]
     
+    def search_knowledge(self, query: str, limit: int = 20) -> List[Dict]:
+        """
+        Busca na base de conhecimento (índice invertido, ranking BM25)
+        
+        Args:
+            query: Termos de busca (acentos e maiúsculas são ignorados)
+            limit: Número máximo de resultados
+        
+        Returns:
+            Lista de resultados com task_id, score, excerpt e highlight
+        """
+        return self.knowledge_index.search(query, limit=limit)
+    
     def export_knowledge(self, format: str = "json") -> str:
         """Exporta base de conhecimento"""
+        with self._lock:
+            knowledge_base = dict(self.knowledge_base)
+        
         if format == "json":
-            return json.dumps(self.knowledge_base, indent=2, ensure_ascii=False)
+            return json.dumps(knowledge_base, indent=2, ensure_ascii=False)
         elif format == "markdown":
             md = "# Base de Conhecimento do Prometheus\n\n"
-            for task_id, content in self.knowledge_base.items():
+            for task_id, content in knowledge_base.items():
                 md += f"## {task_id}\n\n{content}\n\n"
             return md
         else:
@@ -397,6 +750,7 @@ Responda sempre em Markdown estruturado, com exemplos quando apropriado.
 
 
 # Exemplo de uso
+# Demonstração: python -m app.agents.evolutionary_agent (a partir de 03_INFRAESTRUTURA)
 if __name__ == "__main__":
     agent = EvolutionaryAgent()
     
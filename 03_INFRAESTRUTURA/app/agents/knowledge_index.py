@@ -0,0 +1,207 @@
+"""
+Prometheus Knowledge Index
+Índice invertido incremental com ranking BM25 para a base de conhecimento
+"""
+
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+from bisect import bisect_left
+from typing import Dict, List, Optional, Set, Tuple
+
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Stopwords frequentes em português/inglês que não ajudam no ranking
+STOPWORDS = {
+    "a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "em", "no",
+    "na", "nos", "nas", "um", "uma", "para", "por", "com", "que", "se",
+    "ao", "the", "of", "and", "to", "in", "is", "for", "on", "with",
+}
+
+
+@lru_cache(maxsize=8192)
+def _fold_char(char: str) -> str:
+    """Remove acentos de um caractere preservando o comprimento (1 → 1)"""
+    decomposed = unicodedata.normalize("NFKD", char)
+    base = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return base[0].lower() if base else char.lower()
+
+
+def fold_text(text: str) -> str:
+    """Minúsculas e sem acentos, com os mesmos offsets do texto original"""
+    return "".join(_fold_char(c) for c in text)
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokeniza texto para busca: normaliza acentos/maiúsculas e remove stopwords"""
+    return [
+        token for token in TOKEN_PATTERN.findall(fold_text(text))
+        if token not in STOPWORDS
+    ]
+
+
+class KnowledgeIndex:
+    """
+    Índice invertido da knowledge base do agente
+
+    - Postings: termo → {doc_id: frequência}
+    - Ranking BM25 (k1, b configuráveis)
+    - Atualização incremental via add()/remove()
+    - Termos sem match exato são expandidos por prefixo ("integr" → "integracao")
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._documents: Dict[str, str] = {}
+        self._total_length = 0
+        self._sorted_terms: Optional[List[str]] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    # ==================== MANUTENÇÃO ====================
+
+    def add(self, doc_id: str, content: str) -> None:
+        """Indexa (ou reindexa) um documento"""
+        tokens = tokenize(content)
+        frequencies: Dict[str, int] = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+
+        with self._lock:
+            self._remove(doc_id)
+            for term, count in frequencies.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    self._sorted_terms = None
+                postings[doc_id] = count
+            self._doc_lengths[doc_id] = len(tokens)
+            self._documents[doc_id] = content
+            self._total_length += len(tokens)
+
+    def remove(self, doc_id: str) -> None:
+        """Remove um documento do índice"""
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: str) -> None:
+        content = self._documents.pop(doc_id, None)
+        if content is None:
+            return
+        self._total_length -= self._doc_lengths.pop(doc_id, 0)
+        for term in set(tokenize(content)):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+                self._sorted_terms = None
+
+    def rebuild(self, documents: Dict[str, str]) -> None:
+        """Reconstrói o índice a partir de um dicionário doc_id → conteúdo"""
+        with self._lock:
+            self._postings.clear()
+            self._doc_lengths.clear()
+            self._documents.clear()
+            self._total_length = 0
+            self._sorted_terms = None
+            for doc_id, content in documents.items():
+                self.add(doc_id, content)
+
+    # ==================== BUSCA ====================
+
+    def _expand_term(self, term: str) -> List[str]:
+        """Retorna o próprio termo ou, sem match exato, os termos com esse prefixo"""
+        if term in self._postings:
+            return [term]
+
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+        terms = self._sorted_terms
+        expanded = []
+        position = bisect_left(terms, term)
+        while position < len(terms) and terms[position].startswith(term):
+            expanded.append(terms[position])
+            position += 1
+        return expanded
+
+    def search(self, query: str, limit: int = 20, snippet_size: int = 200) -> List[Dict]:
+        """
+        Busca documentos ranqueados por BM25
+
+        Returns:
+            Lista de dicts com task_id, score, excerpt e highlight (termos em **negrito**)
+        """
+        query_terms = tokenize(query)
+        if not query_terms:
+            return []
+
+        with self._lock:
+            doc_count = len(self._doc_lengths)
+            if not doc_count:
+                return []
+            avg_length = self._total_length / doc_count
+
+            scores: Dict[str, float] = {}
+            matched_terms: Set[str] = set()
+            for query_term in query_terms:
+                for term in self._expand_term(query_term):
+                    postings = self._postings[term]
+                    matched_terms.add(term)
+                    idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for doc_id, frequency in postings.items():
+                        length_norm = 1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length
+                        scores[doc_id] = scores.get(doc_id, 0.0) + idf * (
+                            frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+                        )
+
+            ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            documents = [(doc_id, score, self._documents[doc_id]) for doc_id, score in ranked]
+
+        return [
+            {
+                "task_id": doc_id,
+                "score": round(score, 4),
+                "excerpt": content[:snippet_size],
+                "highlight": self._highlight(content, matched_terms, snippet_size)
+            }
+            for doc_id, score, content in documents
+        ]
+
+    @staticmethod
+    def _highlight(content: str, terms: Set[str], snippet_size: int) -> str:
+        """Recorta um trecho ao redor do primeiro termo encontrado e marca os termos"""
+        folded = fold_text(content)
+        spans: List[Tuple[int, int]] = [
+            match.span() for match in TOKEN_PATTERN.finditer(folded)
+            if match.group() in terms
+        ]
+        if not spans:
+            return content[:snippet_size]
+
+        start = max(0, spans[0][0] - snippet_size // 4)
+        end = min(len(content), start + snippet_size)
+
+        pieces = []
+        cursor = start
+        for span_start, span_end in spans:
+            if span_start < cursor or span_end > end:
+                continue
+            pieces.append(content[cursor:span_start])
+            pieces.append(f"**{content[span_start:span_end]}**")
+            cursor = span_end
+        pieces.append(content[cursor:end])
+
+        prefix = "..." if start > 0 else ""
+        suffix = "..." if end < len(content) else ""
+        return prefix + "".join(pieces) + suffix
@@ -0,0 +1,308 @@
+"""
+Prometheus LLM Router
+Failover entre provedores, requisições hedged e latência p50/p95 por provedor
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from .provider_registry import DEFAULT_MODELS, PROVIDER_KEY_ENV, provider_registry
+
+
+Route = Tuple[str, str, object]
+
+
+class ProviderHealth:
+    """Janela de latências e erros recentes de um provedor"""
+
+    def __init__(self, window: int = 100):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.cooldown_until = 0.0
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Percentil das latências da janela (None sem amostras)"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        position = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[position]
+
+
+class LLMRouter:
+    """
+    Camada de roteamento sobre os provedores suportados
+
+    - Failover (opt-in): erro no provedor principal tenta o próximo provedor
+      saudável; clientes alternativos só são obtidos quando usados
+    - Hedging: se a resposta passa do p95 do provedor, dispara um segundo
+      provedor e usa a primeira resposta (PROMETHEUS_LLM_HEDGE=1; independe
+      do failover). Só em call(): stream() nunca faz hedge
+    - Saúde: ``max_consecutive_errors`` falhas seguidas tiram o provedor de
+      rota por ``cooldown_seconds``
+    - Ordem dos alternativos: menor p50 primeiro
+    """
+
+    def __init__(self,
+                 failover: Optional[bool] = None,
+                 hedge: Optional[bool] = None,
+                 hedge_percentile: float = 95.0,
+                 hedge_min_samples: int = 20,
+                 hedge_after: Optional[float] = None,
+                 max_consecutive_errors: int = 3,
+                 cooldown_seconds: float = 30.0,
+                 fallbacks: Optional[List[str]] = None,
+                 window: int = 100):
+        """
+        Args:
+            failover: Tenta outros provedores em caso de erro (PROMETHEUS_LLM_FAILOVER, padrão 0)
+            hedge: Ativa requisições hedged (PROMETHEUS_LLM_HEDGE, padrão 0)
+            hedge_percentile: Percentil de latência que dispara o hedge
+            hedge_min_samples: Amostras mínimas antes de confiar no percentil
+            hedge_after: Limite fixo em segundos usado até haver amostras
+                (PROMETHEUS_LLM_HEDGE_AFTER, padrão 10)
+            max_consecutive_errors: Erros seguidos até o cooldown
+            cooldown_seconds: Tempo fora de rota após falhas seguidas
+            fallbacks: Provedores alternativos (PROMETHEUS_LLM_FALLBACKS, padrão: todos)
+            window: Latências mantidas por provedor
+        """
+        self.failover = failover if failover is not None else os.getenv("PROMETHEUS_LLM_FAILOVER", "0") == "1"
+        self.hedge = hedge if hedge is not None else os.getenv("PROMETHEUS_LLM_HEDGE", "0") == "1"
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_after = hedge_after or float(os.getenv("PROMETHEUS_LLM_HEDGE_AFTER", "10"))
+        self.max_consecutive_errors = max_consecutive_errors
+        self.cooldown_seconds = cooldown_seconds
+
+        if fallbacks is None:
+            configured = os.getenv("PROMETHEUS_LLM_FALLBACKS", "")
+            fallbacks = [p.strip().lower() for p in configured.split(",") if p.strip()] or list(PROVIDER_KEY_ENV)
+        self.fallbacks = fallbacks
+
+        self._health: Dict[str, ProviderHealth] = {p: ProviderHealth(window) for p in PROVIDER_KEY_ENV}
+        self._counters = {"failovers": 0, "hedges": 0, "hedge_wins": 0}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("PROMETHEUS_LLM_HEDGE_WORKERS", "16")),
+            thread_name_prefix="prometheus-llm"
+        )
+
+    # ==================== SAÚDE ====================
+
+    def _record(self, provider: str, latency: Optional[float]) -> None:
+        """Registra sucesso (latência) ou erro (None) de uma chamada"""
+        with self._lock:
+            health = self._health.setdefault(provider, ProviderHealth())
+            health.requests += 1
+            if latency is None:
+                health.errors += 1
+                health.consecutive_errors += 1
+                if health.consecutive_errors >= self.max_consecutive_errors:
+                    health.cooldown_until = time.time() + self.cooldown_seconds
+            else:
+                health.latencies.append(latency)
+                health.consecutive_errors = 0
+                health.cooldown_until = 0.0
+
+    def _healthy(self, provider: str) -> bool:
+        return self._health.get(provider, ProviderHealth()).cooldown_until <= time.time()
+
+    def _hedge_threshold(self, provider: str) -> float:
+        """p95 do provedor ou o limite fixo enquanto houver poucas amostras"""
+        with self._lock:
+            health = self._health.get(provider)
+            if health is None or len(health.latencies) < self.hedge_min_samples:
+                return self.hedge_after
+            return health.percentile(self.hedge_percentile)
+
+    # ==================== ROTAS ====================
+
+    def candidates(self, route: Route) -> List[Route]:
+        """
+        Rotas a tentar, na ordem: principal (se saudável) e alternativos por p50
+
+        O provedor principal em cooldown vai para o fim da lista, para ainda
+        ser tentado caso nenhum alternativo responda. Alternativos entram sem
+        cliente (None); _connected() o obtém do registro só se forem usados.
+        Sem failover, os alternativos só servem de backup do hedge e o
+        principal fica sempre em primeiro.
+        """
+        provider = route[0]
+        routes = [route] if route[2] else []
+        if not routes or not (self.failover or self.hedge):
+            return routes
+
+        alternatives = []
+        for name in self.fallbacks:
+            if name == provider or not self._healthy(name) or not provider_registry.resolve_key(name):
+                continue
+            alternatives.append((name, DEFAULT_MODELS[name], None))
+
+        with self._lock:
+            alternatives.sort(key=lambda r: self._health[r[0]].percentile(50) or float("inf"))
+
+        if self.failover and not self._healthy(provider):
+            return alternatives + routes
+        return routes + alternatives
+
+    def _connected(self, routes: List[Route]) -> Iterator[Route]:
+        """Percorre as rotas obtendo do registro o cliente dos alternativos"""
+        for route in routes:
+            if route[2] is None:
+                client, _ = provider_registry.get(route[0])
+                if not client:
+                    continue
+                route = (route[0], route[1], client)
+            yield route
+
+    def _unavailable(self, route: Route, errors: List[str]) -> RuntimeError:
+        if errors:
+            return RuntimeError("; ".join(errors))
+        return RuntimeError(f"Nenhum provedor disponível ({route[0]} sem cliente). Configure a API key no .env")
+
+    def call(self, route: Route, request: Callable[[str, str, object], str]) -> Tuple[str, Route]:
+        """
+        Executa ``request(provider, model, client)`` com failover e hedging
+
+        Returns:
+            Tupla (resposta, rota que respondeu)
+        """
+        pending = self._connected(self.candidates(route))
+        primary = next(pending, None)
+
+        errors = []
+        while primary is not None:
+            backup = next(pending, None) if self.hedge else None
+            try:
+                if backup is None:
+                    return self._timed(primary, request), primary
+                return self._hedged(primary, backup, request)
+            except Exception as e:
+                errors.append(str(e) if backup else f"{primary[0]}: {e}")
+                if not self.failover:
+                    break
+                primary = next(pending, None)
+                if primary is not None:
+                    with self._lock:
+                        self._counters["failovers"] += 1
+
+        raise self._unavailable(route, errors)
+
+    def _timed(self, route: Route, request: Callable[[str, str, object], str]) -> str:
+        """Chama o provedor registrando latência ou erro"""
+        start = time.time()
+        try:
+            response = request(*route)
+        except Exception:
+            self._record(route[0], None)
+            raise
+        self._record(route[0], time.time() - start)
+        return response
+
+    def _hedged(self, primary: Route, backup: Route,
+                request: Callable[[str, str, object], str]) -> Tuple[str, Route]:
+        """
+        Dispara o backup se o principal passar do limiar; vence a primeira resposta
+
+        Se o principal falhar antes do limiar, o backup é disparado na hora.
+        """
+        futures = {self._executor.submit(self._timed, primary, request): primary}
+        done, _ = wait(futures, timeout=self._hedge_threshold(primary[0]))
+
+        if not done:
+            with self._lock:
+                self._counters["hedges"] += 1
+            futures[self._executor.submit(self._timed, backup, request)] = backup
+
+        pending = set(futures)
+        errors = []
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if futures[future] is backup:
+                        with self._lock:
+                            self._counters["hedge_wins"] += 1
+                    # A chamada perdedora termina em segundo plano e só alimenta as métricas
+                    return future.result(), futures[future]
+                errors.append(f"{futures[future][0]}: {future.exception()}")
+                if len(futures) == 1:
+                    backup_future = self._executor.submit(self._timed, backup, request)
+                    futures[backup_future] = backup
+                    pending.add(backup_future)
+
+        raise RuntimeError("; ".join(errors))
+
+    def stream(self, route: Route,
+               request: Callable[[str, str, object], Iterator[str]],
+               served: Optional[Dict] = None) -> Iterator[str]:
+        """
+        Variante de call() para streaming
+
+        O failover só acontece antes do primeiro trecho; depois disso um
+        erro é repassado, pois parte da resposta já foi entregue. Não há
+        hedge: trechos de dois provedores não podem ser misturados.
+        """
+        routes = self.candidates(route)
+        if not self.failover:
+            routes = routes[:1]
+
+        errors = []
+        for candidate in self._connected(routes):
+            if errors:
+                with self._lock:
+                    self._counters["failovers"] += 1
+            start = time.time()
+            try:
+                chunks = request(*candidate)
+                first = next(chunks, None)
+            except Exception as e:
+                self._record(candidate[0], None)
+                errors.append(f"{candidate[0]}: {e}")
+                continue
+
+            if served is not None:
+                served.update(provider=candidate[0], model=candidate[1])
+            try:
+                if first is not None:
+                    yield first
+                yield from chunks
+            except Exception:
+                self._record(candidate[0], None)
+                raise
+            self._record(candidate[0], time.time() - start)
+            return
+
+        raise self._unavailable(route, errors)
+
+    # ==================== ESTATÍSTICAS ====================
+
+    def stats(self) -> Dict:
+        """Latência p50/p95, erros e estado de cada provedor"""
+        with self._lock:
+            providers = {}
+            for name, health in self._health.items():
+                if not health.requests:
+                    continue
+                p50, p95 = health.percentile(50), health.percentile(95)
+                providers[name] = {
+                    "requests": health.requests,
+                    "errors": health.errors,
+                    "p50_latency": round(p50, 3) if p50 is not None else None,
+                    "p95_latency": round(p95, 3) if p95 is not None else None,
+                    "healthy": health.cooldown_until <= time.time()
+                }
+            counters = dict(self._counters)
+
+        return {
+            "failover": self.failover,
+            "hedge": self.hedge,
+            **counters,
+            "providers": providers
+        }
@@ -0,0 +1,243 @@
+"""
+Prometheus Provider Registry
+Registro de clientes de LLM reutilizáveis, com pool de conexões keep-alive por provedor
+"""
+
+import os
+import hashlib
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    from openai import OpenAI
+except ImportError:
+    OpenAI = None
+
+try:
+    from anthropic import Anthropic
+except ImportError:
+    Anthropic = None
+
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+
+
+# Base URL por provedor (None = endpoint padrão do SDK)
+PROVIDER_BASE_URLS = {
+    "openai": None,
+    "anthropic": None,
+    "gemini": None,
+    "deepseek": "https://api.deepseek.com/v1",
+    "openrouter": "https://openrouter.ai/api/v1",
+}
+
+# Modelo usado quando uma tarefa escolhe o provedor sem informar o modelo
+DEFAULT_MODELS = {
+    "openai": "gpt-4o-mini",
+    "anthropic": "claude-3-5-haiku-latest",
+    "gemini": "gemini-1.5-flash",
+    "deepseek": "deepseek-chat",
+    "openrouter": "openai/gpt-4o-mini",
+}
+
+PROVIDER_KEY_ENV = {
+    "openai": "OPENAI_API_KEY",
+    "anthropic": "ANTHROPIC_API_KEY",
+    "gemini": "GEMINI_API_KEY",
+    "deepseek": "DEEPSEEK_API_KEY",
+    "openrouter": "OPENROUTER_API_KEY",
+}
+
+
+class GeminiClient:
+    """
+    Adaptador do SDK do Gemini
+
+    ``genai.configure`` é global ao processo; o adaptador reconfigura apenas
+    quando a chave muda e mantém um GenerativeModel por modelo.
+    """
+
+    _configure_lock = threading.Lock()
+    _configured_key: Optional[str] = None
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        self._models: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _ensure_configured(self) -> None:
+        with GeminiClient._configure_lock:
+            if GeminiClient._configured_key != self.api_key:
+                genai.configure(api_key=self.api_key)
+                GeminiClient._configured_key = self.api_key
+                # Modelos criados com outra chave precisam ser recriados
+                self._models.clear()
+
+    def GenerativeModel(self, model_name: str):
+        """Retorna o GenerativeModel do modelo, criando-o apenas na primeira vez"""
+        self._ensure_configured()
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None:
+                model = self._models[model_name] = genai.GenerativeModel(model_name)
+            return model
+
+    @property
+    def cached_models(self) -> int:
+        return len(self._models)
+
+
+class ProviderClientRegistry:
+    """
+    Registro de clientes por (provider, base_url, api key)
+
+    Cada cliente é construído uma única vez e mantém seu próprio pool de
+    conexões keep-alive; trocar de provedor apenas seleciona outra entrada.
+    """
+
+    def __init__(self,
+                 max_connections: Optional[int] = None,
+                 keepalive_expiry: float = 60.0,
+                 timeout: float = 120.0):
+        """
+        Args:
+            max_connections: Conexões simultâneas por cliente (PROMETHEUS_LLM_POOL_SIZE)
+            keepalive_expiry: Segundos que uma conexão ociosa fica aberta
+            timeout: Timeout das requisições em segundos
+        """
+        self.max_connections = max_connections or int(os.getenv("PROMETHEUS_LLM_POOL_SIZE", "20"))
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self._entries: Dict[Tuple[str, Optional[str], str], Dict] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def resolve_key(provider: str, api_key: Optional[str] = None) -> Optional[str]:
+        """Usa a chave informada ou a variável de ambiente do provedor"""
+        if provider not in PROVIDER_KEY_ENV:
+            raise ValueError(f"Provedor não suportado: {provider}")
+        return api_key or os.getenv(PROVIDER_KEY_ENV[provider])
+
+    @staticmethod
+    def _fingerprint(api_key: str) -> str:
+        """Identifica a chave sem guardá-la em texto nas estatísticas"""
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+    def _http_client(self):
+        """Cliente httpx com pool keep-alive dimensionado para o registro"""
+        if httpx is None:
+            return None
+        return httpx.Client(
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+        )
+
+    def _build(self, provider: str, base_url: Optional[str], api_key: str):
+        """Constrói o cliente do SDK (ou None se a dependência não estiver instalada)"""
+        if provider in ("openai", "deepseek", "openrouter"):
+            if not OpenAI:
+                return None
+            kwargs = {"api_key": api_key}
+            if base_url:
+                kwargs["base_url"] = base_url
+            http_client = self._http_client()
+            if http_client is not None:
+                kwargs["http_client"] = http_client
+            return OpenAI(**kwargs)
+
+        if provider == "anthropic":
+            if not Anthropic:
+                return None
+            kwargs = {"api_key": api_key}
+            http_client = self._http_client()
+            if http_client is not None:
+                kwargs["http_client"] = http_client
+            return Anthropic(**kwargs)
+
+        if provider == "gemini":
+            return GeminiClient(api_key) if genai else None
+
+        raise ValueError(f"Provedor não suportado: {provider}")
+
+    def get(self, provider: str, api_key: Optional[str] = None) -> Tuple[object, Optional[str]]:
+        """
+        Retorna o cliente aquecido do provedor, construindo-o na primeira vez
+
+        Returns:
+            Tupla (cliente ou None, api key resolvida)
+        """
+        provider = provider.lower()
+        api_key = self.resolve_key(provider, api_key)
+        if not api_key:
+            return None, None
+
+        base_url = PROVIDER_BASE_URLS[provider]
+        key = (provider, base_url, self._fingerprint(api_key))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                client = self._build(provider, base_url, api_key)
+                if client is None:
+                    return None, api_key
+                entry = self._entries[key] = {
+                    "client": client,
+                    "created_at": datetime.now().isoformat(),
+                    "last_selected": None,
+                    "selections": 0,
+                }
+            entry["selections"] += 1
+            entry["last_selected"] = datetime.now().isoformat()
+            return entry["client"], api_key
+
+    def stats(self) -> Dict:
+        """Estatísticas dos clientes registrados (sem expor chaves)"""
+        with self._lock:
+            entries = list(self._entries.items())
+
+        clients = []
+        for (provider, base_url, fingerprint), entry in entries:
+            info = {
+                "provider": provider,
+                "base_url": base_url,
+                "key_fingerprint": fingerprint,
+                "selections": entry["selections"],
+                "created_at": entry["created_at"],
+                "last_selected": entry["last_selected"],
+            }
+            if isinstance(entry["client"], GeminiClient):
+                info["cached_models"] = entry["client"].cached_models
+            clients.append(info)
+
+        return {
+            "pooled_clients": len(clients),
+            "max_connections_per_client": self.max_connections,
+            "keepalive_expiry": self.keepalive_expiry,
+            "clients": clients,
+        }
+
+    def close(self) -> None:
+        """Fecha os pools de conexão de todos os clientes"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            close = getattr(entry["client"], "close", None)
+            if callable(close):
+                close()
+
+
+# Registro compartilhado pelo processo
+provider_registry = ProviderClientRegistry()
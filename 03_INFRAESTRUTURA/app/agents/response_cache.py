@@ -0,0 +1,217 @@
+"""
+Prometheus Response Cache
+Cache endereçado por conteúdo para respostas de LLM (LRU em memória + SQLite em disco)
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+class ResponseCache:
+    """
+    Cache de respostas de LLM em duas camadas
+
+    - Memória: LRU com até ``memory_entries`` respostas
+    - Disco: SQLite com até ``disk_entries`` respostas (evicção por último acesso)
+    - TTL: entradas mais antigas que ``ttl_seconds`` são ignoradas e removidas
+
+    A chave é o SHA-256 de (provider, model, system prompt, user prompt, temperature).
+    Cada resposta guarda também o provedor/modelo que a gerou, que pode ser
+    outro que o da chave quando houve failover.
+    """
+
+    def __init__(self,
+                 db_path: Optional[Path] = None,
+                 memory_entries: int = 256,
+                 disk_entries: int = 10000,
+                 ttl_seconds: int = 7 * 24 * 3600):
+        """
+        Args:
+            db_path: Arquivo SQLite (None desativa a camada em disco)
+            memory_entries: Capacidade do LRU em memória
+            disk_entries: Capacidade máxima da tabela em disco
+            ttl_seconds: Validade de cada resposta (0 = sem expiração)
+        """
+        self.db_path = Path(db_path) if db_path else None
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._memory: "OrderedDict[str, Tuple[str, float, Optional[str], Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0
+        }
+
+        if self.db_path:
+            self._init_db()
+
+    def _init_db(self) -> None:
+        """Abre a conexão SQLite compartilhada e cria a tabela"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                provider TEXT,
+                model TEXT
+            )
+            """
+        )
+        # Bancos criados antes das colunas de quem respondeu
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(llm_responses)")}
+        for column in ("provider", "model"):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE llm_responses ADD COLUMN {column} TEXT")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_responses_access ON llm_responses(last_access)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(provider: str, model: str, system_prompt: str,
+                 user_prompt: str, temperature: float) -> str:
+        """Gera a chave de conteúdo de uma chamada"""
+        payload = json.dumps(
+            [provider, model, system_prompt, user_prompt, temperature],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """Retorna a resposta em cache ou None"""
+        entry = self.get_entry(key)
+        return entry["response"] if entry else None
+
+    def get_entry(self, key: str) -> Optional[Dict]:
+        """
+        Retorna {"response", "provider", "model"} ou None
+
+        provider/model são de quem gerou a resposta (None em entradas antigas).
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, created_at, provider, model = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return {"response": response, "provider": provider, "model": model}
+                del self._memory[key]
+                self._counters["expired"] += 1
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT response, created_at, provider, model FROM llm_responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    response, created_at, provider, model = row
+                    if not self._expired(created_at, now):
+                        self._conn.execute(
+                            "UPDATE llm_responses SET last_access = ? WHERE key = ?", (now, key)
+                        )
+                        self._conn.commit()
+                        self._remember(key, response, created_at, provider, model)
+                        self._counters["disk_hits"] += 1
+                        return {"response": response, "provider": provider, "model": model}
+                    self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self._counters["expired"] += 1
+
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key: str, response: str,
+            provider: Optional[str] = None, model: Optional[str] = None) -> None:
+        """Armazena uma resposta (e quem a gerou) nas duas camadas"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now, provider, model)
+            self._counters["stores"] += 1
+
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_responses "
+                    "(key, response, created_at, last_access, provider, model) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, response, now, now, provider, model)
+                )
+                self._evict_disk()
+                self._conn.commit()
+
+    def _remember(self, key: str, response: str, created_at: float,
+                  provider: Optional[str] = None, model: Optional[str] = None) -> None:
+        """Insere no LRU em memória, descartando o menos recente se cheio"""
+        self._memory[key] = (response, created_at, provider, model)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _evict_disk(self) -> None:
+        """Remove expirados e as entradas menos acessadas acima da capacidade"""
+        if self.ttl_seconds:
+            cursor = self._conn.execute(
+                "DELETE FROM llm_responses WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,)
+            )
+            self._counters["expired"] += max(cursor.rowcount, 0)
+
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()
+        overflow = count - self.disk_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM llm_responses WHERE key IN ("
+                "SELECT key FROM llm_responses ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+            self._counters["evictions"] += overflow
+
+    def clear(self) -> None:
+        """Esvazia as duas camadas"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM llm_responses")
+                self._conn.commit()
+
+    def stats(self) -> Dict:
+        """Contadores de hit/miss e ocupação das camadas"""
+        with self._lock:
+            counters = dict(self._counters)
+            memory_size = len(self._memory)
+            disk_size = None
+            if self._conn is not None:
+                (disk_size,) = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()
+
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        return {
+            **counters,
+            "hit_rate": f"{(hits / lookups * 100):.1f}%" if lookups else "N/A",
+            "memory_size": memory_size,
+            "disk_size": disk_size,
+            "ttl_seconds": self.ttl_seconds
+        }
@@ -3,15 +3,23 @@ Agente Especializado: Analisador de Custos de Tokens
 Calcula e rastreia custos de uso de APIs de LLM
 """
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+from pathlib import Path
 import json
 import os
+import sqlite3
+import threading
 
 
 class TokenCostAgent:
     """
     Agente responsável por calcular custos de tokens e gerar relatórios
+    
+    O uso é gravado em SQLite: cada requisição vira uma linha em
+    ``usage_events`` e atualiza, na mesma transação, o acumulado diário
+    por provedor/modelo em ``usage_daily``. Estatísticas e custos totais
+    consultam apenas os acumulados, sem percorrer o histórico.
     """
     
     # Preços por 1M tokens (atualizado em Dezembro 2025)
@@ -27,48 +35,133 @@ class TokenCostAgent:
             'claude-3-opus': {'input': 15.00, 'output': 75.00},
             'claude-3-sonnet': {'input': 3.00, 'output': 15.00},
             'claude-3-haiku': {'input': 0.25, 'output': 1.25},
-            'claude-3.5-sonnet': {'input': 3.00, 'output': 15.00}
+            'claude-3.5-sonnet': {'input': 3.00, 'output': 15.00},
+            'claude-3-5-sonnet': {'input': 3.00, 'output': 15.00},
+            'claude-3-5-haiku': {'input': 0.80, 'output': 4.00}
+        },
+        'gemini': {
+            'gemini-1.5-flash': {'input': 0.075, 'output': 0.30},
+            'gemini-1.5-pro': {'input': 1.25, 'output': 5.00}
         },
         'deepseek': {
             'deepseek-chat': {'input': 0.14, 'output': 0.28},
             'deepseek-coder': {'input': 0.14, 'output': 0.28}
         },
         'openrouter': {
+            'openai/gpt-4o-mini': {'input': 0.15, 'output': 0.60},
             'meta-llama/llama-3.1-70b': {'input': 0.52, 'output': 0.75},
             'google/gemini-pro': {'input': 0.125, 'output': 0.375},
             'mistralai/mixtral-8x7b': {'input': 0.24, 'output': 0.24}
         }
     }
     
-    def __init__(self, log_file: str = "data/token_usage.json"):
+    def __init__(self, db_path: Optional[str] = None, log_file: str = "data/token_usage.json"):
+        """
+        Args:
+            db_path: Arquivo SQLite do uso (padrão: ao lado de log_file, .sqlite3)
+            log_file: Histórico JSON legado, importado uma única vez
+        """
         self.log_file = log_file
-        self.usage_history = self._load_history()
+        self.db_path = Path(db_path) if db_path else Path(log_file).with_suffix(".sqlite3")
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._migrate_legacy_history()
     
-    def _load_history(self) -> List[Dict]:
-        """Carregar histórico de uso"""
-        try:
-            if os.path.exists(self.log_file):
+    def _connect(self) -> sqlite3.Connection:
+        """Abre o banco de uso e cria tabelas de eventos e acumulados"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS usage_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                task_id TEXT,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                input_tokens INTEGER NOT NULL,
+                output_tokens INTEGER NOT NULL,
+                total_cost REAL NOT NULL,
+                priced INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_usage_events_timestamp ON usage_events(timestamp);
+            CREATE TABLE IF NOT EXISTS usage_daily (
+                day TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                requests INTEGER NOT NULL,
+                input_tokens INTEGER NOT NULL,
+                output_tokens INTEGER NOT NULL,
+                cost REAL NOT NULL,
+                PRIMARY KEY (day, provider, model)
+            );
+            CREATE TABLE IF NOT EXISTS usage_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            """
+        )
+        conn.commit()
+        return conn
+    
+    def _migrate_legacy_history(self):
+        """Importa o token_usage.json legado para o banco (uma única vez)"""
+        if not os.path.exists(self.log_file):
+            return
+        
+        with self._lock:
+            done = self._conn.execute(
+                "SELECT value FROM usage_meta WHERE key = 'legacy_json_imported'"
+            ).fetchone()
+            if done:
+                return
+            
+            try:
                 with open(self.log_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except Exception:
-            pass
-        return []
+                    entries = json.load(f)
+            except Exception as e:
+                print(f"Erro ao ler histórico legado: {e}")
+                return
+            
+            with self._conn:
+                for entry in entries:
+                    self._insert(
+                        entry.get('timestamp') or datetime.now().isoformat(),
+                        entry.get('task_id'),
+                        entry.get('provider', 'unknown'),
+                        entry.get('model', 'unknown'),
+                        int(entry.get('input_tokens', 0)),
+                        int(entry.get('output_tokens', 0)),
+                        float(entry.get('total_cost', 0.0)),
+                        'error' not in entry
+                    )
+                self._conn.execute(
+                    "INSERT INTO usage_meta (key, value) VALUES ('legacy_json_imported', ?)",
+                    (datetime.now().isoformat(),)
+                )
     
-    def _save_history(self):
-        """Salvar histórico de uso"""
-        try:
-            os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
-            with open(self.log_file, 'w', encoding='utf-8') as f:
-                json.dump(self.usage_history, f, indent=2)
-        except Exception as e:
-            print(f"Erro ao salvar histórico: {e}")
+    def _find_pricing(self, provider: str, model: str) -> Optional[Dict]:
+        """
+        Preço do modelo: nome exato ou o maior prefixo da tabela
+        
+        Versões datadas ("gpt-4o-mini-2024-07-18", "claude-3-5-haiku-latest")
+        usam o preço do modelo base.
+        """
+        models = self.PRICING.get(provider, {})
+        if model in models:
+            return models[model]
+        
+        matches = [name for name in models if model.startswith(name)]
+        return models[max(matches, key=len)] if matches else None
     
     def calculate_cost(self, provider: str, model: str, input_tokens: int, output_tokens: int) -> Dict:
         """
         Calcular custo de uma requisição
         """
         try:
-            pricing = self.PRICING.get(provider, {}).get(model, None)
+            pricing = self._find_pricing(provider, model)
             
             if not pricing:
                 return {
@@ -94,36 +187,84 @@ class TokenCostAgent:
         except Exception as e:
             return {'error': str(e), 'cost': 0.0}
     
+    def _insert(self, timestamp: str, task_id: Optional[str], provider: str, model: str,
+                input_tokens: int, output_tokens: int, cost: float, priced: bool):
+        """Grava o evento e soma no acumulado do dia (chamar dentro de transação)"""
+        self._conn.execute(
+            "INSERT INTO usage_events (timestamp, task_id, provider, model, input_tokens, "
+            "output_tokens, total_cost, priced) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (timestamp, task_id, provider, model, input_tokens, output_tokens, cost, int(priced))
+        )
+        self._conn.execute(
+            """
+            INSERT INTO usage_daily (day, provider, model, requests, input_tokens, output_tokens, cost)
+            VALUES (?, ?, ?, 1, ?, ?, ?)
+            ON CONFLICT (day, provider, model) DO UPDATE SET
+                requests = requests + 1,
+                input_tokens = input_tokens + excluded.input_tokens,
+                output_tokens = output_tokens + excluded.output_tokens,
+                cost = cost + excluded.cost
+            """,
+            (timestamp[:10], provider, model, input_tokens, output_tokens, cost)
+        )
+    
     def log_usage(self, provider: str, model: str, input_tokens: int, output_tokens: int, 
-                  task_id: Optional[str] = None):
+                  task_id: Optional[str] = None) -> Dict:
         """Registrar uso de tokens"""
         cost_info = self.calculate_cost(provider, model, input_tokens, output_tokens)
+        timestamp = datetime.now().isoformat()
         
-        entry = {
-            'timestamp': datetime.now().isoformat(),
-            'task_id': task_id,
-            **cost_info
-        }
+        with self._lock, self._conn:
+            self._insert(
+                timestamp, task_id, provider, model, input_tokens, output_tokens,
+                cost_info.get('total_cost', 0.0), 'error' not in cost_info
+            )
         
-        self.usage_history.append(entry)
-        self._save_history()
+        return {'timestamp': timestamp, 'task_id': task_id, **cost_info}
     
     def get_total_cost(self, provider: Optional[str] = None, 
                        start_date: Optional[str] = None) -> float:
         """Calcular custo total"""
-        filtered = self.usage_history
+        # Datas com horário precisam dos eventos; dias inteiros saem dos acumulados
+        if start_date and len(start_date) > 10:
+            query, params = self._filtered(
+                "SELECT COALESCE(SUM(total_cost), 0) FROM usage_events",
+                provider, ("timestamp", start_date)
+            )
+        else:
+            query, params = self._filtered(
+                "SELECT COALESCE(SUM(cost), 0) FROM usage_daily",
+                provider, ("day", start_date) if start_date else None
+            )
         
+        with self._lock:
+            (total,) = self._conn.execute(query, params).fetchone()
+        return total
+    
+    @staticmethod
+    def _filtered(query: str, provider: Optional[str],
+                  since: Optional[Tuple[str, str]]) -> Tuple[str, list]:
+        """Acrescenta filtros de provedor e data inicial à consulta"""
+        clauses, params = [], []
         if provider:
-            filtered = [e for e in filtered if e.get('provider') == provider]
-        
-        if start_date:
-            filtered = [e for e in filtered if e.get('timestamp', '') >= start_date]
-        
-        return sum(e.get('total_cost', 0) for e in filtered)
+            clauses.append("provider = ?")
+            params.append(provider)
+        if since:
+            clauses.append(f"{since[0]} >= ?")
+            params.append(since[1])
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        return query, params
     
     def get_usage_stats(self) -> Dict:
         """Gerar estatísticas de uso"""
-        if not self.usage_history:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT provider, model, SUM(requests), SUM(input_tokens) + SUM(output_tokens), SUM(cost) "
+                "FROM usage_daily GROUP BY provider, model"
+            ).fetchall()
+        
+        if not rows:
             return {
                 'total_requests': 0,
                 'total_cost': 0.0,
@@ -132,43 +273,77 @@ class TokenCostAgent:
             }
         
         stats = {
-            'total_requests': len(self.usage_history),
-            'total_cost': self.get_total_cost(),
-            'total_tokens': sum(e.get('total_tokens', 0) for e in self.usage_history),
+            'total_requests': 0,
+            'total_cost': 0.0,
+            'total_tokens': 0,
             'by_provider': {},
             'by_model': {}
         }
         
-        # Por provider
-        for entry in self.usage_history:
-            provider = entry.get('provider', 'unknown')
-            if provider not in stats['by_provider']:
-                stats['by_provider'][provider] = {
-                    'requests': 0,
-                    'cost': 0.0,
-                    'tokens': 0
-                }
+        for provider, model, requests, tokens, cost in rows:
+            stats['total_requests'] += requests
+            stats['total_cost'] += cost
+            stats['total_tokens'] += tokens
             
-            stats['by_provider'][provider]['requests'] += 1
-            stats['by_provider'][provider]['cost'] += entry.get('total_cost', 0)
-            stats['by_provider'][provider]['tokens'] += entry.get('total_tokens', 0)
-        
-        # Por modelo
-        for entry in self.usage_history:
-            model = entry.get('model', 'unknown')
-            if model not in stats['by_model']:
-                stats['by_model'][model] = {
-                    'requests': 0,
-                    'cost': 0.0,
-                    'tokens': 0
-                }
-            
-            stats['by_model'][model]['requests'] += 1
-            stats['by_model'][model]['cost'] += entry.get('total_cost', 0)
-            stats['by_model'][model]['tokens'] += entry.get('total_tokens', 0)
+            for group, key in (('by_provider', provider), ('by_model', model)):
+                bucket = stats[group].setdefault(key, {'requests': 0, 'cost': 0.0, 'tokens': 0})
+                bucket['requests'] += requests
+                bucket['cost'] += cost
+                bucket['tokens'] += tokens
         
         return stats
     
+    def get_daily_usage(self, days: int = 30, provider: Optional[str] = None) -> List[Dict]:
+        """Acumulados diários por provedor/modelo dos últimos ``days`` dias"""
+        query = (
+            "SELECT day, provider, model, requests, input_tokens, output_tokens, cost "
+            "FROM usage_daily WHERE day >= date('now', 'localtime', ?)"
+        )
+        params: list = [f"-{max(days - 1, 0)} days"]
+        if provider:
+            query += " AND provider = ?"
+            params.append(provider)
+        query += " ORDER BY day, provider, model"
+        
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        
+        return [
+            {
+                'day': day,
+                'provider': provider_name,
+                'model': model,
+                'requests': requests,
+                'input_tokens': input_tokens,
+                'output_tokens': output_tokens,
+                'cost': round(cost, 6)
+            }
+            for day, provider_name, model, requests, input_tokens, output_tokens, cost in rows
+        ]
+    
+    def get_recent_usage(self, limit: int = 50) -> List[Dict]:
+        """Últimas requisições registradas"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT timestamp, task_id, provider, model, input_tokens, output_tokens, total_cost "
+                "FROM usage_events ORDER BY id DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        
+        return [
+            {
+                'timestamp': timestamp,
+                'task_id': task_id,
+                'provider': provider,
+                'model': model,
+                'input_tokens': input_tokens,
+                'output_tokens': output_tokens,
+                'total_tokens': input_tokens + output_tokens,
+                'total_cost': total_cost
+            }
+            for timestamp, task_id, provider, model, input_tokens, output_tokens, total_cost in rows
+        ]
+    
     def get_pricing_table(self) -> Dict:
         """Retornar tabela de preços"""
         return self.PRICING
@@ -3,7 +3,7 @@ API REST - Prometheus Backend
 Interface para o agente evolutivo
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import json
 import os
@@ -11,9 +11,11 @@ from datetime import datetime
 from typing import Optional
 
 from agents.evolutionary_agent import EvolutionaryAgent
+from agents.batch_runner import BatchRunner
 from integrations import get_provider_status_summary
 from integrations.github_copilot import github_client as github
 from integrations.n8n_client import n8n_client as n8n
+from backend.jobs import JobQueue, QueueFullError
 
 # Inicializar Flask
 app = Flask(__name__)
@@ -22,6 +24,9 @@ CORS(app)
 # Inicializar agente
 agent = EvolutionaryAgent()
 
+# Fila de jobs para execução assíncrona de tarefas
+jobs = JobQueue()
+
 # ==========================================
 # SISTEMA DE USUÁRIOS - FAMÍLIA PROMETHEUS
 # ==========================================
@@ -139,47 +144,203 @@ def health():
 # ROTAS DO AGENTE
 # ==========================================
 
+def _run_task(data: dict, job=None) -> dict:
+    """
+    Processa uma tarefa do payload de /api/task (execução síncrona ou em job)
+    
+    Quando executada em um job, os tokens são publicados como eventos
+    "token" para quem acompanha GET /api/jobs/<job_id>/stream.
+    """
+    notify_n8n = data.get('notify_n8n', False)  # Opcional: enviar resultado para N8N
+    task_kwargs = {
+        "task_description": data.get('description'),
+        "context": data.get('context', None),
+        "files_context": data.get('files', []),
+        "use_cache": not data.get('bypass_cache', False)
+    }
+    
+    # Processar tarefa
+    if job is None:
+        result = agent.process_task(**task_kwargs)
+    else:
+        result = {}
+        for event in agent.process_task_stream(**task_kwargs):
+            if event["type"] == "token":
+                job.publish("token", {"content": event["content"]})
+            else:
+                result = event["result"]
+    
+    # Se solicitado, envia resultado para N8N
+    if notify_n8n and result.get("status") == "success":
+        try:
+            n8n_result = n8n.send_task_result(result.get("task_id"), result)
+            result['n8n_notification'] = {
+                "sent": n8n_result.get("status") == "success",
+                "execution_id": n8n_result.get("execution_id")
+            }
+        except Exception as n8n_error:
+            result['n8n_notification'] = {
+                "sent": False,
+                "error": str(n8n_error)
+            }
+    
+    return result
+
+
+def _submit_job(kind: str, handler, payload: dict):
+    """Enfileira um job e retorna a resposta 202 com as URLs de acompanhamento"""
+    try:
+        job = jobs.submit(kind, handler, payload)
+    except QueueFullError as e:
+        return jsonify({"status": "error", "error": str(e)}), 503
+    
+    return jsonify({
+        "status": "queued",
+        "job_id": job.id,
+        "status_url": f"/api/jobs/{job.id}",
+        "stream_url": f"/api/jobs/{job.id}/stream"
+    }), 202
+
+
 @app.route('/api/task', methods=['POST'])
 def create_task():
-    """Criar nova tarefa para o agente processar"""
+    """
+    Criar nova tarefa para o agente processar
+    
+    Com "async": true a tarefa é enfileirada e a resposta 202 traz o job_id
+    para acompanhar via GET /api/jobs/<job_id>. Com "bypass_cache": true a
+    resposta não é servida do cache de LLM.
+    """
     try:
         data = request.json
         
-        task_description = data.get('description')
-        context = data.get('context', None)
-        files = data.get('files', [])
-        notify_n8n = data.get('notify_n8n', False)  # Opcional: enviar resultado para N8N
-        
-        if not task_description:
+        if not data.get('description'):
             return jsonify({"error": "description é obrigatório"}), 400
         
-        # Processar tarefa
-        result = agent.process_task(
-            task_description=task_description,
-            context=context,
-            files_context=files
-        )
-        
-        # Se solicitado, envia resultado para N8N
-        if notify_n8n and result.get("status") == "success":
-            try:
-                n8n_result = n8n.send_task_result(result.get("task_id"), result)
-                result['n8n_notification'] = {
-                    "sent": n8n_result.get("status") == "success",
-                    "execution_id": n8n_result.get("execution_id")
-                }
-            except Exception as n8n_error:
-                result['n8n_notification'] = {
-                    "sent": False,
-                    "error": str(n8n_error)
-                }
+        if data.get('async', False):
+            return _submit_job("task", lambda job: _run_task(data, job), data)
         
+        result = _run_task(data)
         return jsonify(result), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/task/stream', methods=['POST'])
+def stream_task():
+    """
+    Processar tarefa emitindo tokens via Server-Sent Events
+    
+    Eventos: "token" ({"content": "..."}) a cada trecho e "result" com o
+    mesmo dicionário de POST /api/task quando a geração termina.
+    """
+    data = request.json or {}
+    
+    if not data.get('description'):
+        return jsonify({"error": "description é obrigatório"}), 400
+    
+    def generate():
+        for event in agent.process_task_stream(
+            task_description=data.get('description'),
+            context=data.get('context', None),
+            files_context=data.get('files', []),
+            use_cache=not data.get('bypass_cache', False)
+        ):
+            payload = {"content": event["content"]} if event["type"] == "token" else event["result"]
+            yield f"event: {event['type']}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/api/tasks/batch', methods=['POST'])
+def create_task_batch():
+    """
+    Processar um lote de tarefas em paralelo
+    
+    Corpo: {"tasks": [...], "concurrency": 8, "per_provider": 4, "provider": "...",
+    "model": "...", "bypass_cache": false, "async": false}. Cada tarefa é uma
+    descrição ou um dict como o de POST /api/task (pode informar provider/model).
+    Os resultados voltam na ordem de entrada; com "async": true cada item
+    concluído é publicado como evento "item" no stream do job.
+    """
+    data = request.json or {}
+    tasks = data.get('tasks') or []
+    max_tasks = int(os.getenv('PROMETHEUS_BATCH_MAX_TASKS', '200'))
+    
+    if not isinstance(tasks, list) or not tasks:
+        return jsonify({"error": "tasks deve ser uma lista não vazia"}), 400
+    if len(tasks) > max_tasks:
+        return jsonify({"error": f"Lote excede o limite de {max_tasks} tarefas"}), 400
+    
+    try:
+        runner = BatchRunner(
+            agent,
+            max_concurrency=data.get('concurrency'),
+            per_provider_concurrency=data.get('per_provider')
+        )
+        tasks = [runner.normalize_task(task) for task in tasks]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    run_kwargs = {
+        "tasks": tasks,
+        "provider": data.get('provider'),
+        "model": data.get('model'),
+        "use_cache": not data.get('bypass_cache', False)
+    }
+    
+    if data.get('async', False):
+        def handler(job):
+            return runner.run(
+                on_result=lambda entry: job.publish("item", {
+                    key: entry[key] for key in ("index", "provider", "model", "status", "elapsed_time")
+                }),
+                **run_kwargs
+            )
+        return _submit_job("task_batch", handler, data)
+    
+    try:
+        return jsonify(runner.run(**run_kwargs)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Obter status, progresso e resultado de um job"""
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Job não encontrado"}), 404
+    
+    include_events = request.args.get('events', 'false').lower() == 'true'
+    return jsonify(job.to_dict(include_events=include_events)), 200
+
+
+@app.route('/api/jobs/<job_id>/stream', methods=['GET'])
+def stream_job(job_id):
+    """Acompanhar um job via Server-Sent Events até a conclusão"""
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Job não encontrado"}), 404
+    
+    return Response(
+        stream_with_context(jobs.stream(job)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/api/jobs', methods=['GET'])
+def jobs_stats():
+    """Estatísticas da fila de jobs"""
+    return jsonify(jobs.stats()), 200
+
+
 @app.route('/api/agent/stats', methods=['GET'])
 def get_agent_stats():
     """Obter estatísticas do agente"""
@@ -190,6 +351,28 @@ def get_agent_stats():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/usage', methods=['GET'])
+def get_token_usage():
+    """
+    Uso de tokens e custo por provedor/modelo
+    
+    Query: days (acumulados diários, padrão 30), provider (filtro opcional)
+    """
+    if agent.token_usage is None:
+        return jsonify({"enabled": False}), 200
+    
+    try:
+        days = int(request.args.get('days', 30))
+        provider = request.args.get('provider')
+        return jsonify({
+            "enabled": True,
+            "summary": agent.token_usage.get_usage_stats(),
+            "daily": agent.token_usage.get_daily_usage(days=days, provider=provider)
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/api/agent/provider', methods=['POST'])
 def change_agent_provider():
     """
@@ -266,20 +449,15 @@ def get_knowledge():
 
 @app.route('/api/knowledge/search', methods=['GET'])
 def search_knowledge():
-    """Buscar na base de conhecimento"""
+    """Buscar na base de conhecimento (ranking BM25, parâmetros q e limit)"""
     try:
         query = request.args.get('q', '')
+        limit = request.args.get('limit', 20, type=int)
         
         if not query:
             return jsonify({"error": "parâmetro 'q' é obrigatório"}), 400
         
-        results = []
-        for task_id, content in agent.knowledge_base.items():
-            if query.lower() in content.lower():
-                results.append({
-                    "task_id": task_id,
-                    "excerpt": content[:200]
-                })
+        results = agent.search_knowledge(query, limit=limit)
         
         return jsonify({
             "query": query,
@@ -394,8 +572,13 @@ def get_config():
             "version": "1.0.0",
             "endpoints": [
                 "POST /api/task",
+                "POST /api/task/stream",
+                "POST /api/tasks/batch",
+                "GET /api/jobs/<job_id>",
+                "GET /api/jobs/<job_id>/stream",
                 "GET /api/agent/stats",
                 "GET /api/agent/timeline",
+                "GET /api/usage",
                 "GET /api/knowledge",
                 "GET /api/knowledge/search"
             ]
@@ -493,8 +676,11 @@ def n8n_webhook():
     {
         "task": "descrição da tarefa",
         "context": "contexto opcional",
-        "workflow_id": "id do workflow que enviou"
+        "workflow_id": "id do workflow que enviou",
+        "async": false
     }
+    
+    Com "async": true responde 202 com o job_id imediatamente.
     """
     try:
         # Validar assinatura se configurada
@@ -520,17 +706,23 @@ def n8n_webhook():
                 "error": "task é obrigatório"
             }), 400
         
-        # Processar tarefa com o agente
-        result = agent.process_task(
-            task_description=task_description,
-            context=context
-        )
+        def run_webhook_task(job=None):
+            # Processar tarefa com o agente
+            result = agent.process_task(
+                task_description=task_description,
+                context=context,
+                use_cache=not data.get('bypass_cache', False)
+            )
+            
+            # Adicionar informações do webhook
+            result['source'] = 'n8n'
+            result['workflow_id'] = workflow_id
+            return result
         
-        # Adicionar informações do webhook
-        result['source'] = 'n8n'
-        result['workflow_id'] = workflow_id
+        if data.get('async', False):
+            return _submit_job("n8n_webhook", run_webhook_task, data)
         
-        return jsonify(result), 200
+        return jsonify(run_webhook_task()), 200
         
     except Exception as e:
         return jsonify({
@@ -647,9 +839,15 @@ def docs():
         "version": "1.0.0",
         "endpoints": {
             "GET /api/health": "Verificar saúde da API",
-            "POST /api/task": "Criar nova tarefa",
+            "POST /api/task": "Criar nova tarefa (\"async\": true para enfileirar)",
+            "POST /api/task/stream": "Criar tarefa com tokens via Server-Sent Events",
+            "POST /api/tasks/batch": "Processar lote de tarefas em paralelo (\"async\": true para enfileirar)",
+            "GET /api/jobs": "Estatísticas da fila de jobs",
+            "GET /api/jobs/<job_id>": "Status e resultado de um job",
+            "GET /api/jobs/<job_id>/stream": "Progresso de um job via Server-Sent Events",
             "GET /api/agent/stats": "Estatísticas do agente",
             "GET /api/agent/timeline": "Timeline de evolução",
+            "GET /api/usage": "Uso de tokens e custo por provedor/modelo/dia",
             "GET /api/knowledge": "Base de conhecimento",
             "GET /api/knowledge/search": "Buscar na base de conhecimento",
             "GET /api/config": "Configuração do agente",
@@ -824,5 +1022,6 @@ if __name__ == '__main__':
     app.run(
         host='0.0.0.0',
         port=5000,
-        debug=True
+        debug=True,
+        threaded=True
     )
@@ -0,0 +1,191 @@
+"""
+Job Queue - Prometheus Backend
+Execução assíncrona de tarefas do agente com pool de workers limitado
+"""
+
+import os
+import json
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+class QueueFullError(Exception):
+    """Fila de jobs atingiu o limite de pendentes"""
+
+
+class Job:
+    """Estado de um job enfileirado e seus eventos de progresso"""
+
+    def __init__(self, kind: str, payload: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.payload = payload
+        self.status = "queued"
+        self.created_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.events: List[Dict[str, Any]] = []
+        self._condition = threading.Condition()
+        self.publish("status", {"status": self.status})
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("success", "error")
+
+    def publish(self, event: str, data: Dict[str, Any]) -> None:
+        """Registra um evento de progresso e acorda quem está acompanhando"""
+        with self._condition:
+            self.events.append({
+                "seq": len(self.events),
+                "event": event,
+                "data": data,
+                "timestamp": datetime.now().isoformat()
+            })
+            self._condition.notify_all()
+
+    def _set_status(self, status: str) -> None:
+        self.status = status
+        self.publish("status", {"status": status})
+
+    def wait_events(self, after: int, timeout: float) -> List[Dict[str, Any]]:
+        """Retorna eventos com seq >= after, aguardando até timeout se não houver novos"""
+        with self._condition:
+            if len(self.events) <= after and not self.done:
+                self._condition.wait(timeout)
+            return self.events[after:]
+
+    def to_dict(self, include_events: bool = False) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+            "events_count": len(self.events)
+        }
+        if include_events:
+            data["events"] = list(self.events)
+        return data
+
+
+class JobQueue:
+    """
+    Fila de jobs com pool de threads limitado
+
+    - submit() retorna imediatamente com o Job enfileirado
+    - No máximo ``max_workers`` jobs executam em paralelo
+    - No máximo ``max_pending`` jobs aguardam na fila (QueueFullError acima disso)
+    - Jobs finalizados são retidos até ``max_retained`` para consulta
+    """
+
+    def __init__(self,
+                 max_workers: Optional[int] = None,
+                 max_pending: Optional[int] = None,
+                 max_retained: int = 1000):
+        self.max_workers = max_workers or int(os.getenv("PROMETHEUS_JOB_WORKERS", "4"))
+        self.max_pending = max_pending or int(os.getenv("PROMETHEUS_JOB_MAX_PENDING", "100"))
+        self.max_retained = max_retained
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="prometheus-job"
+        )
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def submit(self, kind: str, handler: Callable[[Job], Dict[str, Any]],
+               payload: Optional[Dict[str, Any]] = None) -> Job:
+        """
+        Enfileira um job
+
+        Args:
+            kind: Tipo do job (ex: "task", "n8n_webhook")
+            handler: Função chamada com o Job; retorna o resultado (dict)
+            payload: Dados de entrada do job
+        """
+        job = Job(kind, payload or {})
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError(
+                    f"Fila cheia ({self.max_pending} jobs pendentes). Tente novamente."
+                )
+            self._pending += 1
+            self._jobs[job.id] = job
+            self._evict_finished()
+
+        self._executor.submit(self._run, job, handler)
+        return job
+
+    def _run(self, job: Job, handler: Callable[[Job], Dict[str, Any]]) -> None:
+        """Executa o handler do job registrando status e resultado"""
+        with self._lock:
+            self._pending -= 1
+
+        job.started_at = datetime.now().isoformat()
+        job._set_status("running")
+
+        try:
+            job.result = handler(job)
+            job.finished_at = datetime.now().isoformat()
+            job._set_status("success")
+        except Exception as e:
+            job.error = str(e)
+            job.finished_at = datetime.now().isoformat()
+            job._set_status("error")
+
+    def _evict_finished(self) -> None:
+        """Remove os jobs finalizados mais antigos acima do limite de retenção"""
+        overflow = len(self._jobs) - self.max_retained
+        if overflow <= 0:
+            return
+        for job_id in [jid for jid, job in self._jobs.items() if job.done][:overflow]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contagem de jobs por status"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts: Dict[str, int] = {}
+        for job in jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "by_status": counts
+        }
+
+    def stream(self, job: Job, heartbeat: float = 15.0) -> Iterator[str]:
+        """
+        Gera eventos Server-Sent Events até o job finalizar
+
+        Envia um comentário de heartbeat quando não há eventos novos
+        dentro de ``heartbeat`` segundos para manter a conexão aberta.
+        """
+        seq = 0
+        while True:
+            events = job.wait_events(seq, timeout=heartbeat)
+            if not events:
+                yield ": heartbeat\n\n"
+                continue
+            for event in events:
+                seq = event["seq"] + 1
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+            if job.done and seq >= len(job.events):
+                result = job.to_dict()
+                yield f"event: done\ndata: {json.dumps(result, ensure_ascii=False)}\n\n"
+                return
@@ -0,0 +1,273 @@
+"""Streaming CSV/XML/Parquet exporters shared by dashboards and ingestion.
+
+Every exporter consumes rows chunk by chunk (a pandas DataFrame is sliced,
+any other iterable of dicts is grouped), so memory stays bounded by
+``chunk_rows`` no matter how large the export is:
+
+- :func:`iter_csv` / :func:`iter_xml` yield encoded ``bytes`` chunks of a
+  tabular export; :func:`write_csv` / :func:`write_xml` stream them to disk;
+- :func:`iter_xml_document` / :func:`write_xml_document` serialize nested
+  dicts/lists (API payloads) without building an element tree;
+- :func:`write_parquet` writes one row group per chunk (requires
+  ``pyarrow``, imported lazily).
+
+Text is XML-escaped, control characters that XML 1.0 forbids are
+dropped and column/key names are turned into valid tag names.
+
+Callers that join the chunks (the Streamlit download buttons need the
+whole payload) still hold the full export in memory; only the
+row-to-text conversion stays bounded.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import math
+import os
+import re
+import threading
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from xml.sax.saxutils import escape
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = pq = None
+
+DEFAULT_CHUNK_ROWS = 5000
+XML_DECLARATION = "<?xml version='1.0' encoding='UTF-8'?>\n"
+
+_INVALID_TAG_CHARS = re.compile(r"[^A-Za-z0-9_.\-]")
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+# ---------------------- ESCAPING ----------------------
+def xml_tag(name: Any) -> str:
+    """Turn a column/key name into a valid XML element name."""
+
+    tag = _INVALID_TAG_CHARS.sub("_", str(name)) or "_"
+    if not (tag[0].isalpha() or tag[0] == "_"):
+        tag = f"_{tag}"
+    return tag
+
+
+def xml_text(value: Any) -> str:
+    """Escape a value for use as XML character data."""
+
+    return escape(_INVALID_XML_CHARS.sub("", str(value)))
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+# ---------------------- CHUNKING ----------------------
+def _is_dataframe(data: Any) -> bool:
+    return hasattr(data, "iloc") and hasattr(data, "columns")
+
+
+def iter_record_chunks(data: Any, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[List[Dict[str, Any]]]:
+    """Yield lists of row dicts from a DataFrame or an iterable of dicts."""
+
+    if _is_dataframe(data):
+        for start in range(0, len(data), chunk_rows):
+            yield data.iloc[start:start + chunk_rows].to_dict("records")
+        return
+
+    chunk: List[Dict[str, Any]] = []
+    for row in data:
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _resolve_columns(
+    data: Any, first_chunk: Optional[List[Dict[str, Any]]], columns: Optional[Sequence[str]]
+) -> List[str]:
+    if columns:
+        return list(columns)
+    if _is_dataframe(data):
+        return [str(column) for column in data.columns]
+    return list(first_chunk[0].keys()) if first_chunk else []
+
+
+# ---------------------- CSV ----------------------
+def iter_csv(
+    data: Any, columns: Optional[Sequence[str]] = None, chunk_rows: int = DEFAULT_CHUNK_ROWS
+) -> Iterator[bytes]:
+    """Yield a CSV export (header first) as UTF-8 chunks."""
+
+    chunks = iter_record_chunks(data, chunk_rows)
+    first = next(chunks, None)
+    names = _resolve_columns(data, first, columns)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(names)
+    for chunk in _chain([first] if first else [], chunks):
+        writer.writerows(
+            ["" if _is_missing(row.get(name)) else row.get(name) for name in names] for row in chunk
+        )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header only (no rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _chain(first: List[Any], rest: Iterator[Any]) -> Iterator[Any]:
+    yield from first
+    yield from rest
+
+
+# ---------------------- TABULAR XML ----------------------
+def iter_xml(
+    data: Any,
+    columns: Optional[Sequence[str]] = None,
+    root_tag: str = "data",
+    row_tag: str = "row",
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Iterator[bytes]:
+    """Yield ``<data><row><col>value</col>...</row>...</data>`` as UTF-8 chunks.
+
+    Missing values (``None``/``NaN``) become empty elements.
+    """
+
+    chunks = iter_record_chunks(data, chunk_rows)
+    first = next(chunks, None)
+    names = _resolve_columns(data, first, columns)
+    tags = [(name, f"<{xml_tag(name)}>", f"</{xml_tag(name)}>", f"<{xml_tag(name)}/>") for name in names]
+    root, row_open, row_close = xml_tag(root_tag), f"  <{xml_tag(row_tag)}>\n", f"  </{xml_tag(row_tag)}>\n"
+
+    yield f"{XML_DECLARATION}<{root}>\n".encode("utf-8")
+    for chunk in _chain([first] if first else [], chunks):
+        parts: List[str] = []
+        for row in chunk:
+            parts.append(row_open)
+            for name, open_tag, close_tag, empty_tag in tags:
+                value = row.get(name)
+                if _is_missing(value):
+                    parts.append(f"    {empty_tag}\n")
+                else:
+                    parts.append(f"    {open_tag}{xml_text(value)}{close_tag}\n")
+            parts.append(row_close)
+        yield "".join(parts).encode("utf-8")
+    yield f"</{root}>\n".encode("utf-8")
+
+
+# ---------------------- NESTED XML ----------------------
+def _iter_xml_nodes(tag: str, value: Any) -> Iterator[str]:
+    name = xml_tag(tag)
+    if _is_missing(value):
+        yield f"<{name}/>"
+    elif isinstance(value, dict):
+        yield f"<{name}>"
+        for key, child in value.items():
+            yield from _iter_xml_nodes(key, child)
+        yield f"</{name}>"
+    elif isinstance(value, (list, tuple)):
+        yield f"<{name}>"
+        for child in value:
+            yield from _iter_xml_nodes("item", child)
+        yield f"</{name}>"
+    else:
+        yield f"<{name}>{xml_text(value)}</{name}>"
+
+
+def iter_xml_document(tag: str, data: Any, buffer_size: int = 1 << 16) -> Iterator[bytes]:
+    """Serialize nested dicts/lists as XML (list entries become ``<item>``).
+
+    Output is yielded in roughly ``buffer_size``-character chunks.
+    """
+
+    parts: List[str] = [XML_DECLARATION]
+    size = len(XML_DECLARATION)
+    for piece in _iter_xml_nodes(tag, data):
+        parts.append(piece)
+        size += len(piece)
+        if size >= buffer_size:
+            yield "".join(parts).encode("utf-8")
+            parts, size = [], 0
+    parts.append("\n")
+    yield "".join(parts).encode("utf-8")
+
+
+# ---------------------- FILES ----------------------
+def write_chunks(path: str, chunks: Iterable[bytes]) -> None:
+    """Write byte chunks to ``path`` atomically (temp file + rename)."""
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as handle:
+        for chunk in chunks:
+            handle.write(chunk)
+    os.replace(tmp, path)
+
+
+def write_csv(path: str, data: Any, columns: Optional[Sequence[str]] = None, **kwargs: Any) -> None:
+    write_chunks(path, iter_csv(data, columns, **kwargs))
+
+
+def write_xml(path: str, data: Any, columns: Optional[Sequence[str]] = None, **kwargs: Any) -> None:
+    write_chunks(path, iter_xml(data, columns, **kwargs))
+
+
+def write_xml_document(path: str, tag: str, data: Any) -> None:
+    write_chunks(path, iter_xml_document(tag, data))
+
+
+# ---------------------- PARQUET ----------------------
+def write_parquet(
+    target: Union[str, BinaryIO],
+    data: Any,
+    columns: Optional[Sequence[str]] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    compression: str = "zstd",
+) -> None:
+    """Write rows as Parquet, one row group per chunk (requires ``pyarrow``).
+
+    The schema is inferred from the first chunk; later chunks are cast to it.
+    """
+
+    if pa is None:
+        raise RuntimeError("pyarrow is required for Parquet exports. Install it with `pip install pyarrow`.")
+
+    writer = None
+    try:
+        if _is_dataframe(data):
+            frame = data[list(columns)] if columns else data
+            for start in range(0, len(frame), chunk_rows):
+                table = pa.Table.from_pandas(frame.iloc[start:start + chunk_rows], preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(target, table.schema, compression=compression)
+                writer.write_table(table.cast(writer.schema))
+        else:
+            for chunk in iter_record_chunks(data, chunk_rows):
+                if columns:
+                    chunk = [{name: row.get(name) for name in columns} for row in chunk]
+                if writer is None:
+                    table = pa.Table.from_pylist(chunk)
+                    writer = pq.ParquetWriter(target, table.schema, compression=compression)
+                else:
+                    table = pa.Table.from_pylist(chunk, schema=writer.schema)
+                writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def parquet_bytes(data: Any, columns: Optional[Sequence[str]] = None, **kwargs: Any) -> bytes:
+    """Parquet export held in memory (e.g. for a download button)."""
+
+    buffer = io.BytesIO()
+    write_parquet(buffer, data, columns, **kwargs)
+    return buffer.getvalue()
@@ -1,12 +1,25 @@
 """OpenDota ETL helpers for Prometheus data workflows."""
 
+from .archive import ArchiveWriter
+from .checkpoint import IngestCheckpoint
 from .client import OpenDotaClient
+from .http_cache import HttpCache
 from .ingest import TournamentIngestor
+from .normalized_store import NormalizedWriter
+from .player_cache import PlayerCache
+from .rate_limit import AdaptiveRateLimiter, TokenBucket
 from .supabase_loader import SupabaseLoader, SupabaseSchemaManager
 
 __all__ = [
     "OpenDotaClient",
+    "HttpCache",
+    "IngestCheckpoint",
     "TournamentIngestor",
+    "NormalizedWriter",
+    "PlayerCache",
+    "ArchiveWriter",
+    "TokenBucket",
+    "AdaptiveRateLimiter",
     "SupabaseLoader",
     "SupabaseSchemaManager",
 ]
@@ -0,0 +1,234 @@
+"""Columnar archive backend for raw OpenDota payloads.
+
+An alternative to one XML file per match/player: payloads are buffered
+and written as compressed Parquet (or Arrow IPC) part files, partitioned
+Hive-style so readers can prune by league and date::
+
+    <root>/matches/league=<id>/date=<YYYY-MM-DD>/part-<uuid>.parquet
+    <root>/players/league=<id>/date=<YYYY-MM-DD>/part-<uuid>.parquet
+
+Scalar fields used for filtering are real columns; the full payload is
+kept as a JSON string column (zstd-compressed on disk).
+
+``pyarrow`` is optional: it is only imported when an archive is used.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.ipc  # noqa: F401  (registers pa.ipc)
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = ds = pq = None
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError(
+            "pyarrow is required for Parquet/Arrow archives. Install it with `pip install pyarrow`."
+        )
+
+
+def _schemas() -> Dict[str, "pa.Schema"]:
+    return {
+        "matches": pa.schema(
+            [
+                ("match_id", pa.int64()),
+                ("start_time", pa.int64()),
+                ("duration", pa.int64()),
+                ("radiant_win", pa.bool_()),
+                ("payload", pa.string()),
+            ]
+        ),
+        "players": pa.schema(
+            [
+                ("account_id", pa.int64()),
+                ("fetched_at", pa.string()),
+                ("profile", pa.string()),
+                ("matches", pa.string()),
+            ]
+        ),
+    }
+
+
+def _partitioning() -> "ds.Partitioning":
+    return ds.partitioning(
+        pa.schema([("league", pa.int64()), ("date", pa.string())]), flavor="hive"
+    )
+
+
+def _day(timestamp: Optional[int]) -> str:
+    moment = datetime.fromtimestamp(timestamp, tz=timezone.utc) if timestamp else datetime.now(timezone.utc)
+    return moment.strftime("%Y-%m-%d")
+
+
+class ArchiveWriter:
+    """Thread-safe buffered writer of match/player payloads.
+
+    Rows are grouped per ``(kind, league, date)`` partition and flushed
+    to a new part file every ``flush_rows`` rows and on :meth:`close`,
+    so memory is bounded regardless of league size.
+    """
+
+    def __init__(self, root: str, fmt: str = "parquet", flush_rows: int = 500) -> None:
+        _require_pyarrow()
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported archive format: {fmt} (use {', '.join(FORMATS)})")
+        self.root = Path(root)
+        self.fmt = fmt
+        self.flush_rows = flush_rows
+        self._schemas = _schemas()
+        self._buffers: Dict[Tuple[str, int, str], List[Dict[str, Any]]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self.files_written = 0
+
+    def add_match(self, league_id: int, payload: Dict[str, Any]) -> None:
+        row = {
+            "match_id": payload.get("match_id"),
+            "start_time": payload.get("start_time"),
+            "duration": payload.get("duration"),
+            "radiant_win": payload.get("radiant_win"),
+            "payload": json.dumps(payload, ensure_ascii=False),
+        }
+        self._add(("matches", league_id, _day(payload.get("start_time"))), row)
+
+    def add_player(
+        self, league_id: int, account_id: int, profile: Dict[str, Any], matches: List[Dict[str, Any]]
+    ) -> None:
+        now = datetime.now(timezone.utc)
+        row = {
+            "account_id": account_id,
+            "fetched_at": now.isoformat(),
+            "profile": json.dumps(profile, ensure_ascii=False),
+            "matches": json.dumps(matches, ensure_ascii=False),
+        }
+        self._add(("players", league_id, now.strftime("%Y-%m-%d")), row)
+
+    def _add(self, partition: Tuple[str, int, str], row: Dict[str, Any]) -> None:
+        with self._lock:
+            buffer = self._buffers[partition]
+            buffer.append(row)
+            if len(buffer) < self.flush_rows:
+                return
+            rows = self._buffers.pop(partition)
+        self._write(partition, rows)
+
+    def _write(self, partition: Tuple[str, int, str], rows: List[Dict[str, Any]]) -> None:
+        kind, league_id, day = partition
+        directory = self.root / kind / f"league={league_id}" / f"date={day}"
+        directory.mkdir(parents=True, exist_ok=True)
+        target = directory / f"part-{uuid.uuid4().hex}{FORMATS[self.fmt]}"
+        table = pa.Table.from_pylist(rows, schema=self._schemas[kind])
+
+        if self.fmt == "parquet":
+            pq.write_table(table, str(target), compression="zstd")
+        else:
+            options = pa.ipc.IpcWriteOptions(compression="zstd")
+            with pa.OSFile(str(target), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                    writer.write_table(table)
+
+        with self._lock:
+            self.files_written += 1
+
+    def flush(self) -> None:
+        with self._lock:
+            pending = list(self._buffers.items())
+            self._buffers.clear()
+        for partition, rows in pending:
+            if rows:
+                self._write(partition, rows)
+
+    def close(self) -> None:
+        self.flush()
+
+
+# ---------------------- READER API ----------------------
+def open_archive(root: str, kind: str = "matches", fmt: str = "parquet") -> "ds.Dataset":
+    """Return a pyarrow dataset over ``<root>/<kind>`` with league/date partitions."""
+
+    _require_pyarrow()
+    return ds.dataset(
+        str(Path(root) / kind),
+        format="parquet" if fmt == "parquet" else "ipc",
+        partitioning=_partitioning(),
+    )
+
+
+def _filter(
+    league_ids: Optional[Sequence[int]], date_from: Optional[str], date_to: Optional[str]
+) -> Optional["ds.Expression"]:
+    expression = None
+    clauses = []
+    if league_ids:
+        clauses.append(ds.field("league").isin(list(league_ids)))
+    if date_from:
+        clauses.append(ds.field("date") >= date_from)
+    if date_to:
+        clauses.append(ds.field("date") <= date_to)
+    for clause in clauses:
+        expression = clause if expression is None else expression & clause
+    return expression
+
+
+def read_archive(
+    root: str,
+    kind: str = "matches",
+    fmt: str = "parquet",
+    league_ids: Optional[Sequence[int]] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+) -> "pa.Table":
+    """Scan an archive into a pyarrow Table, pruning partitions by league/date.
+
+    Dates are ``YYYY-MM-DD`` strings (inclusive). Use ``columns`` to skip
+    the payload column when only the scalar fields are needed.
+    """
+
+    dataset = open_archive(root, kind, fmt)
+    return dataset.to_table(columns=columns, filter=_filter(league_ids, date_from, date_to))
+
+
+def iter_payloads(
+    root: str,
+    kind: str = "matches",
+    fmt: str = "parquet",
+    league_ids: Optional[Sequence[int]] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    batch_size: int = 1000,
+) -> Iterator[Dict[str, Any]]:
+    """Yield decoded payloads batch by batch (constant memory).
+
+    Matches yield the original match payload; players yield
+    ``{"account_id", "league", "profile", "matches"}``.
+    """
+
+    dataset = open_archive(root, kind, fmt)
+    columns = ["payload"] if kind == "matches" else ["account_id", "league", "profile", "matches"]
+    for batch in dataset.to_batches(
+        columns=columns, filter=_filter(league_ids, date_from, date_to), batch_size=batch_size
+    ):
+        for row in batch.to_pylist():
+            if kind == "matches":
+                yield json.loads(row["payload"])
+            else:
+                yield {
+                    "account_id": row["account_id"],
+                    "league": row["league"],
+                    "profile": json.loads(row["profile"]),
+                    "matches": json.loads(row["matches"]),
+                }
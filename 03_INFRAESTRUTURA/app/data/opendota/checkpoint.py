@@ -0,0 +1,136 @@
+"""Per-league checkpoint manifest for resumable ingestion.
+
+Every match and player is appended to a JSONL manifest as soon as its
+artifacts are persisted. A rerun of the same league loads the manifest
+and only fetches what is missing; a crash loses at most the records that
+were in flight. The manifest only tracks ids: normalized rows live in
+the per-table NDJSON files (see ``normalized_store``).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .normalized_store import repair_tail
+
+
+class IngestCheckpoint:
+    """Append-only manifest of completed matches and players.
+
+    Records are one JSON object per line:
+
+    - ``{"type": "match", "match_id": ..., "start_time": ...,
+      "account_ids": [...]}``
+    - ``{"type": "player", "account_id": ..., "player_matches": <row count>}``
+
+    Lines torn by a crash mid-write are skipped on load, and the torn tail
+    is cut off before appending again.
+    """
+
+    def __init__(self, path: Path, fsync: bool = False) -> None:
+        self.path = Path(path)
+        self.fsync = fsync
+        self.matches: Dict[int, Dict[str, Any]] = {}
+        self.players: Dict[int, Dict[str, Any]] = {}
+        self._handle = None
+        self._lock = threading.Lock()
+
+    # ---------------------- READ ----------------------
+    def load(self) -> "IngestCheckpoint":
+        """Read the manifest (if any) into ``matches`` and ``players``."""
+
+        self.matches.clear()
+        self.players.clear()
+        if not self.path.exists():
+            return self
+
+        with open(self.path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                # Keep only the ids; manifests written before the NDJSON
+                # store also carried full rows, which are not needed here
+                if record.get("type") == "match":
+                    self.matches[record["match_id"]] = {
+                        "match_id": record["match_id"],
+                        "start_time": record.get("start_time"),
+                        "account_ids": record.get("account_ids", []),
+                    }
+                elif record.get("type") == "player":
+                    self.players[record["account_id"]] = {"account_id": record["account_id"]}
+        return self
+
+    @property
+    def last_start_time(self) -> Optional[int]:
+        """Newest ``start_time`` among checkpointed matches."""
+
+        times = [r.get("start_time") for r in self.matches.values() if r.get("start_time")]
+        return max(times) if times else None
+
+    def account_ids(self) -> List[int]:
+        """Every player seen in checkpointed matches."""
+
+        seen = set()
+        for record in self.matches.values():
+            seen.update(record.get("account_ids", []))
+        return sorted(seen)
+
+    # ---------------------- WRITE ----------------------
+    def reset(self) -> None:
+        """Discard the manifest and start over."""
+
+        with self._lock:
+            self._close()
+            if self.path.exists():
+                self.path.unlink()
+            self.matches.clear()
+            self.players.clear()
+
+    def add_match(self, match_id: int, start_time: Optional[int], account_ids: List[int]) -> None:
+        record = {
+            "type": "match",
+            "match_id": match_id,
+            "start_time": start_time,
+            "account_ids": account_ids,
+        }
+        self._append(record)
+        self.matches[match_id] = record
+
+    def add_player(self, account_id: int, player_matches: int) -> None:
+        record = {
+            "type": "player",
+            "account_id": account_id,
+            "player_matches": player_matches,
+        }
+        self._append(record)
+        self.players[account_id] = record
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            if self._handle is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                repair_tail(self.path)
+                self._handle = open(self.path, "a", encoding="utf-8")
+            self._handle.write(line + "\n")
+            self._handle.flush()
+            if self.fsync:
+                os.fsync(self._handle.fileno())
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+    def _close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
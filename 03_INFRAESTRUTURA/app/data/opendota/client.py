@@ -8,9 +8,14 @@ from __future__ import annotations
 
 import os
 import time
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, List, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from ..exporters import iter_xml_document, write_xml_document
+from .http_cache import HttpCache, ttl_for
+from .rate_limit import AdaptiveRateLimiter, TokenBucket, default_rate_limiter
 
 
 class OpenDotaClient:
@@ -28,6 +33,18 @@ class OpenDotaClient:
     max_retries:
         How many times to retry when the API rate limits or responds
         with transient failures.
+    rate_limiter:
+        Token bucket shared by every request of this client (and of any
+        threads using it). Defaults to the OpenDota quota for the key,
+        see :func:`default_rate_limiter`.
+    cache_dir:
+        Directory of the on-disk response cache (``OPENDOTA_CACHE_DIR``
+        when omitted; no caching if neither is set). Fresh entries skip
+        the network entirely and stale ones are revalidated with
+        ETag/Last-Modified.
+    pool_size:
+        Keep-alive connections kept by the shared session; size it to
+        the ingestion concurrency.
     """
 
     def __init__(
@@ -36,22 +53,70 @@ class OpenDotaClient:
         base_url: str = "https://api.opendota.com/api",
         timeout: int = 20,
         max_retries: int = 3,
+        rate_limiter: Optional[TokenBucket] = None,
+        cache_dir: Optional[str] = None,
+        pool_size: int = 32,
     ) -> None:
         self.api_key = api_key or os.getenv("OPENDOTA_API_KEY")
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
         self.max_retries = max_retries
+        self.rate_limiter = rate_limiter or default_rate_limiter(self.api_key)
+
+        cache_dir = cache_dir or os.getenv("OPENDOTA_CACHE_DIR")
+        self.cache = HttpCache(cache_dir) if cache_dir else None
+
+        # One keep-alive pool shared by every thread using this client
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def close(self) -> None:
+        """Close pooled connections."""
+
+        self.session.close()
 
     def _request(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
         url = f"{self.base_url}/{path.lstrip('/')}"
         params = params.copy() if params else {}
+
+        cache_key = cached = None
+        headers: Dict[str, str] = {}
+        if self.cache is not None:
+            cache_key = HttpCache.key(path, params)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                if HttpCache.is_fresh(cached):
+                    self.cache.count("fresh_hits")
+                    return cached["body"]
+                headers = HttpCache.conditional_headers(cached)
+
         if self.api_key:
             params.setdefault("api_key", self.api_key)
 
         for attempt in range(1, self.max_retries + 1):
-            response = requests.get(url, params=params, timeout=self.timeout)
+            self.rate_limiter.acquire()
+            response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            self.rate_limiter.observe(response.headers)
+            if response.status_code == 304 and cached is not None:
+                self.cache.count("revalidated")
+                self.cache.refresh(cache_key, cached)
+                return cached["body"]
+
             if response.status_code == 200:
-                return response.json()
+                payload = response.json()
+                if self.cache is not None:
+                    self.cache.count("misses")
+                    self.cache.set(
+                        cache_key,
+                        path,
+                        payload,
+                        ttl_for(path, payload),
+                        etag=response.headers.get("ETag"),
+                        last_modified=response.headers.get("Last-Modified"),
+                    )
+                return payload
 
             if response.status_code in {401, 403}:
                 raise RuntimeError(
@@ -59,8 +124,14 @@ class OpenDotaClient:
                 )
 
             if response.status_code == 429 or 500 <= response.status_code < 600:
-                sleep_time = 2 ** (attempt - 1)
-                time.sleep(sleep_time)
+                if attempt == self.max_retries:
+                    break
+                delay = self._backoff(attempt, response.headers.get("Retry-After"))
+                if response.status_code == 429 and isinstance(self.rate_limiter, AdaptiveRateLimiter):
+                    # Throttling is shared: hold every thread, not just this one
+                    self.rate_limiter.throttled(delay)
+                else:
+                    time.sleep(delay)
                 continue
 
             response.raise_for_status()
@@ -69,6 +140,18 @@ class OpenDotaClient:
             f"OpenDota request failed after {self.max_retries} attempts: {url}"
         )
 
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        if isinstance(self.rate_limiter, AdaptiveRateLimiter):
+            return self.rate_limiter.backoff(attempt, retry_after)
+        return 2 ** (attempt - 1)
+
+    def rate_limit_metrics(self) -> Dict[str, Any]:
+        """Quota usage seen so far (remaining minute/day, waits, 429s)."""
+
+        if isinstance(self.rate_limiter, AdaptiveRateLimiter):
+            return self.rate_limiter.metrics()
+        return {"rate_per_minute": self.rate_limiter.rate_per_minute}
+
     # ---------------------- PUBLIC ENDPOINTS ----------------------
     def get_league_matches(self, league_id: int, limit: int = 2000) -> List[Dict[str, Any]]:
         """Return matches from a given league/tournament."""
@@ -87,9 +170,17 @@ class OpenDotaClient:
         return self._request(f"players/{account_id}")
 
     def get_player_matches(
-        self, account_id: int, limit: int = 500, is_pro: bool = True
+        self,
+        account_id: int,
+        limit: int = 500,
+        is_pro: bool = True,
+        days: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
-        """Return the last matches for a player (optionally pro only)."""
+        """Return the last matches for a player (optionally pro only).
+
+        ``days`` restricts the result to matches played in the last
+        ``days`` days (used for incremental refreshes).
+        """
 
         params = {
             "limit": min(limit, 500),
@@ -97,6 +188,8 @@ class OpenDotaClient:
         }
         if is_pro:
             params["is_pro"] = "true"
+        if days is not None:
+            params["date"] = days
         return self._request(f"players/{account_id}/matches", params=params)
 
     def get_heroes(self) -> List[Dict[str, Any]]:
@@ -111,48 +204,18 @@ class OpenDotaClient:
 
 
 # ---------------------- XML HELPERS ----------------------
-def _iter_items(data: Dict[str, Any]) -> Iterable[tuple[str, Any]]:
-    for key, value in data.items():
-        yield key, value
-
-
 def dict_to_xml(tag: str, data: Any) -> str:
     """Convert a mapping/list/primitive to XML.
 
     The output is intentionally minimal to keep files small while
-    remaining human-readable for debugging inside Colab.
+    remaining human-readable for debugging inside Colab. Serialization
+    (escaping, tag names) is shared with the dashboards' exporters.
     """
 
-    from xml.etree.ElementTree import Element, SubElement, tostring  # Local import
-
-    def build(node: Element, value: Any) -> None:
-        if value is None:
-            return
-        if isinstance(value, (str, int, float, bool)):
-            node.text = str(value)
-            return
-        if isinstance(value, list):
-            for item in value:
-                child = SubElement(node, "item")
-                build(child, item)
-            return
-        if isinstance(value, dict):
-            for child_key, child_value in _iter_items(value):
-                child = SubElement(node, child_key)
-                build(child, child_value)
-            return
-        node.text = str(value)
-
-    root = Element(tag)
-    build(root, data)
-    return tostring(root, encoding="utf-8", xml_declaration=True).decode("utf-8")
+    return b"".join(iter_xml_document(tag, data)).decode("utf-8")
 
 
 def save_xml(path: str, tag: str, data: Any) -> None:
-    """Persist a dictionary/list as an XML document."""
-
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    xml_content = dict_to_xml(tag, data)
-    with open(path, "w", encoding="utf-8") as xml_file:
-        xml_file.write(xml_content)
+    """Persist a dictionary/list as an XML document, streamed to disk."""
 
+    write_xml_document(path, tag, data)
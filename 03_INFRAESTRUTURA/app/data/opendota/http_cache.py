@@ -0,0 +1,134 @@
+"""On-disk response cache for the OpenDota client.
+
+Entries are JSON files keyed by endpoint and query parameters (the API
+key is never part of the key). Each entry keeps the validators returned
+by the server (``ETag``/``Last-Modified``) and a time-to-live:
+
+- fresh entries are served without touching the network;
+- stale entries are revalidated with ``If-None-Match`` /
+  ``If-Modified-Since`` and reused on ``304 Not Modified``;
+- ``ttl=None`` marks a payload as immutable (e.g. finished matches).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Per-endpoint freshness in seconds (first matching pattern wins).
+# Finished matches are stored as immutable by the client, see ``ttl_for``.
+DEFAULT_TTLS = [
+    (re.compile(r"^matches/\d+$"), 3600),
+    (re.compile(r"^leagues/\d+/matches$"), 600),
+    (re.compile(r"^players/\d+/matches$"), 3600),
+    (re.compile(r"^players/\d+$"), 6 * 3600),
+    (re.compile(r"^heroes$"), 24 * 3600),
+    (re.compile(r"^constants/"), 24 * 3600),
+]
+
+
+def ttl_for(path: str, payload: Any) -> Optional[float]:
+    """Return the TTL for ``path`` (``None`` = never expires)."""
+
+    path = path.strip("/")
+    if re.match(r"^matches/\d+$", path) and isinstance(payload, dict):
+        # A match with a result and duration will not change anymore
+        if payload.get("radiant_win") is not None and payload.get("duration"):
+            return None
+    for pattern, ttl in DEFAULT_TTLS:
+        if pattern.search(path):
+            return ttl
+    return 0
+
+
+class HttpCache:
+    """Thread-safe file cache of decoded JSON responses."""
+
+    def __init__(self, cache_dir: str) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.stats = {"fresh_hits": 0, "revalidated": 0, "misses": 0, "stores": 0}
+
+    @staticmethod
+    def key(path: str, params: Optional[Dict[str, Any]] = None) -> str:
+        cleaned = {k: v for k, v in (params or {}).items() if k != "api_key"}
+        raw = json.dumps([path.strip("/"), sorted(cleaned.items())], default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _file(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the stored entry (fresh or stale) or ``None``."""
+
+        path = self._file(key)
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                return json.load(handle)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    @staticmethod
+    def is_fresh(entry: Dict[str, Any]) -> bool:
+        ttl = entry.get("ttl")
+        if ttl is None:
+            return True
+        return time.time() - entry.get("stored_at", 0) < ttl
+
+    @staticmethod
+    def conditional_headers(entry: Dict[str, Any]) -> Dict[str, str]:
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def set(
+        self,
+        key: str,
+        path: str,
+        body: Any,
+        ttl: Optional[float],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        entry = {
+            "path": path.strip("/"),
+            "stored_at": time.time(),
+            "ttl": ttl,
+            "etag": etag,
+            "last_modified": last_modified,
+            "body": body,
+        }
+        target = self._file(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as handle:
+            json.dump(entry, handle, ensure_ascii=False)
+        os.replace(tmp, target)
+        with self._lock:
+            self.stats["stores"] += 1
+
+    def refresh(self, key: str, entry: Dict[str, Any]) -> None:
+        """Restart the TTL of an entry after a ``304 Not Modified``."""
+
+        self.set(
+            key,
+            entry.get("path", ""),
+            entry.get("body"),
+            entry.get("ttl"),
+            etag=entry.get("etag"),
+            last_modified=entry.get("last_modified"),
+        )
+
+    def count(self, stat: str) -> None:
+        with self._lock:
+            self.stats[stat] += 1
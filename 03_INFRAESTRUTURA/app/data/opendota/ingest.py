@@ -1,88 +1,216 @@
 """Tournament ingestion helpers for OpenDota.
 
-This module downloads league matches, persists XML archives (per match
-and per player) and emits normalized JSON artifacts that can be loaded
-into Supabase.
+This module downloads league matches, persists raw payloads (XML per
+match and per player, or a partitioned Parquet/Arrow archive) and streams
+normalized rows to per-table NDJSON files that can be loaded into
+Supabase.
 """
 
 from __future__ import annotations
 
 import argparse
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Set
 
+from .archive import FORMATS as ARCHIVE_FORMATS, ArchiveWriter
+from .checkpoint import IngestCheckpoint
 from .client import OpenDotaClient, save_xml
+from .normalized_store import NormalizedWriter
+from .player_cache import PlayerCache
 
 
 class TournamentIngestor:
-    """Download and normalize OpenDota data for a tournament/league."""
+    """Download and normalize OpenDota data for a tournament/league.
 
-    def __init__(self, client: OpenDotaClient, output_dir: str = "data/opendota"):
+    Matches and players are fetched on a thread pool of ``concurrency``
+    workers. All workers share the client's token bucket, so the pool
+    size only bounds in-flight requests; throughput stays within the
+    OpenDota quota.
+
+    ``archive_format`` selects how raw payloads are kept: ``"xml"``
+    (default, one file per match/player) or ``"parquet"``/``"arrow"``
+    (requires ``pyarrow``; see :mod:`.archive`).
+
+    Players go through a :class:`PlayerCache` shared by every league
+    ingested into ``output_dir``: a player fetched less than
+    ``player_max_age`` seconds ago costs no API call, and older entries
+    only fetch the matches played since.
+    """
+
+    def __init__(
+        self,
+        client: OpenDotaClient,
+        output_dir: str = "data/opendota",
+        concurrency: int = 16,
+        archive_format: str = "xml",
+        player_max_age: Optional[float] = None,
+    ):
+        if archive_format != "xml" and archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unsupported archive format: {archive_format}")
         self.client = client
+        self.concurrency = max(1, concurrency)
+        self.archive_format = archive_format
         self.output_dir = Path(output_dir)
         self.matches_dir = self.output_dir / "matches"
         self.players_dir = self.output_dir / "players"
+        self.archive_dir = self.output_dir / "archive"
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.player_cache = PlayerCache(
+            str(self.output_dir / "player_cache"), max_age=player_max_age
+        )
+        self._archive: Optional[ArchiveWriter] = None
 
     # ---------------------- PUBLIC API ----------------------
+    def checkpoint_path(self, league_id: int) -> Path:
+        """Location of the resumable manifest for ``league_id``."""
+
+        return self.output_dir / "checkpoints" / f"league_{league_id}.jsonl"
+
+    def normalized_dir(self, league_id: int) -> Path:
+        """Directory of the per-table NDJSON files for ``league_id``."""
+
+        return self.output_dir / "normalized" / f"league_{league_id}"
+
     def ingest(
         self,
         league_id: int,
         player_match_limit: int = 500,
         pro_only: bool = True,
+        resume: bool = True,
+        incremental: bool = False,
     ) -> Dict:
         """Run the full ingestion for a league.
 
+        Each match and player is checkpointed as soon as it is persisted.
+        With ``resume`` (default) a rerun skips everything already in the
+        checkpoint and only fetches the delta; ``resume=False`` starts
+        over. With ``incremental`` only league matches newer than the last
+        ingested ``start_time`` are considered, and players of those new
+        matches are refreshed even if already checkpointed (through the
+        player cache, so only their recent matches are fetched); other
+        players are left as they are.
+
+        Items that still fail after the client's retries are reported in
+        the metadata (``failed_matches``/``failed_players``) and retried
+        on the next run.
+
         Returns a metadata dict with file locations and normalization
         stats. Artifacts are written under ``output_dir``.
         """
 
+        checkpoint = IngestCheckpoint(self.checkpoint_path(league_id))
+        writer = NormalizedWriter(self.normalized_dir(league_id))
+        if self.archive_format != "xml":
+            self._archive = ArchiveWriter(str(self.archive_dir), fmt=self.archive_format)
+        if resume:
+            checkpoint.load()
+        else:
+            checkpoint.reset()
+            writer.reset()
+
         league_matches = self.client.get_league_matches(league_id)
-        player_ids: Set[int] = set()
-        normalized = {
-            "players": {},
-            "matches": {},
-            "player_matches": [],
-        }
 
-        for raw_match in league_matches:
-            match_id = raw_match.get("match_id")
-            if not match_id:
-                continue
-            match_payload = self.client.get_match(match_id)
-            self._persist_match(match_payload)
-            normalized["matches"][str(match_id)] = self._normalize_match(match_payload)
-
-            for player in match_payload.get("players", []):
-                account_id = player.get("account_id")
-                if account_id:
-                    player_ids.add(account_id)
-
-        for account_id in sorted(player_ids):
-            profile, player_matches = self._persist_player(account_id, player_match_limit, pro_only)
-            normalized["players"][str(account_id)] = profile
-            normalized["player_matches"].extend(
-                [self._normalize_player_match(account_id, pm) for pm in player_matches]
-            )
-
-        normalized_path = self.output_dir / "normalized.json"
-        with open(normalized_path, "w", encoding="utf-8") as handle:
-            json.dump(normalized, handle, ensure_ascii=False, indent=2)
+        candidates = league_matches
+        last_start_time = checkpoint.last_start_time
+        if incremental and last_start_time is not None:
+            candidates = [m for m in league_matches if (m.get("start_time") or 0) > last_start_time]
+        pending_matches = [
+            m["match_id"] for m in candidates
+            if m.get("match_id") and m["match_id"] not in checkpoint.matches
+        ]
+
+        refresh_players: Set[int] = set()
+        failed_matches: Dict[int, str] = {}
+        failed_players: Dict[int, str] = {}
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self.concurrency, thread_name_prefix="opendota-ingest"
+            ) as executor:
+                futures = {
+                    executor.submit(self._fetch_match, mid, league_id): mid
+                    for mid in pending_matches
+                }
+                for future in as_completed(futures):
+                    match_id = futures[future]
+                    try:
+                        match_payload = future.result()
+                    except Exception as exc:
+                        failed_matches[match_id] = str(exc)
+                        continue
+                    # Rows first, checkpoint second: a crash in between only
+                    # duplicates a row, which the loader's upsert absorbs
+                    writer.write("matches", [self._normalize_match(match_payload)])
+                    account_ids = [
+                        p["account_id"] for p in match_payload.get("players", []) if p.get("account_id")
+                    ]
+                    checkpoint.add_match(match_id, match_payload.get("start_time"), account_ids)
+                    if incremental:
+                        refresh_players.update(account_ids)
+
+                pending_players = [
+                    aid for aid in checkpoint.account_ids()
+                    if aid not in checkpoint.players or aid in refresh_players
+                ]
+                futures = {
+                    executor.submit(
+                        self._persist_player,
+                        aid,
+                        player_match_limit,
+                        pro_only,
+                        league_id,
+                        aid in refresh_players,
+                    ): aid
+                    for aid in pending_players
+                }
+                for future in as_completed(futures):
+                    account_id = futures[future]
+                    try:
+                        profile, player_matches = future.result()
+                    except Exception as exc:
+                        failed_players[account_id] = str(exc)
+                        continue
+                    writer.write("players", [profile])
+                    pm_count = writer.write(
+                        "player_matches",
+                        (self._normalize_player_match(account_id, pm) for pm in player_matches),
+                    )
+                    checkpoint.add_player(account_id, pm_count)
+        finally:
+            checkpoint.close()
+            writer.close()
+            if self._archive is not None:
+                self._archive.close()
+                self._archive = None
 
         metadata = {
             "league_id": league_id,
             "generated_at": datetime.utcnow().isoformat(),
             "output_dir": str(self.output_dir),
-            "match_count": len(league_matches),
-            "player_count": len(player_ids),
-            "normalized_file": str(normalized_path),
-            "xml": {
+            "match_count": len(checkpoint.matches),
+            "player_count": len(checkpoint.players),
+            "fetched_matches": len(pending_matches) - len(failed_matches),
+            "fetched_players": len(pending_players) - len(failed_players),
+            "failed_matches": failed_matches,
+            "failed_players": failed_players,
+            "incremental": incremental,
+            "last_start_time": checkpoint.last_start_time,
+            "checkpoint_file": str(checkpoint.path),
+            "rate_limit": self.client.rate_limit_metrics(),
+            "player_cache": dict(self.player_cache.stats),
+            "normalized_dir": str(writer.directory),
+            "normalized_files": writer.files(),
+            "archive_format": self.archive_format,
+        }
+        if self.archive_format == "xml":
+            metadata["xml"] = {
                 "matches": str(self.matches_dir),
                 "players": str(self.players_dir),
-            },
-        }
+            }
+        else:
+            metadata["archive_dir"] = str(self.archive_dir)
 
         with open(self.output_dir / "metadata.json", "w", encoding="utf-8") as handle:
             json.dump(metadata, handle, ensure_ascii=False, indent=2)
@@ -90,16 +218,34 @@ class TournamentIngestor:
         return metadata
 
     # ---------------------- INTERNAL HELPERS ----------------------
-    def _persist_match(self, match_payload: Dict) -> None:
+    def _fetch_match(self, match_id: int, league_id: Optional[int] = None) -> Dict:
+        match_payload = self.client.get_match(match_id)
+        self._persist_match(match_payload, league_id)
+        return match_payload
+
+    def _persist_match(self, match_payload: Dict, league_id: Optional[int] = None) -> None:
+        if self._archive is not None:
+            self._archive.add_match(league_id or match_payload.get("leagueid"), match_payload)
+            return
         match_id = match_payload.get("match_id", "unknown")
         target = self.matches_dir / f"{match_id}.xml"
         save_xml(str(target), "match", match_payload)
 
     def _persist_player(
-        self, account_id: int, match_limit: int, pro_only: bool
+        self,
+        account_id: int,
+        match_limit: int,
+        pro_only: bool,
+        league_id: Optional[int] = None,
+        refresh: bool = False,
     ) -> tuple[Dict, List[Dict]]:
-        profile = self.client.get_player(account_id)
-        player_matches = self.client.get_player_matches(account_id, limit=match_limit, is_pro=pro_only)
+        profile, player_matches = self.player_cache.fetch(
+            self.client, account_id, limit=match_limit, pro_only=pro_only, refresh=refresh
+        )
+
+        if self._archive is not None:
+            self._archive.add_player(league_id, account_id, profile, player_matches)
+            return self._normalize_player_profile(account_id, profile), player_matches
 
         profile_path = self.players_dir / str(account_id) / "profile.xml"
         matches_path = self.players_dir / str(account_id) / "matches.xml"
@@ -180,12 +326,35 @@ def run_ingestion(
     output_dir: str = "data/opendota",
     player_match_limit: int = 500,
     api_key: Optional[str] = None,
+    concurrency: int = 16,
+    resume: bool = True,
+    incremental: bool = False,
+    archive_format: str = "xml",
+    player_max_age: Optional[float] = None,
 ) -> Dict:
     """Convenience function for CLI/notebook usage."""
 
-    client = OpenDotaClient(api_key=api_key)
-    ingestor = TournamentIngestor(client=client, output_dir=output_dir)
-    return ingestor.ingest(league_id=league_id, player_match_limit=player_match_limit)
+    client = OpenDotaClient(
+        api_key=api_key,
+        cache_dir=str(Path(output_dir) / "http_cache"),
+        pool_size=concurrency,
+    )
+    ingestor = TournamentIngestor(
+        client=client,
+        output_dir=output_dir,
+        concurrency=concurrency,
+        archive_format=archive_format,
+        player_max_age=player_max_age,
+    )
+    try:
+        return ingestor.ingest(
+            league_id=league_id,
+            player_match_limit=player_match_limit,
+            resume=resume,
+            incremental=incremental,
+        )
+    finally:
+        client.close()
 
 
 def _cli() -> None:
@@ -195,10 +364,40 @@ def _cli() -> None:
     parser.add_argument(
         "--limit", type=int, default=500, help="Limite de partidas por jogador"
     )
+    parser.add_argument(
+        "--concurrency", type=int, default=16, help="Requisições simultâneas ao OpenDota"
+    )
+    parser.add_argument(
+        "--fresh", action="store_true", help="Ignorar o checkpoint e reprocessar a liga inteira"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Buscar apenas partidas mais novas que o último start_time ingerido",
+    )
+    parser.add_argument(
+        "--archive-format",
+        choices=["xml", *ARCHIVE_FORMATS],
+        default="xml",
+        help="Formato do arquivo bruto: XML por partida ou Parquet/Arrow particionado (requer pyarrow)",
+    )
+    parser.add_argument(
+        "--player-max-age",
+        type=float,
+        default=None,
+        help="Horas em que um jogador já baixado (em qualquer liga) é reutilizado sem nova chamada",
+    )
     args = parser.parse_args()
 
     metadata = run_ingestion(
-        league_id=args.league_id, output_dir=args.output, player_match_limit=args.limit
+        league_id=args.league_id,
+        output_dir=args.output,
+        player_match_limit=args.limit,
+        concurrency=args.concurrency,
+        resume=not args.fresh,
+        incremental=args.incremental,
+        archive_format=args.archive_format,
+        player_max_age=args.player_max_age * 3600 if args.player_max_age is not None else None,
     )
     print(json.dumps(metadata, indent=2))
 
@@ -0,0 +1,168 @@
+"""Streaming storage for normalized ingestion rows.
+
+Rows are appended to one NDJSON file per table as soon as they are
+produced, and read back lazily in bounded chunks, so neither the
+ingestor nor the loader ever holds a whole league in memory.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+TABLES = ("players", "matches", "player_matches")
+
+logger = logging.getLogger(__name__)
+
+
+def repair_tail(path: Path) -> bool:
+    """Drop a trailing line without newline (a write torn by a crash).
+
+    Call before appending so new records never get glued onto the
+    fragment. Returns whether the file was truncated.
+    """
+
+    path = Path(path)
+    if not path.exists() or path.stat().st_size == 0:
+        return False
+    with open(path, "rb+") as handle:
+        handle.seek(-1, os.SEEK_END)
+        if handle.read(1) == b"\n":
+            return False
+        # Walk back to the last complete line
+        position = handle.seek(0, os.SEEK_END)
+        block = 4096
+        while position > 0:
+            start = max(0, position - block)
+            handle.seek(start)
+            chunk = handle.read(position - start)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                handle.truncate(start + newline + 1)
+                return True
+            position = start
+        handle.truncate(0)
+    return True
+
+
+class NormalizedWriter:
+    """Thread-safe appender of normalized rows, one NDJSON file per table."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._handles: Dict[str, object] = {}
+        self._locks = {table: threading.Lock() for table in TABLES}
+        self.rows_written = {table: 0 for table in TABLES}
+
+    def path(self, table: str) -> Path:
+        return self.directory / f"{table}.ndjson"
+
+    def reset(self) -> None:
+        """Remove previously written rows (fresh ingestion)."""
+
+        self.close()
+        for table in TABLES:
+            if self.path(table).exists():
+                self.path(table).unlink()
+
+    def write(self, table: str, rows: Iterable[Dict]) -> int:
+        lines = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+        if not lines:
+            return 0
+        count = lines.count("\n")
+        with self._locks[table]:
+            handle = self._handles.get(table)
+            if handle is None:
+                repair_tail(self.path(table))
+                handle = self._handles[table] = open(self.path(table), "a", encoding="utf-8")
+            handle.write(lines)
+            handle.flush()
+            self.rows_written[table] += count
+        return count
+
+    def files(self) -> Dict[str, str]:
+        return {table: str(self.path(table)) for table in TABLES}
+
+    def close(self) -> None:
+        for table, handle in list(self._handles.items()):
+            with self._locks[table]:
+                handle.close()
+                self._handles.pop(table, None)
+
+
+def iter_rows(path: Path) -> Iterator[Dict]:
+    """Yield rows of an NDJSON file, skipping lines that are not valid JSON.
+
+    Bad lines (torn writes) are skipped rather than ending the read, so
+    rows appended after them are still loaded; the count is logged.
+    """
+
+    path = Path(path)
+    if not path.exists():
+        return
+    skipped = 0
+    with open(path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                skipped += 1
+                continue
+            yield row
+    if skipped:
+        logger.warning("Skipped %d malformed line(s) in %s", skipped, path)
+
+
+def iter_chunks(rows: Iterable[Dict], chunk_size: int) -> Iterator[List[Dict]]:
+    """Group an iterable of rows into lists of at most ``chunk_size``."""
+
+    chunk: List[Dict] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_partitioned_chunks(
+    rows: Iterable[Dict],
+    key_fields: Sequence[str],
+    partitions: int,
+    max_rows: int,
+    max_bytes: Optional[int] = None,
+) -> Iterator[Tuple[int, List[Dict]]]:
+    """Spread rows over ``partitions`` by key and group each partition into chunks.
+
+    Yields ``(partition, chunk)``. Every row of a key lands in the same
+    partition and each partition's chunks come out in input order, so
+    uploading a partition's chunks one after another applies the rows of
+    a key in the order they were written. Chunks are bounded by row count
+    and serialized size (the compact JSON encoding the REST upsert
+    sends); a single row larger than ``max_bytes`` still goes out alone.
+    """
+
+    chunks: List[List[Dict]] = [[] for _ in range(partitions)]
+    sizes = [0] * partitions
+    for row in rows:
+        part = hash(tuple(row.get(field) for field in key_fields)) % partitions
+        row_size = len(json.dumps(row, ensure_ascii=False, separators=(",", ":")).encode("utf-8")) + 1
+        chunk = chunks[part]
+        if chunk and (len(chunk) >= max_rows or (max_bytes and sizes[part] + row_size > max_bytes)):
+            yield part, chunk
+            chunk = chunks[part] = []
+            sizes[part] = 0
+        chunk.append(row)
+        sizes[part] += row_size
+    for part, chunk in enumerate(chunks):
+        if chunk:
+            yield part, chunk
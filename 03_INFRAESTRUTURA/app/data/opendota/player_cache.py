@@ -0,0 +1,133 @@
+"""Shared per-player cache reused across leagues and runs.
+
+Pro players show up in many leagues; without this cache every league
+ingestion downloads the same profiles and match histories again. Each
+account gets one JSON file holding its profile, its merged match history
+and when both were fetched:
+
+- within ``max_age`` the entry is reused without any API call;
+- past ``max_age`` the profile is refreshed and only the matches played
+  since the last fetch are requested (OpenDota's ``date`` filter) and
+  merged into the stored history.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_MAX_AGE = 24 * 3600
+
+
+class PlayerCache:
+    """Thread-safe file cache of player profiles and match histories."""
+
+    def __init__(self, cache_dir: str, max_age: Optional[float] = None) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        if max_age is None:
+            max_age = float(os.getenv("OPENDOTA_PLAYER_MAX_AGE", DEFAULT_MAX_AGE))
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.stats = {"fresh_hits": 0, "incremental": 0, "full": 0}
+
+    def _file(self, account_id: int) -> Path:
+        return self.cache_dir / f"{account_id}.json"
+
+    def get(self, account_id: int) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._file(account_id), "r", encoding="utf-8") as handle:
+                return json.load(handle)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry.get("fetched_at", 0) < self.max_age
+
+    def set(
+        self,
+        account_id: int,
+        profile: Dict[str, Any],
+        matches: List[Dict[str, Any]],
+        limit: int,
+        pro_only: bool,
+    ) -> None:
+        entry = {
+            "account_id": account_id,
+            "fetched_at": time.time(),
+            "limit": limit,
+            "pro_only": pro_only,
+            "profile": profile,
+            "matches": matches,
+        }
+        target = self._file(account_id)
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as handle:
+            json.dump(entry, handle, ensure_ascii=False)
+        os.replace(tmp, target)
+
+    def count(self, stat: str) -> None:
+        with self._lock:
+            self.stats[stat] += 1
+
+    # ---------------------- FETCH ----------------------
+    def fetch(
+        self,
+        client: Any,
+        account_id: int,
+        limit: int = 500,
+        pro_only: bool = True,
+        refresh: bool = False,
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """Return ``(profile, matches)`` using as few API calls as possible.
+
+        A fresh entry costs nothing, unless ``refresh`` is set (the player
+        is known to have new matches). A stale or refreshed entry fetched
+        with a compatible ``limit``/``pro_only`` refreshes the profile and
+        requests only the days elapsed since the last fetch. Anything else
+        is a full fetch.
+        """
+
+        entry = self.get(account_id)
+        compatible = (
+            entry is not None
+            and entry.get("pro_only") == pro_only
+            and entry.get("limit", 0) >= limit
+        )
+        if compatible and not refresh and self.is_fresh(entry):
+            self.count("fresh_hits")
+            return entry["profile"], entry["matches"][:limit]
+
+        profile = client.get_player(account_id)
+        if compatible:
+            # ``date`` is "matches in the last N days"; one extra day covers
+            # matches that finished while the previous fetch was running
+            days = math.ceil((time.time() - entry.get("fetched_at", 0)) / 86400) + 1
+            recent = client.get_player_matches(account_id, limit=limit, is_pro=pro_only, days=days)
+            matches = merge_matches(recent, entry["matches"], limit)
+            self.count("incremental")
+        else:
+            matches = client.get_player_matches(account_id, limit=limit, is_pro=pro_only)
+            self.count("full")
+
+        self.set(account_id, profile, matches, limit, pro_only)
+        return profile, matches
+
+
+def merge_matches(
+    recent: List[Dict[str, Any]], known: List[Dict[str, Any]], limit: int
+) -> List[Dict[str, Any]]:
+    """Merge two match lists by ``match_id`` (newest first, capped at ``limit``)."""
+
+    merged: Dict[Any, Dict[str, Any]] = {}
+    for match in known:
+        merged[match.get("match_id")] = match
+    for match in recent:
+        merged[match.get("match_id")] = match
+    ordered = sorted(merged.values(), key=lambda m: m.get("start_time") or 0, reverse=True)
+    return ordered[:limit]
@@ -0,0 +1,214 @@
+"""Thread-safe rate limiting shared by OpenDota client calls.
+
+OpenDota enforces per-minute quotas (3000/min with a premium key, 60/min
+on the free tier). One bucket per client keeps every worker thread of an
+ingestion under that quota without coordinating between them.
+
+:class:`AdaptiveRateLimiter` additionally follows the quota headers the
+API returns (``X-Rate-Limit-Remaining-Minute``/``-Day``), pauses every
+thread on ``429``/``Retry-After`` and computes jittered backoff delays.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional
+
+PREMIUM_REQUESTS_PER_MINUTE = 3000
+FREE_REQUESTS_PER_MINUTE = 60
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously.
+
+    Parameters
+    ----------
+    rate_per_minute:
+        Sustained number of requests allowed per minute.
+    burst:
+        Bucket capacity, i.e. how many requests may start back-to-back
+        after an idle period. Defaults to one second worth of tokens
+        (minimum 1).
+    """
+
+    def __init__(self, rate_per_minute: float, burst: Optional[int] = None) -> None:
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive")
+        self.rate_per_minute = rate_per_minute
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = float(burst or max(1, int(self.rate_per_second)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate_per_second)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until ``tokens`` are available and return the time waited."""
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    delay = self._blocked_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= tokens:
+                        self._tokens -= tokens
+                        self._on_acquire(waited)
+                        return waited
+                    delay = (tokens - self._tokens) / self.rate_per_second
+            time.sleep(delay)
+            waited += delay
+
+    def _on_acquire(self, waited: float) -> None:
+        """Hook for subclasses; called with the lock held."""
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller of :meth:`acquire` for ``seconds``."""
+
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        """Feed response headers back into the limiter (no-op here)."""
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    """Token bucket that follows OpenDota's quota headers.
+
+    - ``X-Rate-Limit-Remaining-Minute`` caps the tokens left in the
+      current minute, so threads slow down before hitting ``429``.
+    - ``X-Rate-Limit-Remaining-Day`` at zero pauses until UTC midnight.
+    - :meth:`backoff` returns ``Retry-After`` when present, otherwise a
+      full-jitter exponential delay.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        burst: Optional[int] = None,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 60.0,
+    ) -> None:
+        super().__init__(rate_per_minute, burst)
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._metrics: Dict[str, Any] = {
+            "requests": 0,
+            "throttled": 0,
+            "wait_seconds": 0.0,
+            "remaining_minute": None,
+            "remaining_day": None,
+            "headers_seen_at": None,
+        }
+
+    def _on_acquire(self, waited: float) -> None:
+        self._metrics["requests"] += 1
+        self._metrics["wait_seconds"] += waited
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        remaining_minute = _int_header(headers, "X-Rate-Limit-Remaining-Minute")
+        remaining_day = _int_header(headers, "X-Rate-Limit-Remaining-Day")
+        if remaining_minute is None and remaining_day is None:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            self._metrics["headers_seen_at"] = datetime.now(timezone.utc).isoformat()
+            if remaining_minute is not None:
+                self._metrics["remaining_minute"] = remaining_minute
+                self._refill(now)
+                self._tokens = min(self._tokens, float(remaining_minute))
+                window_left = 60 - time.time() % 60
+                if remaining_minute <= 0:
+                    # Wait for the next minute window to open
+                    self._blocked_until = max(self._blocked_until, now + window_left)
+                elif remaining_minute < self.capacity:
+                    # Spread what is left of the quota over the rest of the window
+                    self._blocked_until = max(
+                        self._blocked_until, now + window_left / remaining_minute
+                    )
+            if remaining_day is not None:
+                self._metrics["remaining_day"] = remaining_day
+                if remaining_day <= 0:
+                    self._blocked_until = max(
+                        self._blocked_until, now + 86400 - time.time() % 86400
+                    )
+
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Delay before retry ``attempt`` (1-based)."""
+
+        delay = parse_retry_after(retry_after)
+        if delay is None:
+            ceiling = min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1))
+            delay = random.uniform(0, ceiling)
+        return delay
+
+    def throttled(self, delay: float) -> None:
+        """Record a ``429`` and pause every thread for ``delay`` seconds."""
+
+        with self._lock:
+            self._metrics["throttled"] += 1
+        self.pause(delay)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            data = dict(self._metrics)
+            blocked_for = max(0.0, self._blocked_until - time.monotonic())
+        data["wait_seconds"] = round(data["wait_seconds"], 3)
+        data["rate_per_minute"] = self.rate_per_minute
+        data["paused_for"] = round(blocked_for, 3)
+        return data
+
+
+def _int_header(headers: Mapping[str, str], name: str) -> Optional[int]:
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse ``Retry-After`` given in seconds or as an HTTP date."""
+
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def default_rate_limiter(api_key: Optional[str]) -> AdaptiveRateLimiter:
+    """Build the bucket for a client.
+
+    ``OPENDOTA_RATE_LIMIT`` (requests per minute) overrides the default of
+    3000/min for premium keys and 60/min for anonymous access.
+    """
+
+    configured = os.getenv("OPENDOTA_RATE_LIMIT")
+    if configured:
+        rate = float(configured)
+    else:
+        rate = PREMIUM_REQUESTS_PER_MINUTE if api_key else FREE_REQUESTS_PER_MINUTE
+    return AdaptiveRateLimiter(rate)
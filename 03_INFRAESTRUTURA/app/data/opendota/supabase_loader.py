@@ -1,14 +1,33 @@
-"""Supabase schema + loader for OpenDota tournament analytics."""
+"""Supabase schema + loader for OpenDota tournament analytics.
+
+Two load paths share the same normalized rows:
+
+- :class:`SupabaseLoader` upserts JSON chunks through PostgREST (only
+  needs the project URL and key);
+- :meth:`SupabaseSchemaManager.bulk_load` streams rows with
+  ``COPY ... FROM STDIN`` into temporary staging tables and merges them
+  with ``INSERT ... ON CONFLICT`` in a single transaction over the direct
+  ``SUPABASE_DB_URL`` connection, which is much faster for backfills.
+"""
 
 from __future__ import annotations
 
+import io
 import json
 import os
-from typing import Dict, Iterable, List, Optional
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
 
 import psycopg2
 from supabase import Client, create_client
 
+from .normalized_store import iter_partitioned_chunks, iter_rows
+
 SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS public.players (
     account_id bigint PRIMARY KEY,
@@ -72,8 +91,102 @@ CREATE TABLE IF NOT EXISTS public.player_matches (
     backpack_2 integer,
     PRIMARY KEY (account_id, match_id)
 );
+
+-- Row version used by incremental readers (dashboard deltas): stamped on
+-- every insert and update, whichever load path wrote the row
+CREATE OR REPLACE FUNCTION public.touch_updated_at() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.updated_at := now();
+    RETURN NEW;
+END;
+$$;
+
+ALTER TABLE public.players ADD COLUMN IF NOT EXISTS updated_at timestamptz DEFAULT now();
+ALTER TABLE public.matches ADD COLUMN IF NOT EXISTS updated_at timestamptz DEFAULT now();
+ALTER TABLE public.player_matches ADD COLUMN IF NOT EXISTS updated_at timestamptz DEFAULT now();
+
+CREATE INDEX IF NOT EXISTS idx_players_updated_at ON public.players (updated_at);
+CREATE INDEX IF NOT EXISTS idx_matches_updated_at ON public.matches (updated_at);
+CREATE INDEX IF NOT EXISTS idx_player_matches_updated_at ON public.player_matches (updated_at);
+
+DROP TRIGGER IF EXISTS players_touch_updated_at ON public.players;
+CREATE TRIGGER players_touch_updated_at BEFORE INSERT OR UPDATE ON public.players
+    FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+DROP TRIGGER IF EXISTS matches_touch_updated_at ON public.matches;
+CREATE TRIGGER matches_touch_updated_at BEFORE INSERT OR UPDATE ON public.matches
+    FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+DROP TRIGGER IF EXISTS player_matches_touch_updated_at ON public.player_matches;
+CREATE TRIGGER player_matches_touch_updated_at BEFORE INSERT OR UPDATE ON public.player_matches
+    FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
 """
 
+# Conflict keys of each table, in load order (player_matches references
+# the other two)
+TABLE_KEYS = {
+    "players": ("account_id",),
+    "matches": ("match_id",),
+    "player_matches": ("account_id", "match_id"),
+}
+
+
+def read_normalized(normalized_path: str) -> Dict[str, Iterable[Dict]]:
+    """Open the rows of each table from an NDJSON directory or legacy JSON file.
+
+    NDJSON files are read lazily; the legacy ``normalized.json`` layout is
+    loaded in full.
+    """
+
+    path = Path(normalized_path)
+    if path.is_dir():
+        return {table: iter_rows(path / f"{table}.ndjson") for table in TABLE_KEYS}
+
+    with open(path, "r", encoding="utf-8") as handle:
+        payload = json.load(handle)
+    return {
+        "players": payload.get("players", {}).values(),
+        "matches": payload.get("matches", {}).values(),
+        "player_matches": payload.get("player_matches", []),
+    }
+
+
+def _csv_field(value: Any) -> str:
+    if value is None:
+        return ""  # unquoted empty field is NULL in COPY csv
+    if isinstance(value, bool):
+        return "1" if value else "0"  # valid for both boolean and integer columns
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+class _CsvStream(io.RawIOBase):
+    """File-like view of rows encoded as CSV, produced on demand for COPY."""
+
+    def __init__(self, rows: Iterable[Dict], columns: Sequence[str]) -> None:
+        self._rows = iter(rows)
+        self._columns = columns
+        self._buffer = b""
+        self.count = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            line = ",".join(_csv_field(row.get(column)) for column in self._columns)
+            self._buffer += (line + "\n").encode("utf-8")
+            self.count += 1
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
 
 class SupabaseSchemaManager:
     """Applies the OpenDota schema using a Postgres connection string."""
@@ -96,62 +209,234 @@ class SupabaseSchemaManager:
     def ddl(self) -> str:
         return SCHEMA_SQL
 
+    def bulk_load(self, normalized_path: str) -> Dict[str, Dict[str, Any]]:
+        """Load normalized rows with ``COPY`` + merge, bypassing PostgREST.
+
+        For each table (in FK order) rows are streamed into a temporary
+        staging table shaped like the target, then merged with
+        ``INSERT ... SELECT DISTINCT ON (key) ... ON CONFLICT DO UPDATE``
+        (the last staged row of a key wins). Everything runs in one
+        transaction: either all tables are loaded or none.
+
+        Returns per-table ``rows`` staged, ``merged`` rows and
+        ``rows_per_sec``.
+        """
+
+        if not self.connection_uri:
+            raise RuntimeError("Set SUPABASE_DB_URL (service role) to run bulk loads.")
+
+        sources = read_normalized(normalized_path)
+        stats: Dict[str, Dict[str, Any]] = {}
+        conn = psycopg2.connect(self.connection_uri)
+        try:
+            with conn.cursor() as cur:
+                for table, keys in TABLE_KEYS.items():
+                    started = time.monotonic()
+                    staged, merged = self._copy_merge(cur, table, keys, sources[table])
+                    elapsed = time.monotonic() - started
+                    stats[table] = {
+                        "rows": staged,
+                        "merged": merged,
+                        "seconds": round(elapsed, 3),
+                        "rows_per_sec": round(staged / elapsed, 1) if elapsed > 0 else None,
+                    }
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return stats
+
+    @staticmethod
+    def _copy_merge(cur, table: str, keys: Sequence[str], rows: Iterable[Dict]) -> tuple[int, int]:
+        cur.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = 'public' AND table_name = %s ORDER BY ordinal_position",
+            (table,),
+        )
+        columns = [name for (name,) in cur.fetchall()]
+        if not columns:
+            raise RuntimeError(f"Table public.{table} not found; run apply() first.")
+
+        stage = f"_stage_{table}"
+        column_list = ", ".join(columns)
+        key_list = ", ".join(keys)
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in columns if c not in keys)
+
+        cur.execute(
+            f"CREATE TEMP TABLE {stage} (LIKE public.{table} INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+        # Arrival order, so the last row of a duplicated key wins the merge
+        cur.execute(f"ALTER TABLE {stage} ADD COLUMN _ord bigserial")
+        stream = _CsvStream(rows, columns)
+        cur.copy_expert(f"COPY {stage} ({column_list}) FROM STDIN WITH (FORMAT csv)", stream)
+        cur.execute(
+            f"INSERT INTO public.{table} ({column_list}) "
+            f"SELECT DISTINCT ON ({key_list}) {column_list} FROM {stage} "
+            f"ORDER BY {key_list}, _ord DESC "
+            f"ON CONFLICT ({key_list}) DO "
+            + (f"UPDATE SET {updates}" if updates else "NOTHING")
+        )
+        merged = cur.rowcount
+        cur.execute(f"DROP TABLE {stage}")
+        return stream.count, merged
+
+
+# SQLSTATE classes that will fail again on retry (bad data, constraint
+# violations, undefined objects); anything else is treated as transient
+PERMANENT_SQLSTATE_CLASSES = ("22", "23", "42")
+
+
+def _is_transient(exc: Exception) -> bool:
+    code = str(getattr(exc, "code", "") or "")
+    if code.startswith("PGRST") or code[:2] in PERMANENT_SQLSTATE_CLASSES:
+        return False
+    return True
+
 
 class SupabaseLoader:
-    """Loads normalized ingestion artifacts into Supabase tables."""
+    """Loads normalized ingestion artifacts into Supabase tables.
+
+    Rows are split into chunks bounded by ``chunk_size`` rows and
+    ``max_chunk_bytes`` of JSON, and up to ``concurrency`` chunks are in
+    flight at once over the client's pooled HTTP connection. Chunks that
+    fail with a transient error are attempted up to ``max_retries`` times
+    in total, with jittered exponential backoff. Throughput per table is kept in
+    ``load_stats`` after each upsert.
+    """
 
     def __init__(
         self,
         supabase_url: Optional[str] = None,
         supabase_key: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        max_chunk_bytes: int = 1_000_000,
+        max_retries: int = 3,
     ) -> None:
         url = supabase_url or os.getenv("SUPABASE_URL")
         key = supabase_key or os.getenv("SUPABASE_SERVICE_KEY") or os.getenv("SUPABASE_ANON_KEY")
         if not url or not key:
             raise RuntimeError("Supabase URL/key not configured.")
         self.client: Client = create_client(url, key)
+        self.concurrency = max(1, concurrency or int(os.getenv("SUPABASE_LOAD_CONCURRENCY", "4")))
+        self.max_chunk_bytes = max_chunk_bytes
+        self.max_retries = max_retries
+        self.load_stats: Dict[str, Dict[str, Any]] = {}
+        self._stats_lock = threading.Lock()
 
     # ---------------------- PUBLIC API ----------------------
-    def load_normalized(self, normalized_path: str) -> Dict[str, int]:
-        with open(normalized_path, "r", encoding="utf-8") as handle:
-            payload = json.load(handle)
+    def load_normalized(self, normalized_path: str, chunk_size: int = 500) -> Dict[str, int]:
+        """Upsert normalized rows in chunks of ``chunk_size``.
 
-        player_count = self.upsert_players(payload.get("players", {}).values())
-        match_count = self.upsert_matches(payload.get("matches", {}).values())
-        pm_count = self.upsert_player_matches(payload.get("player_matches", []))
+        ``normalized_path`` is either the per-table NDJSON directory
+        written by the ingestor (streamed, constant memory) or a legacy
+        ``normalized.json`` file. Tables are loaded players, matches, then
+        player_matches (which references the other two); chunks of each
+        table are uploaded concurrently, see ``load_stats`` for rows/sec.
+        """
+
+        sources = read_normalized(normalized_path)
+        player_count = self.upsert_players(sources["players"], chunk_size=chunk_size)
+        match_count = self.upsert_matches(sources["matches"], chunk_size=chunk_size)
+        pm_count = self.upsert_player_matches(sources["player_matches"], chunk_size=chunk_size)
         return {
             "players": player_count,
             "matches": match_count,
             "player_matches": pm_count,
         }
 
-    def upsert_players(self, players: Iterable[Dict]) -> int:
-        records = list(players)
-        if not records:
-            return 0
-        self.client.table("players").upsert(records, on_conflict="account_id").execute()
-        return len(records)
-
-    def upsert_matches(self, matches: Iterable[Dict]) -> int:
-        records = list(matches)
-        if not records:
-            return 0
-        self.client.table("matches").upsert(records, on_conflict="match_id").execute()
-        return len(records)
-
-    def upsert_player_matches(self, player_matches: Iterable[Dict]) -> int:
-        records = list(player_matches)
-        if not records:
-            return 0
-
-        # Chunk to avoid exceeding Supabase payload limits
-        chunk_size = 500
-        for start in range(0, len(records), chunk_size):
-            chunk = records[start : start + chunk_size]
-            self.client.table("player_matches").upsert(
-                chunk, on_conflict="account_id,match_id"
-            ).execute()
-        return len(records)
+    def upsert_players(self, players: Iterable[Dict], chunk_size: int = 500) -> int:
+        return self._upsert_chunks("players", players, TABLE_KEYS["players"], chunk_size)
+
+    def upsert_matches(self, matches: Iterable[Dict], chunk_size: int = 500) -> int:
+        return self._upsert_chunks("matches", matches, TABLE_KEYS["matches"], chunk_size)
+
+    def upsert_player_matches(self, player_matches: Iterable[Dict], chunk_size: int = 500) -> int:
+        return self._upsert_chunks(
+            "player_matches", player_matches, TABLE_KEYS["player_matches"], chunk_size
+        )
+
+    def _upsert_chunks(
+        self, table: str, rows: Iterable[Dict], key_fields: Sequence[str], chunk_size: int
+    ) -> int:
+        """Upsert rows in concurrent chunks without materializing the iterable.
+
+        Rows are hash-partitioned by key into ``concurrency`` lanes; each
+        lane uploads its chunks one at a time, in input order, so when a
+        key repeats (e.g. a player refreshed by an incremental run) the
+        last row written wins, as in ``bulk_load``. At most
+        ``2 * concurrency`` chunks wait for their lane, so memory stays
+        bounded for arbitrarily large NDJSON files. Rows repeating a key
+        inside a chunk are collapsed (last one wins), since Postgres
+        rejects an upsert touching the same row twice.
+        """
+
+        on_conflict = ",".join(key_fields)
+        stats = {"rows": 0, "chunks": 0, "retries": 0}
+        started = time.monotonic()
+        backlog: List[deque] = [deque() for _ in range(self.concurrency)]
+        in_flight: Dict[Any, int] = {}
+
+        with ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix=f"supabase-{table}"
+        ) as executor:
+
+            def start(lane: int) -> None:
+                if backlog[lane] and lane not in in_flight.values():
+                    future = executor.submit(
+                        self._upsert_with_retry, table, backlog[lane].popleft(), on_conflict, stats
+                    )
+                    in_flight[future] = lane
+
+            def settle() -> None:
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    lane = in_flight.pop(future)
+                    stats["rows"] += future.result()
+                    stats["chunks"] += 1
+                    start(lane)
+
+            try:
+                # Chunk to avoid exceeding Supabase payload limits
+                for lane, chunk in iter_partitioned_chunks(
+                    rows, key_fields, self.concurrency, chunk_size, self.max_chunk_bytes
+                ):
+                    unique = {tuple(row.get(field) for field in key_fields): row for row in chunk}
+                    backlog[lane].append(list(unique.values()))
+                    start(lane)
+                    # Every lane with a backlog has a chunk in flight, so this always progresses
+                    while sum(len(queue) for queue in backlog) >= 2 * self.concurrency:
+                        settle()
+                while in_flight:
+                    settle()
+            except Exception:
+                for future in in_flight:
+                    future.cancel()
+                raise
+
+        elapsed = time.monotonic() - started
+        self.load_stats[table] = {
+            **stats,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(stats["rows"] / elapsed, 1) if elapsed > 0 else None,
+        }
+        return stats["rows"]
+
+    def _upsert_with_retry(
+        self, table: str, records: List[Dict], on_conflict: str, stats: Dict[str, int]
+    ) -> int:
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                self.client.table(table).upsert(records, on_conflict=on_conflict).execute()
+                return len(records)
+            except Exception as exc:
+                if attempt == self.max_retries or not _is_transient(exc):
+                    raise
+                with self._stats_lock:
+                    stats["retries"] += 1
+                time.sleep(random.uniform(0, min(30.0, 2 ** (attempt - 1))))
+        return 0
 
     # ---------------------- REFERENCE LOADING (OPTIONAL) ----------------------
     def load_reference_data(
@@ -3,7 +3,8 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 import pandas as pd
 import streamlit as st
@@ -11,6 +12,46 @@ from supabase import Client, create_client
 
 PAGE_TITLE = "OpenDota • Supabase • Streamlit"
 
+# Colunas que cada visão realmente usa; evita trazer o registro inteiro
+TABLE_COLUMNS: Dict[str, Sequence[str]] = {
+    "players": ("account_id", "personaname"),
+    "matches": ("match_id",),
+    "player_matches": (
+        "account_id",
+        "match_id",
+        "hero_id",
+        "start_time",
+        "kills",
+        "deaths",
+        "assists",
+        "gold_per_min",
+        "xp_per_min",
+    ),
+}
+
+# Chave primária de cada tabela, usada na paginação por keyset (precisa
+# ser única; a divisão em faixas paralelas exige primeira chave inteira)
+TABLE_KEYS: Dict[str, Tuple[str, ...]] = {
+    "players": ("account_id",),
+    "matches": ("match_id",),
+    "player_matches": ("account_id", "match_id"),
+}
+# Versão da linha usada para buscar só o que mudou: ``updated_at`` é
+# carimbado por trigger em todo insert/update (ver SCHEMA_SQL do loader),
+# então partidas antigas reprocessadas também entram no delta. Sem ela,
+# qualquer mudança de versão recarrega a tabela inteira
+DELTA_KEYS: Dict[str, Optional[str]] = {
+    "players": "updated_at",
+    "matches": "updated_at",
+    "player_matches": "updated_at",
+}
+PAGE_SIZE = int(os.getenv("OPENDOTA_DASHBOARD_PAGE_SIZE", "1000"))
+FETCH_WORKERS = int(os.getenv("OPENDOTA_DASHBOARD_FETCH_WORKERS", "4"))
+STAMP_TTL = int(os.getenv("OPENDOTA_DASHBOARD_STAMP_TTL", "30"))
+# Margem do delta: cobre transações que gravaram antes do último carimbo
+# visto mas só fizeram commit depois da leitura anterior
+DELTA_OVERLAP = int(os.getenv("OPENDOTA_DASHBOARD_DELTA_OVERLAP", "300"))
+
 
 def _build_client() -> Client:
     url = os.getenv("SUPABASE_URL")
@@ -83,9 +124,145 @@ def main() -> None:
 
 
 def load_table(client: Client, table: str) -> pd.DataFrame:
-    response = client.table(table).select("*").execute()
-    data: List[Dict[str, Any]] = response.data or []
-    return pd.DataFrame(data)
+    """Tabela completa, em cache enquanto a versão (estimativa + maior carimbo) não muda."""
+
+    return _load_snapshot(client, table, table_stamp(client, table))
+
+
+@st.cache_data(show_spinner=False, ttl=STAMP_TTL)
+def table_stamp(_client: Client, table: str) -> Tuple[int, str, Any]:
+    """Versão barata da tabela: ``(linhas estimadas, coluna, maior valor da coluna)``.
+
+    A contagem vem do planejador (``count="planned"``), sem varrer a
+    tabela; quem detecta mudanças é o maior ``updated_at``. Tabelas ainda
+    sem essa coluna usam a primeira chave primária e não têm delta.
+    """
+
+    columns = [DELTA_KEYS.get(table), TABLE_KEYS[table][0]]
+    for column in filter(None, columns):
+        try:
+            response = (
+                _client.table(table).select(column, count="planned").order(column, desc=True).limit(1).execute()
+            )
+        except Exception:
+            if column == columns[-1]:
+                raise
+            continue
+        data = response.data or []
+        return int(response.count or 0), column, (data[0][column] if data else None)
+    raise RuntimeError(f"Sem chave para versionar a tabela {table}")
+
+
+@st.cache_resource(show_spinner=False)
+def _snapshots() -> Dict[str, Tuple[Tuple[int, str, Any], pd.DataFrame]]:
+    """Última versão carregada de cada tabela (base para o carregamento incremental)."""
+
+    return {}
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _load_snapshot(_client: Client, table: str, stamp: Tuple[int, str, Any]) -> pd.DataFrame:
+    _, column, _ = stamp
+    keys = list(TABLE_KEYS[table])
+    delta_key = DELTA_KEYS.get(table)
+    previous = _snapshots().get(table)
+
+    df: Optional[pd.DataFrame] = None
+    if previous is not None and delta_key and column == delta_key:
+        (_, previous_column, last_seen), previous_df = previous
+        if previous_column == delta_key and last_seen is not None:
+            # Linhas inseridas ou atualizadas desde o último carimbo (com
+            # margem); o pipeline só faz upsert, então não há remoções
+            since = (pd.Timestamp(last_seen) - pd.Timedelta(seconds=DELTA_OVERLAP)).isoformat()
+            changed = _walk(_client, table, [delta_key, *keys], lambda q: q.gte(delta_key, since))
+            changed_df = pd.DataFrame(changed).drop(columns=[delta_key], errors="ignore")
+            df = pd.concat([previous_df, changed_df], ignore_index=True)
+            df = df.drop_duplicates(subset=keys, keep="last").reset_index(drop=True)
+
+    if df is None:
+        df = pd.DataFrame(_fetch_all(_client, table))
+
+    _snapshots()[table] = (stamp, df)
+    return df
+
+
+def _fetch_all(client: Client, table: str) -> List[Dict[str, Any]]:
+    """Percorre a tabela em paralelo: faixas da primeira chave, cada uma por keyset.
+
+    As faixas só são usadas quando a primeira chave é inteira; senão a
+    tabela é percorrida por um único keyset.
+    """
+
+    keys = list(TABLE_KEYS[table])
+    first = keys[0]
+    low = _edge(client, table, first, desc=False)
+    high = _edge(client, table, first, desc=True)
+    if low is None or high is None:
+        return []
+    if not all(isinstance(edge, int) and not isinstance(edge, bool) for edge in (low, high)):
+        return _walk(client, table, keys, lambda q: q)
+
+    workers = max(1, FETCH_WORKERS)
+    step = max(1, (high - low + workers) // workers)
+    bounds = [(low + i * step, low + (i + 1) * step) for i in range(workers) if low + i * step <= high]
+
+    def walk_range(bound: Tuple[int, int]) -> List[Dict[str, Any]]:
+        start, stop = bound
+        return _walk(client, table, keys, lambda q: q.gte(first, start).lt(first, stop))
+
+    with ThreadPoolExecutor(max_workers=len(bounds)) as executor:
+        rows: List[Dict[str, Any]] = []
+        for chunk in executor.map(walk_range, bounds):
+            rows.extend(chunk)
+    return rows
+
+
+def _edge(client: Client, table: str, column: str, desc: bool) -> Any:
+    data = client.table(table).select(column).order(column, desc=desc).limit(1).execute().data or []
+    return data[0][column] if data else None
+
+
+def _walk(
+    client: Client,
+    table: str,
+    keys: Sequence[str],
+    scope: Callable[[Any], Any],
+) -> List[Dict[str, Any]]:
+    """Pagina por keyset (``chave > último visto``) até uma página vir vazia.
+
+    Parar só na página vazia, e não numa página curta, evita perder linhas
+    quando o ``max-rows`` do PostgREST é menor que ``PAGE_SIZE``.
+    """
+
+    columns = ",".join(dict.fromkeys([*keys, *TABLE_COLUMNS.get(table, ())]))
+    rows: List[Dict[str, Any]] = []
+    cursor: Optional[Tuple[Any, ...]] = None
+    while True:
+        query = scope(client.table(table).select(columns))
+        if cursor is not None:
+            query = _after(query, keys, cursor)
+        for key in keys:
+            query = query.order(key)
+        page = query.limit(PAGE_SIZE).execute().data or []
+        if not page:
+            return rows
+        rows.extend(page)
+        cursor = tuple(page[-1][key] for key in keys)
+
+
+def _after(query: Any, keys: Sequence[str], cursor: Tuple[Any, ...]) -> Any:
+    """Filtro ``(k1, k2, ...) > cursor`` em ordem lexicográfica."""
+
+    if len(keys) == 1:
+        return query.gt(keys[0], cursor[0])
+    # Valores entre aspas: carimbos ISO têm ':' e '.', reservados no or=()
+    values = [f'"{value}"' for value in cursor]
+    branches = []
+    for position, key in enumerate(keys):
+        equal = [f"{keys[i]}.eq.{values[i]}" for i in range(position)]
+        branch = f"{key}.gt.{values[position]}"
+        branches.append(f"and({','.join(equal)},{branch})" if equal else branch)
+    return query.or_(",".join(branches))
 
 
 def compute_average_kda(df: pd.DataFrame) -> float:
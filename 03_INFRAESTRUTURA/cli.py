@@ -8,6 +8,7 @@ Uso:
     python cli.py timeline [--limit 10]
     python cli.py knowledge [--format json|markdown]
     python cli.py search "termo"
+    python cli.py batch tarefas.txt [--concurrency 8] [--per-provider 4]
     python cli.py help
 """
 
@@ -23,6 +24,7 @@ from tabulate import tabulate
 sys.path.insert(0, str(Path(__file__).parent))
 
 from app.agents.evolutionary_agent import EvolutionaryAgent
+from app.agents.batch_runner import BatchRunner, load_batch_file
 from dotenv import load_dotenv
 import os
 
@@ -62,7 +64,8 @@ class PrometheusCLI:
     # ==================== COMANDOS ====================
     
     def cmd_task(self, description: str, context: Optional[str] = None, 
-                 files_context: Optional[list] = None) -> None:
+                 files_context: Optional[list] = None, use_cache: bool = True,
+                 stream: bool = True) -> None:
         """Processar uma nova tarefa"""
         self.print_header("🚀 PROCESSANDO TAREFA")
         
@@ -76,16 +79,35 @@ class PrometheusCLI:
         self.print_colored("Processando...", 'warning')
         
         try:
-            result = self.agent.process_task(
-                task_description=description,
-                context=context or '',
-                files_context=files_context or []
-            )
-            
-            self.print_colored("✓ Tarefa processada com sucesso!", 'success')
+            task_kwargs = {
+                "task_description": description,
+                "context": context or '',
+                "files_context": files_context or [],
+                "use_cache": use_cache
+            }
             
-            self.print_colored("\n📋 RESPOSTA:", 'info')
-            print(f"{result.get('response', 'Sem resposta')}\n")
+            if stream:
+                # Exibir tokens ao vivo; a evolução é registrada ao final do stream
+                self.print_colored("\n📋 RESPOSTA:", 'info')
+                result = {}
+                for event in self.agent.process_task_stream(**task_kwargs):
+                    if event["type"] == "token":
+                        print(event["content"], end='', flush=True)
+                    else:
+                        result = event["result"]
+                print("\n")
+                
+                if result.get('status') != 'success':
+                    self.print_colored(f"✗ {result.get('response', 'Erro ao processar tarefa')}", 'error')
+                    sys.exit(1)
+                self.print_colored("✓ Tarefa processada com sucesso!", 'success')
+            else:
+                result = self.agent.process_task(**task_kwargs)
+                
+                self.print_colored("✓ Tarefa processada com sucesso!", 'success')
+                
+                self.print_colored("\n📋 RESPOSTA:", 'info')
+                print(f"{result.get('response', 'Sem resposta')}\n")
             
             if result.get('learning_points'):
                 self.print_colored("📚 Pontos de Aprendizado:", 'info')
@@ -173,31 +195,13 @@ class PrometheusCLI:
         self.print_header(f"🔍 BUSCANDO: '{query}'")
         
         try:
-            knowledge = self.agent.export_knowledge(format='json')
-            
-            if isinstance(knowledge, str):
-                knowledge = json.loads(knowledge)
-            
-            results = []
-            
-            # Buscar em learning_points
-            if 'learning_base' in knowledge:
-                for point in knowledge['learning_base']:
-                    if query.lower() in point.lower():
-                        results.append(('Learning Point', point))
-            
-            # Buscar em tasks
-            if 'tasks' in knowledge:
-                for task in knowledge['tasks']:
-                    task_desc = task.get('task_description', '')
-                    if query.lower() in task_desc.lower():
-                        results.append(('Tarefa', task_desc[:50]))
+            results = self.agent.search_knowledge(query)
             
             if results:
                 self.print_colored(f"✓ Encontrado {len(results)} resultado(s):", 'success')
-                for item_type, content in results:
-                    print(f"\n  [{item_type}]")
-                    print(f"  {content}")
+                for item in results:
+                    print(f"\n  [{item['task_id']}] score {item['score']:.2f}")
+                    print(f"  {item['highlight']}")
             else:
                 self.print_colored(f"Nenhum resultado encontrado para '{query}'", 'warning')
             
@@ -205,6 +209,59 @@ class PrometheusCLI:
             self.print_colored(f"✗ Erro ao buscar: {str(e)}", 'error')
             sys.exit(1)
     
+    def cmd_batch(self, file_path: str, concurrency: Optional[int] = None,
+                  per_provider: Optional[int] = None, provider: Optional[str] = None,
+                  model: Optional[str] = None, use_cache: bool = True,
+                  output: Optional[str] = None) -> None:
+        """Processar um lote de tarefas em paralelo"""
+        self.print_header(f"📦 LOTE: {file_path}")
+        
+        try:
+            tasks = load_batch_file(file_path)
+            if not tasks:
+                self.print_colored("Nenhuma tarefa encontrada no arquivo", 'warning')
+                return
+            
+            runner = BatchRunner(self.agent, max_concurrency=concurrency,
+                                 per_provider_concurrency=per_provider)
+            self.print_colored(
+                f"Processando {len(tasks)} tarefa(s) "
+                f"(concorrência {runner.max_concurrency}, {runner.per_provider_concurrency} por provedor)...",
+                'warning'
+            )
+            
+            def progress(entry: Dict[str, Any]) -> None:
+                color = 'success' if entry['status'] == 'success' else 'error'
+                self.print_colored(
+                    f"  [{entry['index'] + 1}/{len(tasks)}] {entry['status']} "
+                    f"({entry['provider']}, {entry['elapsed_time']:.2f}s)", color
+                )
+            
+            summary = runner.run(tasks, provider=provider, model=model,
+                                 use_cache=use_cache, on_result=progress)
+            
+            rows = [
+                [entry['index'] + 1, entry['description'][:50], entry['provider'],
+                 entry['status'], f"{entry['elapsed_time']:.2f}s"]
+                for entry in summary['results']
+            ]
+            print()
+            print(tabulate(rows, headers=['#', 'Tarefa', 'Provedor', 'Status', 'Tempo'], tablefmt='grid'))
+            
+            self.print_colored(
+                f"\n✓ {summary['succeeded']}/{summary['total']} concluída(s) em {summary['elapsed_time']:.2f}s",
+                'success' if not summary['failed'] else 'warning'
+            )
+            
+            if output:
+                with open(output, 'w', encoding='utf-8') as f:
+                    json.dump(summary, f, indent=2, ensure_ascii=False)
+                self.print_colored(f"✓ Resultados salvos em: {output}", 'success')
+            
+        except Exception as e:
+            self.print_colored(f"✗ Erro ao processar lote: {str(e)}", 'error')
+            sys.exit(1)
+    
     def cmd_help(self) -> None:
         """Mostrar ajuda de comandos"""
         help_text = """
@@ -214,11 +271,13 @@ class PrometheusCLI:
 
 COMANDOS DISPONÍVEIS:
 
-📝 task <descrição> [--context <contexto>]
+📝 task <descrição> [--context <contexto>] [--no-cache] [--no-stream]
    Processar uma nova tarefa
    Exemplo:
      python cli.py task "Crie um exemplo de Juniper"
      python cli.py task "Analise o código" --context "Python 3.11"
+     python cli.py task "Resumo do dia" --no-cache
+     python cli.py task "Gere um relatório" --no-stream
 
 📊 stats
    Mostrar estatísticas do agente
@@ -241,6 +300,12 @@ COMANDOS DISPONÍVEIS:
    Exemplo:
      python cli.py search "integração"
 
+📦 batch <arquivo> [--concurrency N] [--per-provider N] [--provider P] [--model M]
+   Processar um lote de tarefas em paralelo (.txt, .md, .json ou .jsonl)
+   Exemplo:
+     python cli.py batch tarefas.txt --concurrency 8
+     python cli.py batch Tarefas.MD --provider anthropic --output resultados.json
+
 ℹ️  help
    Mostrar esta mensagem
 
@@ -269,6 +334,10 @@ CONFIGURAÇÃO:
         task_parser = subparsers.add_parser('task', help='Processar tarefa')
         task_parser.add_argument('description', help='Descrição da tarefa')
         task_parser.add_argument('--context', '-c', help='Contexto da tarefa')
+        task_parser.add_argument('--no-cache', action='store_true',
+                                 help='Ignorar o cache de respostas do LLM')
+        task_parser.add_argument('--no-stream', action='store_true',
+                                 help='Aguardar a resposta completa em vez de exibir ao vivo')
         
         # Comando: stats
         subparsers.add_parser('stats', help='Mostrar estatísticas')
@@ -287,6 +356,17 @@ CONFIGURAÇÃO:
         search_parser = subparsers.add_parser('search', help='Buscar conhecimento')
         search_parser.add_argument('query', help='Termo a buscar')
         
+        # Comando: batch
+        batch_parser = subparsers.add_parser('batch', help='Processar lote de tarefas')
+        batch_parser.add_argument('file', help='Arquivo com as tarefas')
+        batch_parser.add_argument('--concurrency', type=int, help='Tarefas simultâneas no lote')
+        batch_parser.add_argument('--per-provider', type=int, help='Tarefas simultâneas por provedor')
+        batch_parser.add_argument('--provider', help='Provedor das tarefas (padrão: atual)')
+        batch_parser.add_argument('--model', help='Modelo das tarefas')
+        batch_parser.add_argument('--output', '-o', help='Salvar resultados em JSON')
+        batch_parser.add_argument('--no-cache', action='store_true',
+                                  help='Ignorar o cache de respostas do LLM')
+        
         # Comando: help
         subparsers.add_parser('help', help='Mostrar ajuda')
         
@@ -299,7 +379,8 @@ CONFIGURAÇÃO:
         
         # Executar comando apropriado
         if parsed.command == 'task':
-            self.cmd_task(parsed.description, parsed.context)
+            self.cmd_task(parsed.description, parsed.context,
+                          use_cache=not parsed.no_cache, stream=not parsed.no_stream)
         elif parsed.command == 'stats':
             self.cmd_stats()
         elif parsed.command == 'timeline':
@@ -308,6 +389,10 @@ CONFIGURAÇÃO:
             self.cmd_knowledge(parsed.format)
         elif parsed.command == 'search':
             self.cmd_search(parsed.query)
+        elif parsed.command == 'batch':
+            self.cmd_batch(parsed.file, parsed.concurrency, parsed.per_provider,
+                           parsed.provider, parsed.model, use_cache=not parsed.no_cache,
+                           output=parsed.output)
         elif parsed.command == 'help':
             self.cmd_help()
         else:
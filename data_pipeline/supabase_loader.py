@@ -8,8 +8,9 @@ This loader expects a normalized payload with the following collections:
 - player_matches
 - interval_stats
 
-It upserts data into Supabase using primary/conflict keys, refreshes materialized
-views, and performs basic integrity checks after the load.
+It upserts data into Supabase using primary/conflict keys, merges the analytics
+aggregates of the loaded matches (falling back to a full rebuild), and performs
+basic integrity checks after the load.
 """
 from __future__ import annotations
 
@@ -22,6 +23,9 @@ import httpx
 from supabase import Client, create_client
 from supabase.lib.client_options import ClientOptions
 
+# PostgREST / Postgres codes for an RPC function that does not exist
+MISSING_FUNCTION_CODES = ("PGRST202", "42883")
+
 
 @dataclass
 class SupabaseConfig:
@@ -67,7 +71,41 @@ class SupabaseLoader:
         response = self.client.table(table).upsert(rows, on_conflict=",".join(conflict_keys), count="exact").execute()
         return int(response.count or 0)
 
-    def refresh_materialized_views(self) -> None:
+    def refresh_analytics(self, match_ids: Sequence[str]) -> str:
+        """Update analytics for the loaded matches only.
+
+        Calls the ``merge_analytics_deltas`` RPC
+        (supabase/migrations/0003_incremental_analytics.sql), which recomputes
+        the ``agg_*`` rows of the (player, day), hero and (hero, item) keys
+        touched by ``match_ids``; the ``mv_*`` views read those tables. Without
+        match ids, or if the delta merge fails, falls back to
+        ``refresh_materialized_views``. Returns the strategy used.
+        """
+
+        if match_ids:
+            try:
+                self.client.rpc("merge_analytics_deltas", {"p_match_ids": list(match_ids)}).execute()
+                return "delta"
+            except Exception:
+                pass
+        return self.refresh_materialized_views()
+
+    def refresh_materialized_views(self) -> str:
+        """Rebuild every analytics aggregate once.
+
+        With migration 0003 this is a single ``merge_analytics_deltas(NULL)``
+        call (each legacy helper would repeat that full rebuild). Only when the
+        function does not exist are the legacy materialized views refreshed.
+        Returns ``"rebuild"`` or ``"refresh"``.
+        """
+
+        try:
+            self.client.rpc("merge_analytics_deltas", {"p_match_ids": None}).execute()
+            return "rebuild"
+        except Exception as exc:
+            if str(getattr(exc, "code", "")) not in MISSING_FUNCTION_CODES:
+                raise
+
         rpc_names = [
             "refresh_materialized_view_mv_player_kda_period",
             "refresh_materialized_view_mv_hero_win_rates",
@@ -79,6 +117,7 @@ class SupabaseLoader:
             except Exception:
                 # If RPC helpers are not present, silently continue. Direct SQL access is unavailable via supabase-py.
                 continue
+        return "refresh"
 
     def load_payload(self, payload: Dict[str, List[Dict[str, Any]]]) -> Dict[str, int]:
         """Load a normalized payload into Supabase with ordered upserts."""
@@ -98,7 +137,13 @@ class SupabaseLoader:
             ),
         }
 
-        self.refresh_materialized_views()
+        match_ids = {
+            str(row["match_id"])
+            for table in ("matches", "player_matches", "interval_stats")
+            for row in payload.get(table, [])
+            if row.get("match_id") is not None
+        }
+        self.refresh_analytics(sorted(match_ids))
         counts.update(self.validate_row_counts(payload))
         counts.update(self.validate_foreign_keys_after_load())
         return counts
@@ -118,27 +163,26 @@ class SupabaseLoader:
         return results
 
     def validate_foreign_keys_after_load(self) -> Dict[str, int]:
-        """Check for missing player/match references after inserts."""
-
-        players_resp = self.client.table("players").select("player_id").execute()
-        matches_resp = self.client.table("matches").select("match_id").execute()
-        player_ids = {row["player_id"] for row in players_resp.data or []}
-        match_ids = {row["match_id"] for row in matches_resp.data or []}
-
-        player_matches_resp = self.client.table("player_matches").select("player_id,match_id").execute()
-        interval_resp = self.client.table("interval_stats").select("player_id,match_id").execute()
-
-        missing_player_refs = len([row for row in (player_matches_resp.data or []) if row["player_id"] not in player_ids])
-        missing_match_refs = len([row for row in (player_matches_resp.data or []) if row["match_id"] not in match_ids])
-        missing_interval_player_refs = len([row for row in (interval_resp.data or []) if row["player_id"] not in player_ids])
-        missing_interval_match_refs = len([row for row in (interval_resp.data or []) if row["match_id"] not in match_ids])
-
-        return {
-            "player_matches_missing_players": missing_player_refs,
-            "player_matches_missing_matches": missing_match_refs,
-            "interval_stats_missing_players": missing_interval_player_refs,
-            "interval_stats_missing_matches": missing_interval_match_refs,
-        }
+        """Count missing player/match references after inserts.
+
+        Orphans are counted in the database by the ``validate_foreign_keys``
+        RPC (supabase/migrations/0002_validate_foreign_keys.sql), so only the
+        counts cross the wire. Counts are -1 when the RPC is unavailable.
+        """
+
+        keys = [
+            "player_matches_missing_players",
+            "player_matches_missing_matches",
+            "interval_stats_missing_players",
+            "interval_stats_missing_matches",
+        ]
+        try:
+            response = self.client.rpc("validate_foreign_keys").execute()
+            data = response.data
+            row = data[0] if isinstance(data, list) else data
+            return {key: int(row[key]) for key in keys}
+        except Exception:
+            return {key: -1 for key in keys}
 
     def _validate_foreign_key_inputs(self, payload: Dict[str, List[Dict[str, Any]]]) -> None:
         players = {row.get("player_id") for row in payload.get("players", [])}
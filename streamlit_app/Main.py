@@ -1,7 +1,8 @@
 import os
-import os
+import sys
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 import altair as alt
 import pandas as pd
@@ -9,10 +10,37 @@ import streamlit as st
 from dotenv import load_dotenv
 from supabase import Client, ClientOptions, create_client
 
+# Same streaming exporters as the OpenDota ingestion (03_INFRAESTRUTURA/app/data/exporters.py);
+# the module has no package-relative imports, so its directory is put on the path on its own
+EXPORTERS_DIR = str(Path(__file__).resolve().parents[1] / "03_INFRAESTRUTURA" / "app" / "data")
+if EXPORTERS_DIR not in sys.path:
+    sys.path.append(EXPORTERS_DIR)
+import exporters  # noqa: E402
+
 
 load_dotenv()
 CACHE_TTL = int(os.getenv("CACHE_TTL_SECONDS", "600"))
 CACHE_HASH_FUNCS = {Client: lambda _: "supabase-client"}
+# Table read by the player_kpis RPC (supabase/migrations/0004_player_kpis.sql)
+KPI_RPC_TABLE = "pro_matches"
+# Error codes for a projected column the table does not have (Postgres undefined_column, PostgREST schema cache)
+MISSING_COLUMN_CODES = ("42703", "PGRST204")
+
+# Columns each view needs from the pro matches table. Lists only fetch small
+# numeric fields; the heavy JSON columns are loaded for a single match when it
+# is opened (see load_match_detail).
+VIEW_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "match_list": (
+        "id", "match_id", "match_date", "opponent", "win", "hero_id",
+        "kills", "deaths", "assists", "gpm", "xpm",
+    ),
+    # Only used when the player_kpis RPC is unavailable
+    "kpi_fallback": ("hero_id", "win", "kills", "deaths", "assists", "gpm", "xpm", "item_timings"),
+    "match_detail": (
+        "duration", "lane", "last_hits", "denies",
+        "item_purchases", "item_timings", "interval_stats",
+    ),
+}
 
 st.set_page_config(
     page_title="Prometheus | Pro Match Insights",
@@ -62,6 +90,22 @@ def _safe_execute(query: Any) -> List[Dict[str, Any]]:
         return []
 
 
+def _execute_projected(build_query: Callable[[str], Any], columns: Sequence[str]) -> List[Dict[str, Any]]:
+    """Run ``build_query`` selecting only ``columns``.
+
+    Tables that lack one of the declared columns make PostgREST reject the
+    projection; only in that case the query is retried with ``*``. Other
+    errors are reported like in ``_safe_execute``.
+    """
+    try:
+        return build_query(",".join(columns)).execute().data or []
+    except Exception as exc:  # noqa: BLE001
+        if str(getattr(exc, "code", "")) not in MISSING_COLUMN_CODES:
+            st.error(f"Supabase query failed: {exc}")
+            return []
+    return _safe_execute(build_query("*"))
+
+
 @st.cache_data(show_spinner=False, ttl=CACHE_TTL, hash_funcs=CACHE_HASH_FUNCS)
 def load_tournaments(client: Client, table: str) -> List[Dict[str, Any]]:
     query = client.table(table).select("id,name,start_date").order("start_date", desc=True)
@@ -105,72 +149,124 @@ def load_player_matches(
     player_id: str,
     tournament_id: Optional[str],
     hero_id: Optional[str],
+    columns: Tuple[str, ...] = VIEW_COLUMNS["match_list"],
 ) -> List[Dict[str, Any]]:
-    query = (
-        client.table(table)
-        .select("*")
-        .eq("player_id", player_id)
-        .order("match_date", desc=True)
-        .limit(500)
-    )
-    if tournament_id:
-        query = query.eq("tournament_id", tournament_id)
-    if hero_id:
-        query = query.eq("hero_id", hero_id)
-    return _safe_execute(query)
+    def build_query(select: str) -> Any:
+        query = (
+            client.table(table)
+            .select(select)
+            .eq("player_id", player_id)
+            .order("match_date", desc=True)
+            .limit(500)
+        )
+        if tournament_id:
+            query = query.eq("tournament_id", tournament_id)
+        if hero_id:
+            query = query.eq("hero_id", hero_id)
+        return query
 
+    return _execute_projected(build_query, columns)
 
-def compute_kpis(matches: List[Dict[str, Any]]) -> Dict[str, Any]:
-    totals = {"kills": 0, "deaths": 0, "assists": 0, "gpm": 0.0, "xpm": 0.0}
-    hero_counts: Dict[str, Dict[str, int]] = {}
-    item_timings: Dict[str, List[float]] = {}
-
-    for match in matches:
-        totals["kills"] += match.get("kills", 0)
-        totals["deaths"] += match.get("deaths", 0)
-        totals["assists"] += match.get("assists", 0)
-        totals["gpm"] += match.get("gpm", 0.0)
-        totals["xpm"] += match.get("xpm", 0.0)
-
-        hero_id = match.get("hero_id")
-        if hero_id is not None:
-            hero_key = str(hero_id)
-            hero_counts.setdefault(hero_key, {"matches": 0, "wins": 0})
-            hero_counts[hero_key]["matches"] += 1
-            if match.get("win"):
-                hero_counts[hero_key]["wins"] += 1
-
-        for timing in match.get("item_timings", []):
-            item = timing.get("item")
-            time_seconds = timing.get("time")
-            if not item or time_seconds is None:
-                continue
-            item_timings.setdefault(item, []).append(float(time_seconds))
-
-    match_count = max(len(matches), 1)
-    deaths = totals["deaths"] if totals["deaths"] > 0 else 1
-    hero_pool = [
-        {
-            "hero_id": hero,
-            "matches": stats["matches"],
-            "win_rate": round((stats["wins"] / stats["matches"]) * 100, 1) if stats["matches"] else 0.0,
-        }
-        for hero, stats in hero_counts.items()
-    ]
-    hero_pool.sort(key=lambda entry: entry["matches"], reverse=True)
 
-    avg_item_timings = [
-        {"item": item, "avg_purchase_time": round(sum(times) / len(times), 1)}
-        for item, times in item_timings.items()
-    ]
-    avg_item_timings.sort(key=lambda entry: entry["avg_purchase_time"])
+@st.cache_data(show_spinner=False, ttl=CACHE_TTL, hash_funcs=CACHE_HASH_FUNCS)
+def load_match_detail(
+    client: Client,
+    table: str,
+    player_id: str,
+    row_id: Optional[Any],
+    match_id: Optional[Any],
+) -> Dict[str, Any]:
+    """Fetch the detail columns of one match row (by ``id``, else by player + ``match_id``)."""
+
+    def build_query(select: str) -> Any:
+        query = client.table(table).select(select)
+        if row_id is not None:
+            query = query.eq("id", row_id)
+        else:
+            query = query.eq("player_id", player_id).eq("match_id", match_id)
+        return query.limit(1)
+
+    rows = _execute_projected(build_query, VIEW_COLUMNS["match_detail"])
+    return rows[0] if rows else {}
+
+
+@st.cache_data(show_spinner=False, ttl=CACHE_TTL, hash_funcs=CACHE_HASH_FUNCS)
+def load_player_kpis(
+    client: Client,
+    table: str,
+    player_id: str,
+    tournament_id: Optional[str],
+    hero_id: Optional[str],
+) -> Optional[Dict[str, Any]]:
+    """KPIs computed in Postgres by the ``player_kpis`` RPC (all matches, not just the last 500).
+
+    The RPC only reads ``pro_matches``. Returns ``None`` for any other table or when the RPC is not
+    deployed so the caller can fall back to ``compute_kpis``.
+    """
+    if table != KPI_RPC_TABLE:
+        return None
+    params = {
+        "p_player_id": str(player_id),
+        "p_tournament_id": str(tournament_id) if tournament_id else None,
+        "p_hero_id": str(hero_id) if hero_id else None,
+    }
+    try:
+        data = client.rpc("player_kpis", params).execute().data
+    except Exception:  # noqa: BLE001
+        return None
+    if isinstance(data, list):
+        data = data[0] if data else None
+    return data or None
+
+
+def compute_kpis(matches: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fallback KPI computation over already-loaded match rows (vectorized with pandas)."""
+    df = pd.DataFrame(matches)
+    match_count = max(len(df), 1)
+
+    def column_sum(column: str) -> float:
+        if column not in df:
+            return 0.0
+        return float(pd.to_numeric(df[column], errors="coerce").fillna(0).sum())
+
+    kills, deaths, assists = column_sum("kills"), column_sum("deaths"), column_sum("assists")
+    deaths = deaths if deaths > 0 else 1
+
+    hero_pool: List[Dict[str, Any]] = []
+    if "hero_id" in df:
+        # object dtype keeps integer ids as "12" rather than "12.0" when some rows lack a hero
+        heroes = pd.DataFrame(
+            {
+                "hero_id": pd.Series([m.get("hero_id") for m in matches], dtype=object),
+                "win": [bool(m.get("win")) for m in matches],
+            }
+        )
+        heroes = heroes[heroes["hero_id"].notna()].astype({"hero_id": str})
+        grouped = heroes.groupby("hero_id", sort=False)["win"].agg(matches="size", wins="sum")
+        grouped["win_rate"] = (grouped["wins"] / grouped["matches"] * 100).round(1)
+        grouped = grouped.sort_values("matches", ascending=False, kind="stable").head(10)
+        hero_pool = grouped.reset_index()[["hero_id", "matches", "win_rate"]].to_dict("records")
+
+    avg_item_timings: List[Dict[str, Any]] = []
+    if "item_timings" in df:
+        entries = df["item_timings"].dropna().explode().dropna()
+        timings = pd.DataFrame([entry for entry in entries if isinstance(entry, dict)])
+        if {"item", "time"}.issubset(timings.columns):
+            timings["time"] = pd.to_numeric(timings["time"], errors="coerce")
+            timings = timings[timings["item"].fillna("").astype(bool) & timings["time"].notna()]
+            averages = timings.groupby("item", sort=False)["time"].mean().round(1)
+            avg_item_timings = [
+                {"item": item, "avg_purchase_time": value}
+                for item, value in averages.sort_values(kind="stable").head(10).items()
+            ]
 
     return {
-        "kda": round((totals["kills"] + totals["assists"]) / deaths, 2),
-        "gpm": round(totals["gpm"] / match_count, 1),
-        "xpm": round(totals["xpm"] / match_count, 1),
-        "item_timings": avg_item_timings[:10],
-        "hero_pool": hero_pool[:10],
+        "match_count": len(df),
+        "kda": round((kills + assists) / deaths, 2),
+        "gpm": round(column_sum("gpm") / match_count, 1),
+        "xpm": round(column_sum("xpm") / match_count, 1),
+        "item_timings": avg_item_timings,
+        "hero_pool": hero_pool,
     }
 
 
@@ -293,10 +389,12 @@ def render_match_details(match: Dict[str, Any]):
     st.table(pd.DataFrame([hero_summary]))
 
     export_df = interval_df.reset_index()
-    csv_bytes = export_df.to_csv(index=False).encode("utf-8")
+    # download_button needs the whole payload, so the streamed chunks are joined here; only the
+    # row-to-text conversion stays bounded to one chunk at a time
+    csv_bytes = b"".join(exporters.iter_csv(export_df))
     xml_bytes = dataframe_to_xml(export_df)
 
-    dl_cols = st.columns(2)
+    dl_cols = st.columns(3 if exporters.pa is not None else 2)
     dl_cols[0].download_button(
         label="Download match intervals (CSV)",
         data=csv_bytes,
@@ -309,16 +407,18 @@ def render_match_details(match: Dict[str, Any]):
         file_name=f"match_{match.get('match_id', match.get('id', 'detail'))}_intervals.xml",
         mime="application/xml",
     )
+    if exporters.pa is not None:
+        dl_cols[2].download_button(
+            label="Download match intervals (Parquet)",
+            data=exporters.parquet_bytes(export_df),
+            file_name=f"match_{match.get('match_id', match.get('id', 'detail'))}_intervals.parquet",
+            mime="application/vnd.apache.parquet",
+        )
 
 
 def dataframe_to_xml(df: pd.DataFrame) -> bytes:
-    rows = []
-    for _, row in df.iterrows():
-        fields = "".join([f"    <{col}>{row[col]}</{col}>" for col in df.columns])
-        rows.append(f"  <row>\n{fields}\n  </row>")
-    xml_body = "\n".join(rows)
-    xml_string = f"<?xml version='1.0' encoding='UTF-8'?>\n<data>\n{xml_body}\n</data>"
-    return xml_string.encode("utf-8")
+    """Escaped ``<data><row>...</row></data>`` export, built chunk by chunk and joined in memory."""
+    return b"".join(exporters.iter_xml(df))
 
 
 def render_dashboard():
@@ -368,7 +468,24 @@ def render_dashboard():
         st.warning("No pro matches found for this player with the selected filters.")
         return
 
-    kpis = compute_kpis(matches)
+    kpis = load_player_kpis(
+        client,
+        config.matches_table,
+        selected_player_id,
+        selected_tournament_id,
+        selected_hero_id,
+    )
+    if kpis is None:
+        kpis = compute_kpis(
+            load_player_matches(
+                client,
+                config.matches_table,
+                selected_player_id,
+                selected_tournament_id,
+                selected_hero_id,
+                VIEW_COLUMNS["kpi_fallback"],
+            )
+        )
     render_kpi_cards(kpis)
     build_trend_charts(matches)
 
@@ -378,7 +495,15 @@ def render_dashboard():
         for m in matches
     }
     selected_match_label = st.selectbox("Select a match", list(match_options.keys()))
-    render_match_details(match_options[selected_match_label])
+    selected_match = match_options[selected_match_label]
+    detail = load_match_detail(
+        client,
+        config.matches_table,
+        selected_player_id,
+        selected_match.get("id"),
+        selected_match.get("match_id"),
+    )
+    render_match_details({**selected_match, **detail})
 
 
 if __name__ == "__main__":
@@ -0,0 +1,24 @@
+-- Migration: server-side foreign key validation
+-- Counts orphaned references with anti-joins so loaders only receive four numbers
+-- instead of downloading every id over PostgREST.
+
+CREATE OR REPLACE FUNCTION validate_foreign_keys()
+RETURNS TABLE (
+    player_matches_missing_players BIGINT,
+    player_matches_missing_matches BIGINT,
+    interval_stats_missing_players BIGINT,
+    interval_stats_missing_matches BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        (SELECT COUNT(*) FROM player_matches pm
+            WHERE NOT EXISTS (SELECT 1 FROM players p WHERE p.player_id = pm.player_id)),
+        (SELECT COUNT(*) FROM player_matches pm
+            WHERE NOT EXISTS (SELECT 1 FROM matches m WHERE m.match_id = pm.match_id)),
+        (SELECT COUNT(*) FROM interval_stats ists
+            WHERE NOT EXISTS (SELECT 1 FROM players p WHERE p.player_id = ists.player_id)),
+        (SELECT COUNT(*) FROM interval_stats ists
+            WHERE NOT EXISTS (SELECT 1 FROM matches m WHERE m.match_id = ists.match_id));
+$$;
@@ -0,0 +1,344 @@
+-- Migration: incremental analytics aggregates
+-- Replaces the materialized views with agg_* tables updated only for the keys
+-- touched by a load (merge_analytics_deltas). The mv_* names become plain views
+-- over the agg_* tables, so existing readers keep working and never go stale.
+
+-- Lookups by match for delta merges
+CREATE INDEX IF NOT EXISTS idx_player_matches_match ON player_matches(match_id);
+
+-- Incremental aggregate tables
+CREATE TABLE IF NOT EXISTS agg_player_kda_period (
+    player_id TEXT NOT NULL,
+    period_day TIMESTAMPTZ NOT NULL,
+    total_kills BIGINT,
+    total_deaths BIGINT,
+    total_assists BIGINT,
+    kda_ratio NUMERIC,
+    matches_played BIGINT,
+    PRIMARY KEY (player_id, period_day)
+);
+
+CREATE TABLE IF NOT EXISTS agg_hero_win_rates (
+    hero_id INTEGER PRIMARY KEY,
+    hero_name TEXT,
+    matches_played BIGINT,
+    wins BIGINT,
+    win_rate NUMERIC
+);
+
+CREATE TABLE IF NOT EXISTS agg_item_timings (
+    hero_id INTEGER NOT NULL,
+    hero_name TEXT,
+    item_id INTEGER NOT NULL,
+    item_name TEXT,
+    average_completion_seconds NUMERIC,
+    fastest_completion_seconds INTEGER,
+    slowest_completion_seconds INTEGER,
+    samples BIGINT,
+    PRIMARY KEY (hero_id, item_id)
+);
+
+-- Keys a row leaves when it is updated or deleted (a match's started_at moves
+-- its players to another day, a player_match changes hero, ...). The new keys
+-- are found from the loaded rows; the old ones only exist before the change,
+-- so triggers record them here for the next merge to recompute.
+CREATE TABLE IF NOT EXISTS agg_stale_player_days (
+    player_id TEXT NOT NULL,
+    period_day TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (player_id, period_day)
+);
+
+CREATE TABLE IF NOT EXISTS agg_stale_heroes (
+    hero_id INTEGER PRIMARY KEY
+);
+
+CREATE TABLE IF NOT EXISTS agg_stale_hero_items (
+    hero_id INTEGER NOT NULL,
+    item_id INTEGER NOT NULL,
+    PRIMARY KEY (hero_id, item_id)
+);
+
+CREATE OR REPLACE FUNCTION analytics_stale_match()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO agg_stale_player_days (player_id, period_day)
+    SELECT pm.player_id, date_trunc('day', OLD.started_at)
+    FROM player_matches pm
+    WHERE pm.match_id = OLD.match_id
+    ON CONFLICT DO NOTHING;
+    RETURN OLD;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION analytics_stale_player_match()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO agg_stale_player_days (player_id, period_day)
+    SELECT OLD.player_id, date_trunc('day', m.started_at)
+    FROM matches m
+    WHERE m.match_id = OLD.match_id
+    ON CONFLICT DO NOTHING;
+
+    IF OLD.hero_id IS NOT NULL THEN
+        INSERT INTO agg_stale_heroes (hero_id) VALUES (OLD.hero_id)
+        ON CONFLICT DO NOTHING;
+
+        INSERT INTO agg_stale_hero_items (hero_id, item_id)
+        SELECT DISTINCT OLD.hero_id, ists.item_id
+        FROM interval_stats ists
+        WHERE ists.match_id = OLD.match_id
+          AND ists.player_id = OLD.player_id
+          AND ists.metric = 'item_timing'
+          AND ists.item_id IS NOT NULL
+        ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN OLD;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION analytics_stale_interval_stat()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF OLD.metric = 'item_timing' AND OLD.item_id IS NOT NULL THEN
+        INSERT INTO agg_stale_hero_items (hero_id, item_id)
+        SELECT pm.hero_id, OLD.item_id
+        FROM player_matches pm
+        WHERE pm.match_id = OLD.match_id
+          AND pm.player_id = OLD.player_id
+          AND pm.hero_id IS NOT NULL
+        ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN OLD;
+END;
+$$;
+
+-- Deletes fire BEFORE, while the related rows are still there (a match delete
+-- cascades to player_matches only afterwards)
+DROP TRIGGER IF EXISTS matches_analytics_stale_update ON matches;
+CREATE TRIGGER matches_analytics_stale_update
+    AFTER UPDATE OF started_at ON matches
+    FOR EACH ROW WHEN (OLD.started_at IS DISTINCT FROM NEW.started_at)
+    EXECUTE FUNCTION analytics_stale_match();
+DROP TRIGGER IF EXISTS matches_analytics_stale_delete ON matches;
+CREATE TRIGGER matches_analytics_stale_delete
+    BEFORE DELETE ON matches
+    FOR EACH ROW EXECUTE FUNCTION analytics_stale_match();
+
+DROP TRIGGER IF EXISTS player_matches_analytics_stale_update ON player_matches;
+CREATE TRIGGER player_matches_analytics_stale_update
+    AFTER UPDATE OF match_id, player_id, hero_id ON player_matches
+    FOR EACH ROW WHEN ((OLD.match_id, OLD.player_id, OLD.hero_id) IS DISTINCT FROM (NEW.match_id, NEW.player_id, NEW.hero_id))
+    EXECUTE FUNCTION analytics_stale_player_match();
+DROP TRIGGER IF EXISTS player_matches_analytics_stale_delete ON player_matches;
+CREATE TRIGGER player_matches_analytics_stale_delete
+    BEFORE DELETE ON player_matches
+    FOR EACH ROW EXECUTE FUNCTION analytics_stale_player_match();
+
+DROP TRIGGER IF EXISTS interval_stats_analytics_stale_update ON interval_stats;
+CREATE TRIGGER interval_stats_analytics_stale_update
+    AFTER UPDATE OF match_id, player_id, metric, item_id ON interval_stats
+    FOR EACH ROW WHEN ((OLD.match_id, OLD.player_id, OLD.metric, OLD.item_id) IS DISTINCT FROM (NEW.match_id, NEW.player_id, NEW.metric, NEW.item_id))
+    EXECUTE FUNCTION analytics_stale_interval_stat();
+DROP TRIGGER IF EXISTS interval_stats_analytics_stale_delete ON interval_stats;
+CREATE TRIGGER interval_stats_analytics_stale_delete
+    BEFORE DELETE ON interval_stats
+    FOR EACH ROW EXECUTE FUNCTION analytics_stale_interval_stat();
+
+-- Recompute the aggregates of every key touched by the given matches, plus the
+-- stale keys recorded by the triggers above (consumed by the merge).
+-- Keys are rebuilt from all their rows (not only the delta), so re-loading or
+-- correcting a match is idempotent; cost scales with the affected keys.
+-- p_match_ids NULL rebuilds everything (full refresh). Concurrent calls are
+-- serialized with a transaction-level advisory lock, so two loads can never
+-- insert the same keys at once; readers are not blocked.
+CREATE OR REPLACE FUNCTION merge_analytics_deltas(p_match_ids TEXT[] DEFAULT NULL)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_player_days INTEGER;
+    v_heroes INTEGER;
+    v_hero_items INTEGER;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('merge_analytics_deltas'));
+
+    IF p_match_ids IS NULL THEN
+        DELETE FROM agg_player_kda_period;
+        DELETE FROM agg_hero_win_rates;
+        DELETE FROM agg_item_timings;
+    END IF;
+
+    -- Stale keys are deleted as they are read, so keys recorded by loads
+    -- committing meanwhile stay queued for the next merge
+    CREATE TEMP TABLE _delta_player_days (player_id TEXT, period_day TIMESTAMPTZ) ON COMMIT DROP;
+    WITH stale AS (
+        DELETE FROM agg_stale_player_days RETURNING player_id, period_day
+    )
+    INSERT INTO _delta_player_days
+    SELECT pm.player_id, date_trunc('day', m.started_at)
+    FROM player_matches pm
+    JOIN matches m ON m.match_id = pm.match_id
+    WHERE p_match_ids IS NULL OR pm.match_id = ANY(p_match_ids)
+    UNION
+    SELECT player_id, period_day FROM stale;
+
+    CREATE TEMP TABLE _delta_heroes (hero_id INTEGER) ON COMMIT DROP;
+    WITH stale AS (
+        DELETE FROM agg_stale_heroes RETURNING hero_id
+    )
+    INSERT INTO _delta_heroes
+    SELECT pm.hero_id
+    FROM player_matches pm
+    WHERE (p_match_ids IS NULL OR pm.match_id = ANY(p_match_ids)) AND pm.hero_id IS NOT NULL
+    UNION
+    SELECT hero_id FROM stale;
+
+    CREATE TEMP TABLE _delta_hero_items (hero_id INTEGER, item_id INTEGER) ON COMMIT DROP;
+    WITH stale AS (
+        DELETE FROM agg_stale_hero_items RETURNING hero_id, item_id
+    )
+    INSERT INTO _delta_hero_items
+    SELECT pm.hero_id, ists.item_id
+    FROM interval_stats ists
+    JOIN player_matches pm ON pm.match_id = ists.match_id AND pm.player_id = ists.player_id
+    WHERE (p_match_ids IS NULL OR ists.match_id = ANY(p_match_ids))
+      AND ists.metric = 'item_timing'
+      AND ists.item_id IS NOT NULL
+      AND pm.hero_id IS NOT NULL
+    UNION
+    SELECT hero_id, item_id FROM stale;
+
+    -- (player, day)
+    DELETE FROM agg_player_kda_period a
+    USING _delta_player_days d
+    WHERE a.player_id = d.player_id AND a.period_day = d.period_day;
+
+    INSERT INTO agg_player_kda_period
+    SELECT
+        pm.player_id,
+        date_trunc('day', m.started_at) AS period_day,
+        SUM(pm.kills),
+        SUM(pm.deaths),
+        SUM(pm.assists),
+        CASE
+            WHEN SUM(pm.deaths) = 0 THEN SUM(pm.kills + pm.assists)
+            ELSE ROUND(SUM(pm.kills + pm.assists)::NUMERIC / NULLIF(SUM(pm.deaths), 0), 2)
+        END,
+        COUNT(*)
+    FROM player_matches pm
+    JOIN matches m ON m.match_id = pm.match_id
+    JOIN _delta_player_days d
+        ON d.player_id = pm.player_id
+       AND m.started_at >= d.period_day
+       AND m.started_at < d.period_day + INTERVAL '1 day'
+    GROUP BY pm.player_id, date_trunc('day', m.started_at);
+    GET DIAGNOSTICS v_player_days = ROW_COUNT;
+
+    -- (hero)
+    DELETE FROM agg_hero_win_rates a
+    USING _delta_heroes d
+    WHERE a.hero_id = d.hero_id;
+
+    INSERT INTO agg_hero_win_rates
+    SELECT
+        pm.hero_id,
+        h.hero_name,
+        COUNT(*),
+        SUM(CASE WHEN pm.win THEN 1 ELSE 0 END),
+        ROUND(SUM(CASE WHEN pm.win THEN 1 ELSE 0 END)::NUMERIC / NULLIF(COUNT(*), 0), 4)
+    FROM player_matches pm
+    JOIN heroes h ON h.hero_id = pm.hero_id
+    JOIN _delta_heroes d ON d.hero_id = pm.hero_id
+    GROUP BY pm.hero_id, h.hero_name;
+    GET DIAGNOSTICS v_heroes = ROW_COUNT;
+
+    -- (hero, item)
+    DELETE FROM agg_item_timings a
+    USING _delta_hero_items d
+    WHERE a.hero_id = d.hero_id AND a.item_id = d.item_id;
+
+    INSERT INTO agg_item_timings
+    SELECT
+        pm.hero_id,
+        h.hero_name,
+        ists.item_id,
+        i.item_name,
+        AVG(ists.interval_end_seconds),
+        MIN(ists.interval_end_seconds),
+        MAX(ists.interval_end_seconds),
+        COUNT(*)
+    FROM interval_stats ists
+    JOIN player_matches pm ON pm.match_id = ists.match_id AND pm.player_id = ists.player_id
+    JOIN heroes h ON h.hero_id = pm.hero_id
+    JOIN items i ON i.item_id = ists.item_id
+    JOIN _delta_hero_items d ON d.hero_id = pm.hero_id AND d.item_id = ists.item_id
+    WHERE ists.metric = 'item_timing'
+    GROUP BY pm.hero_id, h.hero_name, ists.item_id, i.item_name;
+    GET DIAGNOSTICS v_hero_items = ROW_COUNT;
+
+    DROP TABLE _delta_player_days;
+    DROP TABLE _delta_heroes;
+    DROP TABLE _delta_hero_items;
+
+    RETURN jsonb_build_object(
+        'player_days', v_player_days,
+        'heroes', v_heroes,
+        'hero_items', v_hero_items
+    );
+END;
+$$;
+
+-- Initial backfill of the aggregate tables
+SELECT merge_analytics_deltas(NULL);
+
+-- The materialized views become views over the aggregate tables
+DROP MATERIALIZED VIEW IF EXISTS mv_player_kda_period CASCADE;
+CREATE OR REPLACE VIEW mv_player_kda_period AS
+SELECT player_id, period_day, total_kills, total_deaths, total_assists, kda_ratio, matches_played
+FROM agg_player_kda_period;
+
+DROP MATERIALIZED VIEW IF EXISTS mv_hero_win_rates CASCADE;
+CREATE OR REPLACE VIEW mv_hero_win_rates AS
+SELECT hero_id, hero_name, matches_played, wins, win_rate
+FROM agg_hero_win_rates;
+
+DROP MATERIALIZED VIEW IF EXISTS mv_item_timings CASCADE;
+CREATE OR REPLACE VIEW mv_item_timings AS
+SELECT
+    hero_id, hero_name, item_id, item_name,
+    average_completion_seconds, fastest_completion_seconds, slowest_completion_seconds, samples
+FROM agg_item_timings;
+
+-- Legacy refresh helpers now rebuild the aggregates (kept for existing callers)
+CREATE OR REPLACE FUNCTION refresh_materialized_view_mv_player_kda_period()
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM merge_analytics_deltas(NULL);
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION refresh_materialized_view_mv_hero_win_rates()
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM merge_analytics_deltas(NULL);
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION refresh_materialized_view_mv_item_timings()
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM merge_analytics_deltas(NULL);
+END;
+$$;
@@ -0,0 +1,90 @@
+-- Migration: server-side KPI summary for the Streamlit dashboard
+-- Aggregates a player's pro matches in Postgres so the dashboard receives one
+-- small JSON document instead of every match row.
+--
+-- Reads public.pro_matches only (no dynamic table names) and runs with the
+-- caller's privileges, so row level security still applies to anon callers.
+-- Filters compare as text so the function works with text, integer or uuid ids.
+
+DROP FUNCTION IF EXISTS player_kpis(TEXT, TEXT, TEXT, TEXT);
+
+CREATE OR REPLACE FUNCTION player_kpis(
+    p_player_id TEXT,
+    p_tournament_id TEXT DEFAULT NULL,
+    p_hero_id TEXT DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+SECURITY INVOKER
+SET search_path = public
+AS $$
+DECLARE
+    v_result JSONB;
+BEGIN
+    WITH m AS (
+        SELECT kills, deaths, assists, gpm, xpm, hero_id, win, item_timings::JSONB AS item_timings
+        FROM pro_matches
+        WHERE player_id::TEXT = p_player_id
+          AND (p_tournament_id IS NULL OR tournament_id::TEXT = p_tournament_id)
+          AND (p_hero_id IS NULL OR hero_id::TEXT = p_hero_id)
+    ),
+    totals AS (
+        SELECT
+            COUNT(*) AS match_count,
+            COALESCE(SUM(kills), 0) AS kills,
+            COALESCE(SUM(deaths), 0) AS deaths,
+            COALESCE(SUM(assists), 0) AS assists,
+            COALESCE(SUM(gpm), 0) AS gpm,
+            COALESCE(SUM(xpm), 0) AS xpm
+        FROM m
+    ),
+    hero_pool AS (
+        SELECT
+            hero_id::TEXT AS hero_id,
+            COUNT(*) AS matches,
+            ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(win::INT, 0) > 0) / COUNT(*), 1) AS win_rate
+        FROM m
+        WHERE hero_id IS NOT NULL
+        GROUP BY hero_id
+        ORDER BY matches DESC
+        LIMIT 10
+    ),
+    item_timings AS (
+        SELECT
+            t.value->>'item' AS item,
+            ROUND(AVG((t.value->>'time')::NUMERIC), 1) AS avg_purchase_time
+        FROM m
+        CROSS JOIN LATERAL jsonb_array_elements(COALESCE(m.item_timings, '[]'::JSONB)) AS t(value)
+        WHERE COALESCE(t.value->>'item', '') <> '' AND t.value->>'time' IS NOT NULL
+        GROUP BY t.value->>'item'
+        ORDER BY avg_purchase_time
+        LIMIT 10
+    )
+    SELECT jsonb_build_object(
+        'match_count', totals.match_count,
+        'kda', ROUND((totals.kills + totals.assists)::NUMERIC / GREATEST(totals.deaths, 1), 2),
+        'gpm', ROUND(totals.gpm::NUMERIC / GREATEST(totals.match_count, 1), 1),
+        'xpm', ROUND(totals.xpm::NUMERIC / GREATEST(totals.match_count, 1), 1),
+        'hero_pool', COALESCE(
+            (SELECT jsonb_agg(to_jsonb(h) ORDER BY h.matches DESC) FROM hero_pool h), '[]'::JSONB
+        ),
+        'item_timings', COALESCE(
+            (SELECT jsonb_agg(to_jsonb(i) ORDER BY i.avg_purchase_time) FROM item_timings i), '[]'::JSONB
+        )
+    )
+    INTO v_result
+    FROM totals;
+
+    RETURN v_result;
+END;
+$$;
+
+-- Per-player lookups (the KPI RPC and the dashboard's recent-matches query)
+DO $$
+BEGIN
+    IF to_regclass('public.pro_matches') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS idx_pro_matches_player_date ON public.pro_matches (player_id, match_date DESC);
+    END IF;
+END;
+$$;